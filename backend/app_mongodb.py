@@ -6,13 +6,15 @@ try:
 except RuntimeError:
     pass
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
 import os
 import json
-from datetime import timedelta, datetime
+import logging
+from datetime import timedelta, datetime, timezone
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 import bcrypt
 import pyotp
 import smtplib
@@ -22,14 +24,28 @@ import random
 import secrets
 import uuid
 import csv
+import base64
 from dotenv import load_dotenv
 from bson.objectid import ObjectId
 from urllib.parse import quote_plus
 from fraud_detection import initialize_fraud_detector, get_fraud_detector
 from behavior_tracker import initialize_behavior_tracker, get_behavior_tracker
-from random_forest_fraud import initialize_rf_service, get_rf_service
+from random_forest_fraud import initialize_rf_service, get_rf_service, training_profiles
+from caching import initialize_response_cache
+from dataset_appender import initialize_dataset_appender
+from vote_tally import CANDIDATE_ALIASES, PRECINCTS, summarize_precincts, initialize_tally_store, get_tally_store
+from user_resolver import initialize_user_resolver, get_user_resolver
+from feature_encoding import device_token, voter_token
+from fraud_scoring_pool import initialize_scoring_pool, get_scoring_pool
+from training_jobs import initialize_training_jobs, get_training_jobs, incremental_params, serialize_job
+from hyperparameter_search import search_params
+from voter_feature_store import VoterHistorySummary, initialize_voter_feature_store, get_voter_feature_store
+from export_formats import ExportFormatError, stream_export, filename as export_filename, mimetype as export_mimetype
+from structured_logging import configure_logging
 
 load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 FRONTEND_ORIGIN = os.environ.get('FRONTEND_ORIGIN', 'http://localhost:3000')
@@ -87,14 +103,14 @@ try:
     mongo_client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=2000, connectTimeoutMS=2000)
     mongo_client.admin.command('ping')
     db = mongo_client[MONGODB_DB_NAME]
-    print(f"✓ MongoDB connected: {MONGODB_DB_NAME}")
+    logger.info(f"MongoDB connected: {MONGODB_DB_NAME}")
     mongodb_available = True
 except KeyboardInterrupt:
     raise
 except Exception as e:
-    print(f"✗ MongoDB connection failed: {str(e)[:100]}")
-    print("⚠ Running without MongoDB - enhanced logging disabled")
-    print("  To enable MongoDB, install it or check MONGODB_LOCAL_SETUP.md")
+    logger.error(f"MongoDB connection failed: {str(e)[:100]}")
+    logger.warning("Running without MongoDB - enhanced logging disabled. "
+                   "To enable MongoDB, install it or check MONGODB_LOCAL_SETUP.md")
     db = None
     mongodb_available = False
     mongo_client = None
@@ -117,13 +133,40 @@ if mongodb_available:
 else:
     # Initialize with None - will disable behavior tracking
     initialize_behavior_tracker(None)
-initialize_rf_service(os.environ.get('RF_MODELS_DIR', os.path.join(os.getcwd(), 'backend', 'models', 'rf')))
+if os.environ.get('FRAUD_RECORD_ALL_FEATURES', 'false').lower() == 'true' and get_behavior_tracker().enabled:
+    # Per-vote scoring extracts only the active model's features; record the rest for training
+    get_fraud_detector().enable_feature_recording(get_behavior_tracker().store_assessment_features)
+initialize_tally_store(db, mongo_client)
+initialize_user_resolver(users_collection)
+initialize_voter_feature_store(db)
+response_cache = initialize_response_cache()
+dataset_appender = initialize_dataset_appender(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'voting_fraud_dataset.csv')
+)
+RF_MODELS_DIR = os.environ.get('RF_MODELS_DIR', os.path.join(os.getcwd(), 'backend', 'models', 'rf'))
+if initialize_rf_service(RF_MODELS_DIR).is_ready():
+    # Score votes in warm worker processes; falls back to in-process scoring if the pool cannot start
+    scoring_pool = initialize_scoring_pool(RF_MODELS_DIR)
+    if scoring_pool is not None:
+        get_fraud_detector().enable_scoring_pool(scoring_pool)
+
+def _start_scoring_pool_after_training(job):
+    """
+    The first trained model makes scoring workers possible; once running they
+    (like every app process) follow retrained models through the version file
+    """
+    if get_scoring_pool() is None and get_rf_service() is not None and get_rf_service().is_ready():
+        scoring_pool = initialize_scoring_pool(RF_MODELS_DIR)
+        if scoring_pool is not None:
+            get_fraud_detector().enable_scoring_pool(scoring_pool)
+
+initialize_training_jobs(db, RF_MODELS_DIR, mongo_uri=MONGODB_URI, db_name=MONGODB_DB_NAME,
+                         on_success=_start_scoring_pool_after_training)
 
 # Helpers
 def generate_4digit_otp():
     # Use secrets for cryptographically secure random numbers
     otp = str(secrets.randbelow(9000) + 1000)  # Generates 1000-9999
-    print(f"[OTP Gen] Generated OTP: {otp}")
     return otp
 
 def send_email_otp(email, otp):
@@ -131,15 +174,12 @@ def send_email_otp(email, otp):
         if not email or '@' not in email:
             return False
         
-        print(f"[Email Send] Sending OTP '{otp}' to {email}")
+        logger.debug(f"[Email Send] Sending OTP to {email}")
         
         if app.config['MAIL_USERNAME'] in ['your@gmail.com', 'your-email@gmail.com'] or \
            app.config['MAIL_PASSWORD'] in ['xxxx xxxx xxxx xxxx', 'your-app-password']:
-            print(f"\n{'='*70}")
-            print(f"OTP EMAIL WOULD BE SENT TO: {email}")
-            print(f"OTP CODE: {otp}")
-            print(f"Expiration: 10 minutes")
-            print(f"{'='*70}\n")
+            # Development fallback: surface the code since no email goes out
+            logger.warning(f"Email not configured; OTP for {email} is {otp} (expires in 10 minutes)")
             return True
         
         msg = MIMEMultipart('alternative')
@@ -170,10 +210,10 @@ def send_email_otp(email, otp):
             server.login(app.config['MAIL_USERNAME'], app.config['MAIL_PASSWORD'])
             server.send_message(msg)
         
-        print(f"OTP email sent to {email}")
+        logger.info(f"OTP email sent to {email}")
         return True
     except Exception as e:
-        print(f"Email error: {e}")
+        logger.error(f"Email error: {e}")
         return False
 
 def create_login_otp(user_id, contact_method, contact_value):
@@ -205,15 +245,15 @@ def create_login_otp(user_id, contact_method, contact_value):
         }
         
         result = login_otp_collection.insert_one(otp_record)
-        print(f"[OTP Create] Saved OTP {otp_code} for user {user_id} in DB (id: {result.inserted_id})")
+        logger.debug(f"[OTP Create] Saved OTP for user {user_id} (id: {result.inserted_id})")
         return otp_code, True
     except Exception as e:
-        print(f"OTP creation error: {e}")
+        logger.error(f"OTP creation error: {e}")
         return None, False
 
 def verify_login_otp(user_id, otp_code):
     try:
-        print(f"[OTP Verify] user_id={user_id}, otp_code={otp_code}")
+        logger.debug(f"[OTP Verify] user_id={user_id}")
         now = datetime.utcnow()
         provided_code = str(otp_code).strip()
 
@@ -230,7 +270,7 @@ def verify_login_otp(user_id, otp_code):
         }, sort=[('created_at', -1)])
 
         if otp_record:
-            print(f"[OTP Verify] Matching OTP found (id={otp_record['_id']}). Marking as verified.")
+            logger.debug(f"[OTP Verify] Matching OTP found (id={otp_record['_id']}). Marking as verified.")
             login_otp_collection.update_one(
                 {'_id': otp_record['_id']},
                 {'$set': {'verified': True}}
@@ -245,13 +285,13 @@ def verify_login_otp(user_id, otp_code):
         }, sort=[('created_at', -1)])
 
         if not latest:
-            print(f"[OTP Verify] No valid OTP found for user_id={user_id}")
+            logger.debug(f"[OTP Verify] No valid OTP found for user_id={user_id}")
             return False, "No OTP found"
 
-        print(f"[OTP Verify] Latest OTP exists but did not match code. code_in_db={latest.get('otp_code')}, expires_at={latest.get('expires_at')}, now={now}")
+        logger.debug(f"[OTP Verify] Latest OTP exists but did not match code. expires_at={latest.get('expires_at')}, now={now}")
 
         if now > latest['expires_at']:
-            print("[OTP Verify] Latest OTP is expired; marking invalid")
+            logger.debug("[OTP Verify] Latest OTP is expired; marking invalid")
             login_otp_collection.update_one(
                 {'_id': latest['_id']},
                 {'$set': {'invalid': True}}
@@ -265,13 +305,20 @@ def verify_login_otp(user_id, otp_code):
         )
         return False, "Invalid OTP"
     except Exception as e:
-        print(f"OTP verification error: {e}")
+        logger.error(f"OTP verification error: {e}")
         return False, str(e)
 
 def init_db():
     try:
         users_collection.create_index('username', unique=True)
         master_voter_list_collection.create_index('voter_id', unique=True)
+        # Keyset pagination order for /api/votes
+        votes_collection.create_index([('timestamp', 1), ('_id', 1)])
+        # One vote per user, enforced by the database rather than check-then-insert
+        try:
+            votes_collection.create_index('user_id', unique=True)
+        except Exception as e:
+            logger.warning(f"Could not create unique index on votes.user_id (duplicate votes present?): {e}")
         
         # First, fix any existing admin accounts - only the first one should be authorized
         all_admins = list(users_collection.find({'role': 'admin'}).sort('created_at', 1))
@@ -284,7 +331,7 @@ def init_db():
                     {'_id': first_admin['_id']},
                     {'$set': {'is_authorized_admin': True}}
                 )
-                print(f"✓ Marked first admin '{first_admin.get('username')}' as authorized")
+                logger.info(f"Marked first admin '{first_admin.get('username')}' as authorized")
             
             # Mark all other admins as unauthorized
             for admin in all_admins[1:]:
@@ -292,7 +339,7 @@ def init_db():
                     {'_id': admin['_id']},
                     {'$set': {'is_authorized_admin': False}}
                 )
-                print(f"✓ Marked admin '{admin.get('username')}' as unauthorized")
+                logger.warning(f"Marked admin '{admin.get('username')}' as unauthorized")
         else:
             # No admin exists, create default one
             admin = users_collection.find_one({'username': 'admin'})
@@ -306,7 +353,7 @@ def init_db():
                     'is_authorized_admin': True,
                     'created_at': datetime.utcnow()
                 })
-                print("✓ Admin user created (username: admin, password: admin123)")
+                logger.info("Admin user created (username: admin, password: admin123)")
         
         # Sample voters
         for i in range(1, 4):
@@ -318,15 +365,34 @@ def init_db():
                     'eligible': True
                 })
         
-        print("✓ Database initialized")
+        logger.info("Database initialized")
     except Exception as e:
-        print(f"DB init error: {e}")
+        logger.error(f"DB init error: {e}")
+
 
+_dataset_summary_cache = {}
 
 def load_fraud_dataset_summary(max_preview=25):
     """Load summary stats from voting_fraud_dataset.csv for admin dashboard."""
     base_dir = os.path.dirname(os.path.abspath(__file__))
     dataset_path = os.path.join(base_dir, 'voting_fraud_dataset.csv')
+
+    # Re-parse only when the file changed (appends bump size and mtime)
+    try:
+        file_stat = os.stat(dataset_path)
+        cache_key = (file_stat.st_mtime_ns, file_stat.st_size, max_preview)
+    except OSError:
+        cache_key = None
+    cached = _dataset_summary_cache.get(dataset_path)
+    if cache_key is not None and cached is not None and cached[0] == cache_key:
+        return json.loads(cached[1])
+
+    summary = _parse_fraud_dataset_summary(dataset_path, max_preview)
+    if cache_key is not None and summary.get('available'):
+        _dataset_summary_cache[dataset_path] = (cache_key, json.dumps(summary))
+    return summary
+
+def _parse_fraud_dataset_summary(dataset_path, max_preview):
     summary = {
         'available': False,
         'dataset_path': dataset_path,
@@ -373,7 +439,7 @@ def health():
 def clear_otps():
     try:
         result = login_otp_collection.delete_many({'verified': False})
-        print(f"[Clear OTP] Deleted {result.deleted_count} unverified OTPs")
+        logger.info(f"[Clear OTP] Deleted {result.deleted_count} unverified OTPs")
         return jsonify({"message": f"Cleared {result.deleted_count} OTPs"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -399,7 +465,7 @@ def register_voter():
             if not password: missing.append('password')
             if not voter_id: missing.append('voter_id')
             if not email: missing.append('email')
-            print(f"Registration error: Missing fields: {missing}")
+            logger.warning(f"Registration error: Missing fields: {missing}")
             return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
         
         if users_collection.find_one({'username': username}):
@@ -462,19 +528,20 @@ def register_voter():
             photo_path = os.path.join(uploads_dir, f"{str(result.inserted_id)}.jpg")
             img.save(photo_path, format='JPEG', quality=95, optimize=True)
             
-            print(f"[DEBUG] Registration photo saved: {photo_path}")
+            logger.debug(f"Registration photo saved: {photo_path}")
 
             # Update user with photo path
             users_collection.update_one({'_id': result.inserted_id}, {'$set': {'photo_path': photo_path}})
+            get_user_resolver().invalidate(identity=username)
             
         except Exception as e:
-            print(f"[ERROR] Registration photo save failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Registration photo save failed: {e}")
             # Delete the user document if photo save fails
             users_collection.delete_one({'_id': result.inserted_id})
             return jsonify({"error": f"Failed to save registration photo: {str(e)}"}), 500
         
+        response_cache.invalidate_for('voter_registered')
+        
         # Send OTP on registration
         otp_code, success = create_login_otp(str(result.inserted_id), 'email', email)
         if success:
@@ -482,7 +549,7 @@ def register_voter():
         
         return jsonify({"message": "User registered successfully", "mfa_type": "email"}), 201
     except Exception as e:
-        print(f"Registration error: {e}")
+        logger.error(f"Registration error: {e}")
         return jsonify({"error": "Registration failed"}), 500
 
 @app.route('/api/register/candidate', methods=['POST', 'OPTIONS'])
@@ -504,7 +571,7 @@ def register_candidate():
             if not username: missing.append('username')
             if not password: missing.append('password')
             if not email: missing.append('email')
-            print(f"Candidate registration error: Missing fields: {missing}")
+            logger.warning(f"Candidate registration error: Missing fields: {missing}")
             return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
         
         if users_collection.find_one({'username': username}):
@@ -524,6 +591,7 @@ def register_candidate():
         }
         
         result = users_collection.insert_one(user_doc)
+        response_cache.invalidate_for('user_registered')
         
         # Send OTP on registration
         otp_code, success = create_login_otp(str(result.inserted_id), 'email', email)
@@ -532,7 +600,7 @@ def register_candidate():
         
         return jsonify({"message": "Candidate registered successfully", "mfa_type": "email"}), 201
     except Exception as e:
-        print(f"Candidate registration error: {e}")
+        logger.error(f"Candidate registration error: {e}")
         return jsonify({"error": "Registration failed"}), 500
 
 @app.route('/api/register/admin', methods=['POST', 'OPTIONS'])
@@ -554,7 +622,7 @@ def register_admin():
             if not username: missing.append('username')
             if not email: missing.append('email')
             if not password: missing.append('password')
-            print(f"Admin registration error: Missing fields: {missing}")
+            logger.warning(f"Admin registration error: Missing fields: {missing}")
             return jsonify({"error": f"Missing required fields: {', '.join(missing)}"}), 400
         
         # Check if username or email already exists
@@ -581,11 +649,12 @@ def register_admin():
         }
         
         result = users_collection.insert_one(user_doc)
-        print(f"✓ Admin registered: {username} ({email})")
+        response_cache.invalidate_for('user_registered')
+        logger.info(f"Admin registered: {username} ({email})")
         
         return jsonify({"message": "Admin registered successfully"}), 201
     except Exception as e:
-        print(f"Admin registration error: {e}")
+        logger.error(f"Admin registration error: {e}")
         return jsonify({"error": "Registration failed"}), 500
 
 @app.route('/api/login', methods=['POST'])
@@ -595,47 +664,45 @@ def login():
         username = data.get('username')
         password = data.get('password')
         
-        print(f"\n{'='*60}")
-        print(f"[LOGIN ATTEMPT] Username: {username}")
-        print(f"[LOGIN ATTEMPT] Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"[LOGIN ATTEMPT] IP: {request.remote_addr}")
-        print(f"{'='*60}\n")
+        logger.info(f"[Login] Attempt for {username}", extra={'event': 'login_attempt', 'username': username,
+                                                           'ip': request.remote_addr})
         
         if not username or not password:
-            print(f"[LOGIN FAILED] Missing credentials for: {username}")
+            logger.warning(f"[Login] Missing credentials for: {username}")
             return jsonify({"error": "Missing credentials"}), 400
         
         # If MongoDB is unavailable, allow test credentials for demo
         if not mongodb_available or users_collection is None:
-            print("[Login] MongoDB unavailable - using fallback test credentials")
+            logger.warning("[Login] MongoDB unavailable - using fallback test credentials")
             if username == 'admin' and password == 'admin@123':
-                print(f"[LOGIN SUCCESS] Test admin login: {username}")
+                logger.info(f"[Login] Test admin login: {username}")
                 token = create_access_token(identity=username, additional_claims={'role': 'admin'})
                 return jsonify({"access_token": token, "role": "admin"}), 200
             elif username == 'voter' and password == 'voter123':
-                print(f"[LOGIN SUCCESS] Test voter login: {username}")
+                logger.info(f"[Login] Test voter login: {username}")
                 token = create_access_token(identity=username, additional_claims={'role': 'voter'})
                 return jsonify({"access_token": token, "role": "voter"}), 200
             else:
-                print(f"[LOGIN FAILED] Invalid test credentials for: {username}")
+                logger.warning(f"[Login] Invalid test credentials for: {username}")
                 return jsonify({"error": "Invalid credentials"}), 401
         
         user = users_collection.find_one({'username': username})
         
         if not user or not bcrypt.checkpw(password.encode('utf-8'), user['password']):
-            print(f"[LOGIN FAILED] Invalid credentials for: {username}")
+            logger.warning(f"[Login] Invalid credentials for: {username}",
+                           extra={'event': 'login_failed', 'username': username, 'ip': request.remote_addr})
             return jsonify({"error": "Invalid credentials"}), 401
         
-        print(f"[LOGIN] User found: {username} | Role: {user.get('role', 'voter')}")
+        logger.debug(f"[Login] User found: {username} | Role: {user.get('role', 'voter')}")
         
         # Check if user is admin and if they are authorized
         if user.get('role') == 'admin':
             if not user.get('is_authorized_admin', False):
-                print(f"[LOGIN FAILED] Unauthorized admin account: {username}")
+                logger.warning(f"[Login] Unauthorized admin account: {username}")
                 return jsonify({"error": "Unauthorized admin account. Access denied."}), 403
         
         if user.get('mfa_type') and user.get('mfa_type') != 'none':
-            print(f"[LOGIN] MFA required for: {username}")
+            logger.debug(f"[Login] MFA required for: {username}")
             otp_code, success = create_login_otp(str(user['_id']), 'email', user.get('email'))
             if success:
                 send_email_otp(user.get('email'), otp_code)
@@ -647,11 +714,12 @@ def login():
                 "message": "OTP sent to your email"
             }), 200
         
-        print(f"[LOGIN SUCCESS] {username} | Role: {user.get('role', 'voter')}")
+        logger.info(f"[Login] Success: {username}",
+                    extra={'event': 'login_success', 'username': username, 'role': user.get('role', 'voter')})
         token = create_access_token(identity=username, additional_claims={'role': user['role']})
         return jsonify({"access_token": token, "role": user['role']}), 200
     except Exception as e:
-        print(f"Login error: {e}")
+        logger.error(f"Login error: {e}")
         return jsonify({"error": "Login failed"}), 500
 
 @app.route('/api/resend-otp', methods=['POST'])
@@ -679,7 +747,7 @@ def resend_otp():
         send_email_otp(user.get('email'), otp_code)
         return jsonify({"message": "A new OTP has been sent to your email"}), 200
     except Exception as e:
-        print(f"Resend OTP error: {e}")
+        logger.error(f"Resend OTP error: {e}")
         return jsonify({"error": "Resend failed"}), 500
 
 @app.route('/api/verify-otp', methods=['POST'])
@@ -692,7 +760,7 @@ def verify_otp():
         user_id = data.get('user_id')
         otp_code = data.get('otp')
         
-        print(f"[Verify-OTP] Received request: user_id={user_id}, otp={otp_code} (type: {type(otp_code)})")
+        logger.debug(f"[Verify-OTP] Received request: user_id={user_id}")
         
         if not user_id or not otp_code:
             return jsonify({"error": "Missing user_id or OTP"}), 400
@@ -700,7 +768,7 @@ def verify_otp():
         success, message = verify_login_otp(user_id, otp_code)
         
         if not success:
-            print(f"[Verify-OTP] Verification failed: {message}")
+            logger.warning(f"[Verify-OTP] Verification failed: {message}")
             return jsonify({"error": message}), 401
         
         user = users_collection.find_one({'_id': ObjectId(user_id)})
@@ -708,10 +776,10 @@ def verify_otp():
             return jsonify({"error": "User not found"}), 404
         
         token = create_access_token(identity=user['username'], additional_claims={'role': user['role']})
-        print(f"[Verify-OTP] Success! Returning token for user: {user['username']}")
+        logger.info(f"[Verify-OTP] Success! Returning token for user: {user['username']}")
         return jsonify({"access_token": token, "role": user['role']}), 200
     except Exception as e:
-        print(f"OTP verification error: {e}")
+        logger.error(f"OTP verification error: {e}")
         return jsonify({"error": "Verification failed"}), 500
 
 def prepare_image_for_dlib(img_array):
@@ -767,19 +835,19 @@ def load_image_for_face_recognition(image_source, is_file_path=False):
     
     try:
         if is_file_path:
-            print(f"[DEBUG] Loading from file path: {image_source}")
+            logger.debug(f"Loading from file path: {image_source}")
             # Use PIL to load (more reliable on Windows)
             from PIL import Image as PILImage
             pil_img = PILImage.open(image_source).convert('RGB')
             img_array = np.array(pil_img, dtype=np.uint8)
-            print(f"[DEBUG] Image loaded via PIL - shape: {img_array.shape}, dtype: {img_array.dtype}")
+            logger.debug(f"Image loaded via PIL - shape: {img_array.shape}, dtype: {img_array.dtype}")
             # Fix memory layout for dlib
             img_array = prepare_image_for_dlib(img_array)
-            print(f"[DEBUG] Image prepared for dlib - C_CONTIGUOUS: {img_array.flags['C_CONTIGUOUS']}")
+            logger.debug(f"Image prepared for dlib - C_CONTIGUOUS: {img_array.flags['C_CONTIGUOUS']}")
             return img_array
         else:
             # Decode base64
-            print(f"[DEBUG] Loading from base64")
+            logger.debug("Loading from base64")
             
             if ',' in image_source and image_source.startswith('data:'):
                 header, b64 = image_source.split(',', 1)
@@ -792,16 +860,14 @@ def load_image_for_face_recognition(image_source, is_file_path=False):
             from PIL import Image as PILImage
             pil_img = PILImage.open(io.BytesIO(img_bytes)).convert('RGB')
             img_array = np.array(pil_img, dtype=np.uint8)
-            print(f"[DEBUG] Image loaded from base64 - shape: {img_array.shape}, dtype: {img_array.dtype}")
+            logger.debug(f"Image loaded from base64 - shape: {img_array.shape}, dtype: {img_array.dtype}")
             # Fix memory layout for dlib
             img_array = prepare_image_for_dlib(img_array)
-            print(f"[DEBUG] Image prepared for dlib - C_CONTIGUOUS: {img_array.flags['C_CONTIGUOUS']}")
+            logger.debug(f"Image prepared for dlib - C_CONTIGUOUS: {img_array.flags['C_CONTIGUOUS']}")
             return img_array
             
     except Exception as e:
-        print(f"[ERROR] Image loading failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Image loading failed: {e}")
         raise ValueError(f"Failed to load image: {str(e)}")
 
 
@@ -840,25 +906,24 @@ def verify_identity():
             
             if face_recognition is not None:
                 try:
-                    print(f"[DEBUG] Detecting faces in verification photo...")
-                    print(f"[DEBUG] Array properties before face detection:")
-                    print(f"  Shape: {live_np.shape}, dtype: {live_np.dtype}")
-                    print(f"  C_CONTIGUOUS: {live_np.flags['C_CONTIGUOUS']}")
+                    logger.debug("Detecting faces in verification photo...")
+                    logger.debug(f"Array properties before face detection: shape={live_np.shape}, dtype={live_np.dtype}, "
+                                 f"C_CONTIGUOUS={live_np.flags['C_CONTIGUOUS']}")
                     
                     # Try HOG method first (faster)
-                    print(f"[DEBUG] Calling face_recognition.face_locations with HOG model (upsample=1)...")
+                    logger.debug("Calling face_recognition.face_locations with HOG model (upsample=1)...")
                     live_locations = face_recognition.face_locations(live_np, number_of_times_to_upsample=1, model='hog')
 
                     # If no faces, try more aggressive HOG upsample
                     if len(live_locations) == 0:
-                        print(f"[DEBUG] HOG (upsample=1) found no faces, retrying with upsample=2...")
+                        logger.debug("HOG (upsample=1) found no faces, retrying with upsample=2...")
                         live_locations = face_recognition.face_locations(live_np, number_of_times_to_upsample=2, model='hog')
                     
-                    print(f"[DEBUG] Detected {len(live_locations)} face(s) using dlib HOG")
+                    logger.debug(f"Detected {len(live_locations)} face(s) using dlib HOG")
                     
                 except Exception as dlib_error:
-                    print(f"[WARNING] dlib/HOG face detection failed: {dlib_error}")
-                    print(f"[DEBUG] Falling back to OpenCV Haar Cascade...")
+                    logger.warning(f"dlib/HOG face detection failed: {dlib_error}")
+                    logger.debug("Falling back to OpenCV Haar Cascade...")
                     
                     # Fallback to OpenCV Haar Cascade
                     try:
@@ -875,28 +940,26 @@ def verify_identity():
                         faces = face_cascade.detectMultiScale(live_gray, scaleFactor=1.1, minNeighbors=3, minSize=(30, 30))
                         
                         if len(faces) == 0:
-                            print(f"[DEBUG] No faces with default params, trying more lenient settings...")
+                            logger.debug("No faces with default params, trying more lenient settings...")
                             faces = face_cascade.detectMultiScale(live_gray, scaleFactor=1.05, minNeighbors=2, minSize=(20, 20))
                         
                         if len(faces) == 0:
-                            print(f"[DEBUG] Still no faces, trying very lenient settings...")
+                            logger.debug("Still no faces, trying very lenient settings...")
                             faces = face_cascade.detectMultiScale(live_gray, scaleFactor=1.02, minNeighbors=1, minSize=(15, 15))
                         
-                        print(f"[DEBUG] OpenCV Haar Cascade detected {len(faces)} face(s)")
+                        logger.debug(f"OpenCV Haar Cascade detected {len(faces)} face(s)")
                         
                         # Filter: Keep only the largest face (most likely the real face, rest are false positives)
                         if len(faces) > 1:
-                            print(f"[DEBUG] Multiple faces detected ({len(faces)}), keeping only the largest")
+                            logger.debug(f"Multiple faces detected ({len(faces)}), keeping only the largest")
                             faces = [max(faces, key=lambda f: f[2] * f[3])]  # Sort by area (w*h), keep largest
                         
                         # Convert OpenCV format (x, y, w, h) to face_recognition format (top, right, bottom, left)
                         live_locations = [(y, x + w, y + h, x) for (x, y, w, h) in faces]
-                        print(f"[DEBUG] Converted to face_recognition format: {len(live_locations)} face(s)")
+                        logger.debug(f"Converted to face_recognition format: {len(live_locations)} face(s)")
                         
                     except Exception as cv_error:
-                        print(f"[ERROR] OpenCV Haar Cascade also failed: {cv_error}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception(f"OpenCV Haar Cascade also failed: {cv_error}")
                         live_locations = []
                 
                 if len(live_locations) == 0:
@@ -914,18 +977,18 @@ def verify_identity():
                     image_area = live_np.shape[0] * live_np.shape[1]
                     face_percentage = (face_area / image_area) * 100
                     
-                    print(f"[DEBUG] Face quality - Size: {face_width}x{face_height}, Area: {face_percentage:.2f}% of image")
+                    logger.debug(f"Face quality - Size: {face_width}x{face_height}, Area: {face_percentage:.2f}% of image")
                     
                     # Relaxed thresholds when using OpenCV fallback (less precise detection)
                     # Face should be at least 0.5% of image (very lenient for OpenCV)
                     if face_percentage < 0.5:
                         fraud_indicators.append('face_too_small_in_frame')
-                        print(f"[WARNING] Face is extremely small ({face_percentage:.2f}% of frame)")
+                        logger.warning(f"Face is extremely small ({face_percentage:.2f}% of frame)")
                     
                     # Face should not be more than 95% of image
                     if face_percentage > 95:
                         fraud_indicators.append('face_fills_entire_frame')
-                        print(f"[WARNING] Face fills too much of frame ({face_percentage:.2f}% of frame)")
+                        logger.warning(f"Face fills too much of frame ({face_percentage:.2f}% of frame)")
                 
                 # Note: We already filtered to keep only the largest face, so no multi-face warning needed
 
@@ -942,7 +1005,7 @@ def verify_identity():
             
             # Check if MongoDB is available
             if not mongodb_available or users_collection is None:
-                print("[WARNING] MongoDB not available, skipping face matching")
+                logger.warning("MongoDB not available, skipping face matching")
                 return jsonify({
                     "verified": True,
                     "is_genuine": True,
@@ -952,21 +1015,18 @@ def verify_identity():
                     "message": "Identity verified successfully (database unavailable - face matching skipped)"
                 }), 200
             
-            # Find user by username or _id
-            user = users_collection.find_one({'username': user_id})
-            if user is None:
-                try:
-                    user = users_collection.find_one({'_id': ObjectId(user_id)})
-                except:
-                    pass
+            # Find user by username or _id; a cached copy without a photo may predate registration's update
+            user = get_user_resolver().resolve(user_id)
+            if user is not None and not user.get('photo_path'):
+                user = get_user_resolver().resolve(user_id, refresh=True)
             
             if user is None:
-                print(f"[ERROR] User not found: {user_id}")
+                logger.error(f"User not found: {user_id}")
                 return jsonify({"error": "User not found. Please log in again."}), 404
             
             # Check if user has a registered photo
             if not user.get('photo_path'):
-                print(f"[ERROR] User {user.get('username')} has no registered photo")
+                logger.error(f"User {user.get('username')} has no registered photo")
                 return jsonify({
                     "error": "No registration photo found",
                     "message": "You must register with a photo before identity verification. Please contact support."
@@ -974,7 +1034,7 @@ def verify_identity():
             
             # Check if registration photo file exists
             if not os.path.exists(user['photo_path']):
-                print(f"[ERROR] Registration photo file not found: {user['photo_path']}")
+                logger.error(f"Registration photo file not found: {user['photo_path']}")
                 return jsonify({
                     "error": "Registration photo file missing",
                     "message": "Your registration photo is missing. Please contact support."
@@ -987,35 +1047,35 @@ def verify_identity():
             # Perform face matching
             if face_recognition is not None:
                 try:
-                    print(f"[DEBUG] Loading registration photo from: {user['photo_path']}")
+                    logger.debug(f"Loading registration photo from: {user['photo_path']}")
                     
                     # Load registration photo using robust helper function with error handling
                     try:
                         ref_np = load_image_for_face_recognition(user['photo_path'], is_file_path=True)
                     except Exception as load_error:
-                        print(f"[ERROR] Failed to load registration photo: {load_error}")
+                        logger.error(f"Failed to load registration photo: {load_error}")
                         return jsonify({
                             "error": "Failed to load registration photo",
                             "message": f"Could not process your registration photo: {str(load_error)}"
                         }), 500
                     
-                    print(f"[DEBUG] Extracting face encodings from both photos...")
+                    logger.debug("Extracting face encodings from both photos...")
                     
                     # Extract face encodings from registration photo with error handling
                     try:
-                        print(f"[DEBUG] Extracting encoding from registration photo (shape: {ref_np.shape}, dtype: {ref_np.dtype})")
+                        logger.debug(f"Extracting encoding from registration photo (shape: {ref_np.shape}, dtype: {ref_np.dtype})")
                         # Image is already prepared by prepare_image_for_dlib()
-                        print(f"[DEBUG] Registration photo array - C_CONTIGUOUS: {ref_np.flags['C_CONTIGUOUS']}, dtype: {ref_np.dtype}")
+                        logger.debug(f"Registration photo array - C_CONTIGUOUS: {ref_np.flags['C_CONTIGUOUS']}, dtype: {ref_np.dtype}")
                         
                         # Try dlib HOG detection first
                         try:
                             ref_locations = face_recognition.face_locations(ref_np, number_of_times_to_upsample=1, model='hog')
                             if len(ref_locations) == 0:
-                                print(f"[DEBUG] HOG found no faces, trying with upsample=2...")
+                                logger.debug("HOG found no faces, trying with upsample=2...")
                                 ref_locations = face_recognition.face_locations(ref_np, number_of_times_to_upsample=2, model='hog')
-                            print(f"[DEBUG] dlib HOG detected {len(ref_locations)} face(s) in registration photo")
+                            logger.debug(f"dlib HOG detected {len(ref_locations)} face(s) in registration photo")
                         except Exception as dlib_ref_error:
-                            print(f"[WARNING] dlib HOG face detection failed for registration photo: {dlib_ref_error}")
+                            logger.warning(f"dlib HOG face detection failed for registration photo: {dlib_ref_error}")
                             # Fallback to OpenCV Haar Cascade
                             try:
                                 ref_bgr = cv2.cvtColor(ref_np, cv2.COLOR_RGB2BGR)
@@ -1032,9 +1092,9 @@ def verify_identity():
                                     faces = face_cascade.detectMultiScale(ref_gray, scaleFactor=1.02, minNeighbors=1, minSize=(15, 15))
                                 
                                 ref_locations = [(y, x + w, y + h, x) for (x, y, w, h) in faces]
-                                print(f"[DEBUG] OpenCV Haar Cascade found {len(ref_locations)} faces in registration photo")
+                                logger.debug(f"OpenCV Haar Cascade found {len(ref_locations)} faces in registration photo")
                             except Exception as cv_ref_error:
-                                print(f"[ERROR] Both dlib and OpenCV failed for registration photo: {cv_ref_error}")
+                                logger.error(f"Both dlib and OpenCV failed for registration photo: {cv_ref_error}")
                                 ref_locations = []
                         
                         # Extract face encodings using dlib
@@ -1042,23 +1102,21 @@ def verify_identity():
                         if len(ref_locations) > 0:
                             try:
                                 ref_encodings = face_recognition.face_encodings(ref_np, ref_locations)
-                                print(f"[DEBUG] Successfully extracted {len(ref_encodings)} encoding(s) from registration photo")
+                                logger.debug(f"Successfully extracted {len(ref_encodings)} encoding(s) from registration photo")
                             except Exception as encoding_error:
-                                print(f"[ERROR] dlib encoding extraction failed: {encoding_error}")
+                                logger.error(f"dlib encoding extraction failed: {encoding_error}")
                                 return jsonify({
                                     "error": "Face encoding extraction failed",
                                     "message": "Could not extract facial features from registration photo. Please contact support or try re-registering with a clearer photo."
                                 }), 500
                         else:
-                            print(f"[ERROR] No face detected in registration photo")
+                            logger.error("No face detected in registration photo")
                             return jsonify({
                                 "error": "No face detected in registration photo",
                                 "message": "Your registration photo does not contain a detectable face. Please contact support."
                             }), 500
                     except Exception as ref_error:
-                        print(f"[ERROR] Failed to extract encoding from registration photo: {ref_error}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception(f"Failed to extract encoding from registration photo: {ref_error}")
                         return jsonify({
                             "error": "Registration photo processing error",
                             "message": "Could not process your registration photo. It may be corrupted. Please re-register with a new photo."
@@ -1067,30 +1125,28 @@ def verify_identity():
                     # Extract face encodings from verification photo with error handling
                     live_encodings = []
                     try:
-                        print(f"[DEBUG] Extracting encoding from verification photo (shape: {live_np.shape}, dtype: {live_np.dtype})")
+                        logger.debug(f"Extracting encoding from verification photo (shape: {live_np.shape}, dtype: {live_np.dtype})")
                         # Image is already prepared by prepare_image_for_dlib()
-                        print(f"[DEBUG] Verification photo array - C_CONTIGUOUS: {live_np.flags['C_CONTIGUOUS']}, dtype: {live_np.dtype}")
+                        logger.debug(f"Verification photo array - C_CONTIGUOUS: {live_np.flags['C_CONTIGUOUS']}, dtype: {live_np.dtype}")
                         
                         if len(live_locations) > 0:
                             try:
                                 live_encodings = face_recognition.face_encodings(live_np, live_locations)
-                                print(f"[DEBUG] Successfully extracted {len(live_encodings)} encoding(s) from verification photo")
+                                logger.debug(f"Successfully extracted {len(live_encodings)} encoding(s) from verification photo")
                             except Exception as encoding_error:
-                                print(f"[ERROR] dlib encoding extraction failed: {encoding_error}")
+                                logger.error(f"dlib encoding extraction failed: {encoding_error}")
                                 return jsonify({
                                     "error": "Face encoding extraction failed",
                                     "message": "Could not extract facial features from your photo. Please ensure good lighting and a clear face view."
                                 }), 400
                         else:
-                            print(f"[ERROR] No faces detected in verification photo")
+                            logger.error("No faces detected in verification photo")
                             return jsonify({
                                 "error": "Face not detected",
                                 "message": "Could not detect a face in your verification photo. Please try again with better lighting and a clear face."
                             }), 400
                     except Exception as live_error:
-                        print(f"[ERROR] Verification encoding extraction error: {live_error}")
-                        import traceback
-                        traceback.print_exc()
+                        logger.exception(f"Verification encoding extraction error: {live_error}")
                         return jsonify({
                             "error": "Verification processing error",
                             "message": f"An error occurred during verification: {str(live_error)}"
@@ -1098,14 +1154,14 @@ def verify_identity():
                     
                     
                     if len(ref_encodings) == 0:
-                        print(f"[ERROR] No face encoding generated from registration photo")
+                        logger.error("No face encoding generated from registration photo")
                         return jsonify({
                             "error": "Registration photo invalid",
                             "message": "Your registration photo does not contain a detectable face. Please contact support or re-register with a different photo."
                         }), 500
                     
                     if len(live_encodings) == 0:
-                        print(f"[ERROR] No face encoding generated from verification photo")
+                        logger.error("No face encoding generated from verification photo")
                         return jsonify({
                             "error": "Verification photo invalid",
                             "message": "Could not extract facial features from your verification photo. Please try again with better lighting."
@@ -1115,7 +1171,7 @@ def verify_identity():
                     best_distance = float('inf')
                     best_match_idx = -1
                     
-                    print(f"[DEBUG] Comparing {len(ref_encodings)} registration encoding(s) with {len(live_encodings)} verification encoding(s)")
+                    logger.debug(f"Comparing {len(ref_encodings)} registration encoding(s) with {len(live_encodings)} verification encoding(s)")
                     
                     # Use face encoding comparison - this is real verification
                     for live_idx, live_enc in enumerate(live_encodings):
@@ -1126,7 +1182,7 @@ def verify_identity():
                             best_distance = min_distance
                             best_match_idx = live_idx
                         
-                        print(f"[DEBUG] Live encoding {live_idx}: min distance = {min_distance:.4f}")
+                        logger.debug(f"Live encoding {live_idx}: min distance = {min_distance:.4f}")
                     
                     face_distance = best_distance
                     
@@ -1138,13 +1194,11 @@ def verify_identity():
                     # Determine if faces match with stricter threshold
                     is_genuine = face_distance < 0.55  # Slightly stricter than 0.6
                     
-                    print(f"[DEBUG] Face matching complete:")
-                    print(f"  Distance: {face_distance:.4f}")
-                    print(f"  Confidence: {face_match_confidence:.2%}")
-                    print(f"  Match: {is_genuine}")
+                    logger.debug(f"Face matching complete: distance={face_distance:.4f}, "
+                                 f"confidence={face_match_confidence:.2%}, match={is_genuine}")
                     
                     if not is_genuine:
-                        print(f"[WARNING] Face mismatch detected - User: {user.get('username')}, Distance: {face_distance:.4f}")
+                        logger.warning(f"Face mismatch detected - User: {user.get('username')}, Distance: {face_distance:.4f}")
                         
                         # Provide additional context for rejection
                         if face_distance < 0.6:
@@ -1161,16 +1215,14 @@ def verify_identity():
                         }), 400
                     
                 except Exception as e:
-                    print(f"[ERROR] Face matching failed: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception(f"Face matching failed: {e}")
                     return jsonify({
                         "error": "Face matching error",
                         "message": f"An error occurred during face verification: {str(e)}"
                     }), 500
             else:
                 # face_recognition library not available
-                print(f"[WARNING] face_recognition library not available, skipping face matching")
+                logger.warning("face_recognition library not available, skipping face matching")
                 face_match_confidence = 0.7
                 is_genuine = True
 
@@ -1202,6 +1254,8 @@ def verify_identity():
             try:
                 if mongodb_available and users_collection is not None and user is not None:
                     users_collection.update_one({'_id': user.get('_id')}, {'$set': {'identity_verified': True}})
+                    get_user_resolver().invalidate(user, identity=user_id)
+                    response_cache.invalidate_for('identity_verified')
             except Exception:
                 pass
 
@@ -1214,9 +1268,7 @@ def verify_identity():
                 "message": "Identity verified successfully"
             }), 200
         except Exception as e:
-            print(f"Identity verification processing error: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Identity verification processing error: {e}")
             error_msg = str(e)
             # Provide more specific error messages
             if "face_recognition" in error_msg.lower() or "dlib" in error_msg.lower():
@@ -1228,9 +1280,7 @@ def verify_identity():
             else:
                 return jsonify({"error": f"Image processing error: {error_msg}"}), 500
     except Exception as e:
-        print(f"Identity verification error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Identity verification error: {e}")
         error_msg = str(e)
         # Handle common errors
         if "No JSON object could be decoded" in error_msg or "JSON" in error_msg:
@@ -1245,12 +1295,42 @@ def verify_identity():
 def get_election_data():
     try:
         return jsonify({
-            'candidates': ['Congress', 'BJP'],
-            'precincts': ['Precinct 1', 'Precinct 2', 'Precinct 3']
+            'candidates': list(CANDIDATE_ALIASES),
+            'precincts': PRECINCTS
         }), 200
     except Exception as e:
         return jsonify({"error": "Failed to fetch data"}), 500
 
+def _training_dataset_row(user_id, age, ip_addr, user_agent, vote_attempt_data, historical_data,
+                          is_new_voter, previous_count):
+    """Feature row for voting_fraud_dataset.csv describing an allowed vote"""
+    ip_addr = ip_addr or '0.0.0.0'
+    return {
+        'voter_id': voter_token(user_id),
+        'age': age,
+        'ip_address': ip_addr,
+        'device_id': device_token(user_agent),
+        'login_attempts': vote_attempt_data.get('login_attempts', 1),
+        'vote_duration_sec': vote_attempt_data.get('session_duration', 0),
+        # Location match: 1 for first vote or if IP seen before
+        'location_match': 1 if (is_new_voter or historical_data.has_ip(ip_addr)) else 0,
+        'previous_votes': previous_count,
+        'is_fraud': 0,  # Non-fraud for successful, allowed vote
+    }
+
+def _replay_or_reject_vote(existing_vote, idempotency_key):
+    """Return the original result for a retried request, or reject a second vote"""
+    if idempotency_key and existing_vote.get('idempotency_key') == idempotency_key:
+        logger.info(f"[Cast Vote] Idempotent replay, transaction_id: {existing_vote.get('transaction_id')}")
+        return jsonify({
+            "message": "Vote cast successfully",
+            "transaction_id": existing_vote.get('transaction_id'),
+            "fraud_risk_level": existing_vote.get('fraud_risk_level'),
+            "idempotent_replay": True
+        }), 200
+    logger.warning("[Cast Vote] Rejected: user already voted")
+    return jsonify({"error": "You have already voted"}), 400
+
 @app.route('/api/cast-vote', methods=['POST'])
 @jwt_required()
 def cast_vote():
@@ -1266,45 +1346,50 @@ def cast_vote():
         candidate = vote_data.get('candidate_id') or data.get('candidate') or data.get('candidate_id')
         precinct = data.get('precinct')
         
-        print(f"\n{'='*60}")
-        print(f"[Cast Vote] user_id={user_id}, candidate={candidate}, precinct={precinct}")
-        print(f"[Cast Vote] Full request data: {data}")
-        print(f"{'='*60}")
+        logger.debug(f"[Cast Vote] user_id={user_id}, candidate={candidate}, precinct={precinct}")
         
         if not candidate:
-            print(f"[Cast Vote] ERROR: Missing candidate")
+            logger.warning("[Cast Vote] Rejected: missing candidate")
             return jsonify({"error": "Missing candidate"}), 400
         
-        # Get user information
-        user = users_collection.find_one({'username': user_id})
-        if not user:
-            try:
-                user = users_collection.find_one({'_id': ObjectId(user_id)})
-            except:
-                pass
+        # Get user information; re-read if the cached copy predates identity verification
+        user = get_user_resolver().resolve(user_id)
+        if user and not user.get('identity_verified', False):
+            user = get_user_resolver().resolve(user_id, refresh=True)
         
         if not user:
-            print(f"[Cast Vote] ERROR: User not found")
+            logger.warning(f"[Cast Vote] Rejected: user {user_id} not found")
             return jsonify({"error": "User not found"}), 404
         
         # ENFORCE IDENTITY VERIFICATION - Users must verify their identity before voting
         if not user.get('identity_verified', False):
-            print(f"[Cast Vote] BLOCKED: User {user_id} has not completed identity verification")
+            logger.warning(f"[Cast Vote] BLOCKED: User {user_id} has not completed identity verification")
             return jsonify({
                 "error": "Identity verification required",
                 "message": "You must complete identity verification before you can vote. Please verify your identity first."
             }), 403
         
-        # Check if user has already voted
-        existing_vote = votes_collection.find_one({'user_id': user_id})
+        # Already voted? Checked before the attempt is counted, so a rejected
+        # second vote does not touch the voter's aggregates. Kiosk retries
+        # resend the same key and get the original transaction back
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        existing_vote = votes_collection.find_one(
+            {'user_id': user_id},
+            {'_id': 0, 'transaction_id': 1, 'idempotency_key': 1, 'fraud_risk_level': 1}
+        )
         if existing_vote:
-            print(f"[Cast Vote] ERROR: User already voted")
-            return jsonify({"error": "You have already voted"}), 400
+            return _replay_or_reject_vote(existing_vote, idempotency_key)
         
         # FRAUD DETECTION - Collect behavior data and assess risk
         session_id = request.cookies.get('session_id', str(uuid.uuid4()))
         behavior_tracker = get_behavior_tracker()
         fraud_detector = get_fraud_detector()
+        voter_feature_store = get_voter_feature_store()
+        attempt_time = datetime.utcnow()
+        
+        # Count this attempt and get the voter's rolling history aggregates
+        # (state before the attempt) in one point update
+        historical_data = voter_feature_store.record_attempt(user_id, attempt_time)
         
         # Collect request metadata
         request_data = {
@@ -1324,7 +1409,7 @@ def cast_vote():
         
         # Prepare vote attempt data
         vote_attempt_data = {
-            'timestamp': datetime.utcnow(),
+            'timestamp': attempt_time,
             'ip_address': request.remote_addr,
             'user_agent': request.headers.get('User-Agent', ''),
             'is_mobile': 'mobile' in request.headers.get('User-Agent', '').lower(),
@@ -1332,13 +1417,10 @@ def cast_vote():
             'page_views': data.get('page_views', 0),
             'time_on_page': data.get('time_on_page', 0),
             'login_attempts': data.get('login_attempts', 1),
-            'votes_in_last_hour': behavior_tracker.get_recent_votes(user_id, hours=1),
+            'votes_in_last_hour': historical_data.votes_since(attempt_time - timedelta(hours=1)),
             'identity_verified': voter_data['identity_verified']
         }
         
-        # Get historical behavior
-        historical_data = behavior_tracker.get_voter_history(user_id, days=30)
-        
         # Track vote attempt
         behavior_tracker.track_vote_attempt(user_id, session_id, vote_attempt_data, request_data)
         
@@ -1348,10 +1430,7 @@ def cast_vote():
         )
 
         # Override for first-time voters to prevent unfair blocking
-        try:
-            previous_count = votes_collection.count_documents({'user_id': user_id})
-        except Exception:
-            previous_count = 0
+        previous_count = len(historical_data)
         is_new_voter = previous_count == 0
         if is_new_voter:
             # Downgrade risk to low and allow
@@ -1362,12 +1441,14 @@ def cast_vote():
         # Store fraud assessment
         behavior_tracker.store_fraud_assessment(fraud_assessment)
         
-        print(f"[Fraud Detection] Risk: {fraud_assessment['risk_level']} "
-              f"(probability: {fraud_assessment['fraud_probability']:.4f})")
+        logger.debug(f"[Fraud Detection] Risk: {fraud_assessment['risk_level']} "
+                     f"(probability: {fraud_assessment['fraud_probability']:.4f})")
         
         # Block high-risk votes (not for first-time voters)
         if fraud_assessment['recommended_action'] == 'block' and not is_new_voter:
-            print(f"[Cast Vote] BLOCKED: High fraud risk detected")
+            logger.warning(f"[Cast Vote] Blocked: high fraud risk for {user_id}",
+                           extra={'event': 'vote_blocked', 'user_id': user_id,
+                                  'fraud_probability': fraud_assessment['fraud_probability']})
             return jsonify({
                 "error": "Vote blocked due to security concerns. Please contact support.",
                 "fraud_risk": fraud_assessment['risk_level'],
@@ -1391,14 +1472,32 @@ def cast_vote():
             'fraud_risk_level': fraud_assessment['risk_level'],
             'flagged_for_review': flagged_for_review
         }
+        if idempotency_key:
+            vote_record['idempotency_key'] = idempotency_key
         
-        result = votes_collection.insert_one(vote_record)
+        # Insert the vote and bump the materialized tallies in the same write path;
+        # the unique index on user_id makes this the authoritative double-vote check
+        try:
+            result = get_tally_store().record_vote(vote_record)
+        except DuplicateKeyError:
+            existing_vote = votes_collection.find_one(
+                {'user_id': user_id},
+                {'_id': 0, 'transaction_id': 1, 'idempotency_key': 1, 'fraud_risk_level': 1}
+            ) or {}
+            return _replay_or_reject_vote(existing_vote, idempotency_key)
+        response_cache.invalidate_for('vote_cast')
+        try:
+            voter_feature_store.record_vote(user_id, request.remote_addr, request.headers.get('User-Agent', ''),
+                                            vote_record['timestamp'])
+        except Exception as _e:
+            # Counted by the store and repaired from the votes collection later
+            logger.exception(f"[Cast Vote] Voter feature update failed: {_e}")
         
-        print(f"[Cast Vote] SUCCESS: Vote saved")
-        print(f"[Cast Vote] Record: {vote_record}")
-        print(f"[Cast Vote] Inserted ID: {result.inserted_id}, transaction_id: {transaction_id}")
-        print(f"[Cast Vote] Total votes in DB now: {votes_collection.count_documents({})}")
-        print(f"{'='*60}\n")
+        logger.info("[Cast Vote] Vote saved", extra={
+            'event': 'vote_cast', 'vote_id': str(result.inserted_id), 'transaction_id': transaction_id,
+            'precinct': precinct,
+            'risk_level': fraud_assessment['risk_level'], 'fraud_probability': fraud_assessment['fraud_probability']
+        })
         
         response_data = {
             "message": "Vote cast successfully",
@@ -1411,45 +1510,291 @@ def cast_vote():
         
         # Append this vote to local CSV dataset for model training
         try:
-            dataset_path = os.path.join(os.path.dirname(__file__), 'voting_fraud_dataset.csv')
-            # Derive feature values consistent with dataset columns
-            voter_code = f"V{str(hash(user_id) % 10000).zfill(4)}"
-            device_code = f"DV{str(hash(request.headers.get('User-Agent', '')) % 10000)}"
-            ip_addr = request.remote_addr or '0.0.0.0'
-            login_attempts = vote_attempt_data.get('login_attempts', 1)
-            vote_duration = vote_attempt_data.get('session_duration', 0)
-            # Location match: 1 for first vote or if IP seen before
-            historical_ips = [h.get('ip_address', '') for h in historical_data] if historical_data else []
-            location_match = 1 if (is_new_voter or (ip_addr in historical_ips)) else 0
-            prev_votes = previous_count
-            is_fraud_label = 0  # Non-fraud for successful, allowed vote
-
-            # Append row
-            import csv as _csv
-            # Ensure file exists with header; create if missing
-            if not os.path.exists(dataset_path):
-                with open(dataset_path, 'w', newline='', encoding='utf-8') as f:
-                    writer = _csv.writer(f)
-                    writer.writerow(['voter_id','age','ip_address','device_id','login_attempts','vote_duration_sec','location_match','previous_votes','is_fraud'])
-            with open(dataset_path, 'a', newline='', encoding='utf-8') as f:
-                writer = _csv.writer(f)
-                writer.writerow([voter_code, voter_data['age'], ip_addr, device_code, login_attempts, vote_duration, location_match, prev_votes, is_fraud_label])
+            dataset_appender.append(_training_dataset_row(
+                user_id, voter_data['age'], request.remote_addr, request.headers.get('User-Agent', ''),
+                vote_attempt_data, historical_data, is_new_voter, previous_count
+            ))
         except Exception as _e:
-            print(f"[Cast Vote] Dataset append failed: {_e}")
+            logger.exception(f"[Cast Vote] Dataset append failed: {_e}")
 
         return jsonify(response_data), 200
     except Exception as e:
-        print(f"[Cast Vote] ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"[Cast Vote] ERROR: {e}")
         return jsonify({"error": f"Vote failed: {str(e)}"}), 500
 
+BULK_VOTES_MAX = 1000
+
+def _parse_vote_timestamp(value):
+    """Offline votes carry the time they were cast; default to now"""
+    if not value:
+        return datetime.utcnow()
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@app.route('/api/admin/votes/bulk', methods=['POST'])
+@jwt_required()
+def admin_bulk_votes():
+    """
+    Ingest a batch of votes collected offline by a precinct kiosk
+
+    Body: {"votes": [{"username", "candidate", "precinct", "timestamp", "idempotency_key",
+                      "session_duration", "page_views", "time_on_page", "login_attempts",
+                      "ip_address", "user_agent"}, ...]}
+
+    Returns one result per input vote, in input order.
+    """
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        if not mongodb_available or votes_collection is None or users_collection is None:
+            return jsonify({"error": "Database unavailable"}), 503
+
+        data = request.get_json(silent=True) or {}
+        items = data.get('votes')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "Request body must contain a non-empty 'votes' list"}), 400
+        if len(items) > BULK_VOTES_MAX:
+            return jsonify({"error": f"At most {BULK_VOTES_MAX} votes per batch"}), 400
+
+        results = [{'index': index, 'status': 'rejected'} for index in range(len(items))]
+        usernames = list({str(item['username']) for item in items
+                          if isinstance(item, dict) and item.get('username')})
+
+        # One query each for the users and their existing votes
+        users = {u['username']: u for u in users_collection.find({'username': {'$in': usernames}})}
+        existing_votes = {v['user_id']: v for v in votes_collection.find(
+            {'user_id': {'$in': usernames}},
+            {'_id': 0, 'user_id': 1, 'transaction_id': 1, 'idempotency_key': 1, 'fraud_risk_level': 1}
+        )}
+
+        pending = []
+        seen = set()
+        for index, item in enumerate(items):
+            result = results[index]
+            if not isinstance(item, dict):
+                result['error'] = 'Vote must be an object'
+                continue
+            username = item.get('username')
+            candidate = item.get('candidate') or item.get('candidate_id')
+            result['username'] = username
+            if not username or not candidate:
+                result['error'] = 'Missing username or candidate'
+                continue
+            username = str(username)
+            user = users.get(username)
+            if user is None:
+                result['error'] = 'User not found'
+                continue
+            if not user.get('identity_verified', False):
+                result['error'] = 'Identity verification required'
+                continue
+            existing_vote = existing_votes.get(username)
+            if existing_vote is not None:
+                if item.get('idempotency_key') and existing_vote.get('idempotency_key') == item.get('idempotency_key'):
+                    result.update({'status': 'duplicate', 'transaction_id': existing_vote.get('transaction_id'),
+                                   'fraud_risk_level': existing_vote.get('fraud_risk_level')})
+                else:
+                    result['error'] = 'You have already voted'
+                continue
+            if username in seen:
+                result['error'] = 'Duplicate vote for this user in batch'
+                continue
+            try:
+                timestamp = _parse_vote_timestamp(item.get('timestamp'))
+            except ValueError:
+                result['error'] = 'Invalid timestamp'
+                continue
+            seen.add(username)
+            pending.append((index, item, user, timestamp))
+
+        voters, attempts, tracked = [], [], []
+        for index, item, user, timestamp in pending:
+            user_agent = item.get('user_agent') or request.headers.get('User-Agent', '')
+            ip_address = item.get('ip_address') or request.remote_addr
+            session_id = item.get('session_id') or str(uuid.uuid4())
+            voter_data = {
+                'voter_id': user['username'],
+                'age': user.get('age', 0),
+                'registration_date': user.get('created_at', datetime.utcnow()),
+                'identity_verified': user.get('identity_verified', False),
+                'mfa_type': user.get('mfa_type', 'none')
+            }
+            vote_attempt_data = {
+                'timestamp': timestamp,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'is_mobile': 'mobile' in user_agent.lower(),
+                'session_duration': item.get('session_duration', 0),
+                'page_views': item.get('page_views', 0),
+                'time_on_page': item.get('time_on_page', 0),
+                'login_attempts': item.get('login_attempts', 1),
+                'votes_in_last_hour': 0,
+                'identity_verified': voter_data['identity_verified']
+            }
+            voters.append(voter_data)
+            attempts.append(vote_attempt_data)
+            tracked.append({
+                'user_id': user['username'],
+                'session_id': session_id,
+                'vote_attempt_data': vote_attempt_data,
+                'request_data': {'ip_address': ip_address, 'user_agent': user_agent,
+                                 'session_id': session_id, 'source': 'bulk'}
+            })
+
+        # None of these voters has a vote yet, so every history is empty
+        histories = [[] for _ in pending]
+        assessments = get_fraud_detector().assess_batch(voters, attempts, histories) if pending else []
+
+        vote_records, record_positions, dataset_rows = [], [], []
+        for position, ((index, item, user, timestamp), assessment) in enumerate(zip(pending, assessments)):
+            # Same first-time voter override as cast_vote
+            assessment['risk_level'] = 'low'
+            assessment['recommended_action'] = 'allow'
+            assessment['fraud_probability'] = min(assessment.get('fraud_probability', 0.0), 0.2)
+
+            transaction_id = str(uuid.uuid4())
+            vote_record = {
+                'user_id': user['username'],
+                'candidate': item.get('candidate') or item.get('candidate_id'),
+                'precinct': item.get('precinct'),
+                'transaction_id': transaction_id,
+                'timestamp': timestamp,
+                'verified': True,
+                'fraud_score': assessment['fraud_probability'],
+                'fraud_risk_level': assessment['risk_level'],
+                'flagged_for_review': assessment['recommended_action'] == 'review',
+                'source': 'bulk'
+            }
+            if item.get('idempotency_key'):
+                vote_record['idempotency_key'] = item['idempotency_key']
+            vote_records.append(vote_record)
+            record_positions.append(index)
+            dataset_rows.append(_training_dataset_row(
+                user['username'], voters[position]['age'], attempts[position]['ip_address'],
+                attempts[position]['user_agent'], attempts[position], VoterHistorySummary(), True, 0
+            ))
+
+        behavior_tracker = get_behavior_tracker()
+        behavior_tracker.track_vote_attempts(tracked)
+        behavior_tracker.store_fraud_assessments(assessments)
+        failed = get_tally_store().record_votes(vote_records)
+        try:
+            get_voter_feature_store().record_votes([
+                {'user_id': vote_record['user_id'], 'ip_address': attempts[position]['ip_address'],
+                 'user_agent': attempts[position]['user_agent'], 'timestamp': vote_record['timestamp']}
+                for position, vote_record in enumerate(vote_records) if position not in failed
+            ])
+        except Exception as e:
+            logger.exception(f"[Bulk Votes] Voter feature update failed: {e}")
+
+        for position, (index, vote_record) in enumerate(zip(record_positions, vote_records)):
+            result = results[index]
+            if position in failed:
+                result['error'] = 'You have already voted' if failed[position] == 'duplicate' else failed[position]
+                continue
+            result.update({
+                'status': 'accepted',
+                'transaction_id': vote_record['transaction_id'],
+                'fraud_risk_level': vote_record['fraud_risk_level'],
+                'flagged_for_review': vote_record['flagged_for_review']
+            })
+            dataset_appender.append(dataset_rows[position])
+
+        accepted = sum(1 for r in results if r['status'] == 'accepted')
+        if accepted:
+            response_cache.invalidate_for('vote_cast')
+        logger.info(f"[Bulk Votes] {accepted}/{len(items)} accepted")
+
+        return jsonify({
+            'total': len(items),
+            'accepted': accepted,
+            'duplicates': sum(1 for r in results if r['status'] == 'duplicate'),
+            'rejected': sum(1 for r in results if r['status'] == 'rejected'),
+            'results': results
+        }), 200
+    except Exception as e:
+        logger.exception(f"[Bulk Votes] ERROR: {e}")
+        return jsonify({"error": f"Bulk ingestion failed: {str(e)}"}), 500
+
+VOTES_PAGE_DEFAULT = 100
+VOTES_PAGE_MAX = 1000
+
+def _encode_votes_cursor(vote):
+    """Opaque keyset cursor pointing just past this vote in (timestamp, _id) order"""
+    payload = json.dumps({'ts': vote['timestamp'].isoformat(), 'id': str(vote['_id'])})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def _decode_votes_cursor(token):
+    payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+    return datetime.fromisoformat(payload['ts']), ObjectId(payload['id'])
+
+def _serialize_vote(vote):
+    vote = dict(vote)
+    vote.pop('_id', None)
+    # The key a kiosk retried with is a replay credential, not vote data
+    vote.pop('idempotency_key', None)
+    if hasattr(vote.get('timestamp'), 'isoformat'):
+        vote['timestamp'] = vote['timestamp'].isoformat()
+    return vote
+
 @app.route('/api/votes', methods=['GET'])
 @jwt_required()
 def get_votes():
+    """
+    List votes in (timestamp, _id) order
+
+    Query params:
+        limit: page size (default 100, max 1000)
+        cursor: next_cursor from the previous page
+        format: 'ndjson' streams every vote after the cursor, one JSON document per line
+    """
     try:
-        votes = list(votes_collection.find({}, {'_id': 0}))
-        return jsonify(votes), 200
+        if not mongodb_available or votes_collection is None:
+            return jsonify({"error": "Database unavailable"}), 503
+
+        query = {}
+        cursor_token = request.args.get('cursor')
+        if cursor_token:
+            try:
+                after_ts, after_id = _decode_votes_cursor(cursor_token)
+            except Exception:
+                return jsonify({"error": "Invalid cursor"}), 400
+            query = {'$or': [
+                {'timestamp': {'$gt': after_ts}},
+                {'timestamp': after_ts, '_id': {'$gt': after_id}}
+            ]}
+        sort = [('timestamp', 1), ('_id', 1)]
+
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                cursor = votes_collection.find(query).sort(sort).batch_size(VOTES_PAGE_MAX)
+                try:
+                    for vote in cursor:
+                        yield json.dumps(_serialize_vote(vote), default=str) + '\n'
+                finally:
+                    cursor.close()
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson'), 200
+
+        try:
+            limit = int(request.args.get('limit', VOTES_PAGE_DEFAULT))
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        limit = max(1, min(limit, VOTES_PAGE_MAX))
+
+        # Fetch one extra document to learn whether another page exists
+        page = list(votes_collection.find(query).sort(sort).limit(limit + 1))
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = _encode_votes_cursor(page[-1]) if has_more else None
+
+        return jsonify({
+            'votes': [_serialize_vote(vote) for vote in page],
+            'count': len(page),
+            'next_cursor': next_cursor
+        }), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1465,35 +1810,25 @@ def verify_vote(transaction_id):
 
 @app.route('/api/statistics', methods=['GET'])
 @jwt_required()
+@response_cache.cached('statistics')
 def get_statistics():
     try:
         if not mongodb_available or votes_collection is None or users_collection is None:
             return jsonify({"error": "Database unavailable"}), 503
         
-        total_votes = votes_collection.count_documents({})
+        tally = get_tally_store().load()
+        total_votes = tally.total
         total_registered = users_collection.count_documents({'role': 'voter'})
         total_verified = users_collection.count_documents({'role': 'voter', 'identity_verified': True})
         total_unverified = total_registered - total_verified
         
         # Count votes by candidate (handle both old and new names for backward compatibility)
-        candidate_a_votes = votes_collection.count_documents({'candidate': {'$in': ['Congress', 'Candidate A']}})
-        candidate_b_votes = votes_collection.count_documents({'candidate': {'$in': ['BJP', 'Candidate B']}})
-        
-        # Get all votes for debugging
-        all_votes = list(votes_collection.find({}, {'_id': 0, 'candidate': 1}))
-        print(f"[Statistics] Total votes in DB: {total_votes}")
-        print(f"[Statistics] All votes: {all_votes}")
-        print(f"[Statistics] Congress (incl. old 'Candidate A') Votes: {candidate_a_votes}")
-        print(f"[Statistics] BJP (incl. old 'Candidate B') Votes: {candidate_b_votes}")
-        print(f"[Statistics] Total registered voters: {total_registered}")
-        print(f"[Statistics] Identity verified voters: {total_verified}")
-        print(f"[Statistics] Unverified voters: {total_unverified}")
+        candidate_a_votes = tally.candidate_votes('Congress')
+        candidate_b_votes = tally.candidate_votes('BJP')
         
         # Calculate turnout percentage (based on verified voters, since only they can vote)
         turnout_of_verified = (total_votes / total_verified * 100) if total_verified > 0 else 0
         turnout_of_all = (total_votes / total_registered * 100) if total_registered > 0 else 0
-        print(f"[Statistics] Turnout (verified voters): {turnout_of_verified}%")
-        print(f"[Statistics] Turnout (all registered): {turnout_of_all}%")
         
         # Get dataset summary for suspicious precinct calculation
         dataset_summary = load_fraud_dataset_summary()
@@ -1511,32 +1846,28 @@ def get_statistics():
                 dataset_suspicious_precincts = 1
         
         # Get precinct votes from live voting
-        precincts = ['Precinct 1', 'Precinct 2', 'Precinct 3']
         precinct_votes = {}
-        total_precincts = len(precincts)
+        total_precincts = len(PRECINCTS)
         live_suspicious_precincts = 0
         
-        for precinct in precincts:
-            precinct_vote_count = votes_collection.count_documents({'precinct': precinct})
+        for precinct_summary in summarize_precincts(tally, PRECINCTS):
+            precinct = precinct_summary['name']
+            precinct_vote_count = precinct_summary['total_votes']
             precinct_votes[precinct] = precinct_vote_count
-            print(f"[Statistics] {precinct}: {precinct_vote_count} votes")
             
             # Check for suspicious activity in live votes
             if precinct_vote_count > 0:
-                precinct_a = votes_collection.count_documents({'precinct': precinct, 'candidate': {'$in': ['Congress', 'Candidate A']}})
-                precinct_b = votes_collection.count_documents({'precinct': precinct, 'candidate': {'$in': ['BJP', 'Candidate B']}})
+                precinct_a = precinct_summary['candidate_a_votes']
+                precinct_b = precinct_summary['candidate_b_votes']
                 max_votes = max(precinct_a, precinct_b)
                 ratio = max_votes / precinct_vote_count if precinct_vote_count > 0 else 0
-                print(f"  → Congress: {precinct_a}, BJP: {precinct_b}, Max ratio: {ratio:.2%}")
                 # Flag if one candidate has >95% of votes
                 if ratio > 0.95:
                     live_suspicious_precincts += 1
-                    print(f"  → SUSPICIOUS (ratio {ratio:.2%} > 95%)")
+                    logger.debug(f"[Statistics] {precinct} suspicious (ratio {ratio:.2%} > 95%)")
         
         # Combine dataset and live suspicious precincts
         total_suspicious_precincts = dataset_suspicious_precincts + live_suspicious_precincts
-        print(f"[Statistics] Live suspicious precincts: {live_suspicious_precincts}")
-        print(f"[Statistics] Dataset suspicious precincts: {dataset_suspicious_precincts}")
         
         response = {
             'total_votes': total_votes,
@@ -1554,18 +1885,17 @@ def get_statistics():
             'dataset_suspicious_precincts': dataset_suspicious_precincts,
             'precinct_votes': precinct_votes
         }
-        print(f"[Statistics] Suspicious precincts - Dataset: {dataset_suspicious_precincts}, Live: {live_suspicious_precincts}, Total: {total_suspicious_precincts}")
-        print(f"[Statistics] Response data: {response}")
+        logger.debug(f"[Statistics] votes={total_votes}, registered={total_registered}, verified={total_verified}, "
+                     f"suspicious precincts dataset={dataset_suspicious_precincts} live={live_suspicious_precincts}")
         return jsonify(response), 200
     except Exception as e:
-        print(f"[Statistics] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"[Statistics] Error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/api/precinct-status', methods=['GET'])
 @jwt_required()
+@response_cache.cached('precinct_status')
 def get_precinct_status():
     """Get live precinct voting status based on current vote counts"""
     try:
@@ -1573,21 +1903,17 @@ def get_precinct_status():
             return jsonify({"error": "Database unavailable"}), 503
         
         # Define precincts
-        precincts = ['Precinct 1', 'Precinct 2', 'Precinct 3']
+        precincts = PRECINCTS
         precinct_data = []
         
-        print(f"\n{'='*60}")
-        print(f"[Precinct Status] Calculating live precinct status...")
         
-        for precinct in precincts:
-            # Count votes in this precinct
-            precinct_total_votes = votes_collection.count_documents({'precinct': precinct})
-            precinct_candidate_a = votes_collection.count_documents({'precinct': precinct, 'candidate': {'$in': ['Congress', 'Candidate A']}})
-            precinct_candidate_b = votes_collection.count_documents({'precinct': precinct, 'candidate': {'$in': ['BJP', 'Candidate B']}})
-            
-            # Calculate precinct turnout (get unique voters)
-            unique_voters = votes_collection.distinct('user_id', {'precinct': precinct})
-            precinct_unique_voters = len(unique_voters)
+        tally = get_tally_store().load()
+        for precinct_summary in summarize_precincts(tally, precincts):
+            precinct = precinct_summary['name']
+            precinct_total_votes = precinct_summary['total_votes']
+            precinct_candidate_a = precinct_summary['candidate_a_votes']
+            precinct_candidate_b = precinct_summary['candidate_b_votes']
+            precinct_unique_voters = precinct_summary['unique_voters']
             
             # Determine leading candidate
             if precinct_candidate_a > precinct_candidate_b:
@@ -1631,20 +1957,15 @@ def get_precinct_status():
             
             precinct_data.append(precinct_info)
             
-            print(f"[Precinct Status] {precinct}:")
-            print(f"  Votes: {precinct_total_votes} | A: {precinct_candidate_a} | B: {precinct_candidate_b}")
-            print(f"  Leading: {leading_candidate} (margin: {lead_margin})")
-            print(f"  Status: {status} | Suspicious: {suspicious}")
+            logger.debug(f"[Precinct Status] {precinct}: votes={precinct_total_votes} A={precinct_candidate_a} "
+                         f"B={precinct_candidate_b} leading={leading_candidate} status={status} suspicious={suspicious}")
         
         # Calculate overall precinct statistics
         total_precincts = len(precincts)
         active_precincts = sum(1 for p in precinct_data if p['status'] == 'Active')
         suspicious_precincts = sum(1 for p in precinct_data if p['suspicious'])
         
-        print(f"[Precinct Status] Total precincts: {total_precincts}")
-        print(f"[Precinct Status] Active precincts: {active_precincts}")
-        print(f"[Precinct Status] Suspicious precincts: {suspicious_precincts}")
-        print(f"{'='*60}\n")
+        logger.debug(f"[Precinct Status] total={total_precincts}, active={active_precincts}, suspicious={suspicious_precincts}")
         
         response = {
             'precincts': precinct_data,
@@ -1657,14 +1978,13 @@ def get_precinct_status():
         return jsonify(response), 200
     
     except Exception as e:
-        print(f"[Precinct Status] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"[Precinct Status] Error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/api/admin/user-stats', methods=['GET'])
 @jwt_required()
+@response_cache.cached('user_stats')
 def admin_user_stats():
     try:
         claims = get_jwt()
@@ -1680,10 +2000,10 @@ def admin_user_stats():
             verified_voters = users_collection.count_documents({'role': 'voter', 'identity_verified': True})
             total_attempts = login_otp_collection.count_documents({})
             
-            print(f"[Admin Stats] MongoDB - total_users={total_users}, total_voters={total_voters}, total_candidates={total_candidates}, verified_voters={verified_voters}")
+            logger.debug(f"[Admin Stats] MongoDB - total_users={total_users}, total_voters={total_voters}, total_candidates={total_candidates}, verified_voters={verified_voters}")
         else:
             # Fallback: return default stats when MongoDB is unavailable
-            print("[Admin Stats] MongoDB unavailable - returning default stats")
+            logger.warning("[Admin Stats] MongoDB unavailable - returning default stats")
             total_users = 0
             total_voters = 0
             total_candidates = 0
@@ -1771,145 +2091,170 @@ def admin_security_logs():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _queue_training_job(source):
+    """
+    Queue a background training job and answer 202 with where to poll for it
+
+    Optional body: {"mode": "incremental", "new_trees", "max_trees", "window", "compare_full"}
+    adds trees fitted on recent records to the current model instead of a full retrain.
+    A full retrain fits the served model profile, or {"profiles": ["full", "tiny", ...]}.
+    {"mode": "search", "time_budget_s", "max_candidates", "folds", "max_cores",
+    "cores_per_candidate"} searches hyperparameters first and fits the winner.
+    """
+    options = request.get_json(silent=True) or {}
+    try:
+        if options.get('mode') == 'incremental':
+            params = {'incremental': incremental_params(options)}
+        elif options.get('mode') == 'search':
+            params = {'search': search_params(options)}
+        else:
+            params = {'profiles': training_profiles(options.get('profiles'))}
+        job = get_training_jobs().submit(source, params, requested_by=get_jwt_identity())
+    except (ValueError, RuntimeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "message": "Training job queued",
+        "job_id": job['_id'],
+        "status": job['status'],
+        "status_url": f"/api/admin/training-jobs/{job['_id']}"
+    }), 202
+
 @app.route('/api/admin/train-rf', methods=['POST'])
 @jwt_required()
 def admin_train_rf():
+    """Train the RF model on exported vote attempts, as a background job"""
     try:
         claims = get_jwt()
         if claims.get('role') != 'admin':
             return jsonify({"error": "Admin access required"}), 403
+        return _queue_training_job('behavior')
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Optional timeframe from payload
-        data = request.get_json(silent=True) or {}
-        days = int(data.get('days', 30))
+@app.route('/api/admin/train-rf-from-csv', methods=['POST'])
+@jwt_required()
+def admin_train_rf_from_csv():
+    """Train RF model using the voting_fraud_dataset.csv file, as a background job"""
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        return _queue_training_job('csv')
+    except Exception as e:
+        logger.exception(f"[Train RF from CSV] Error: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        behavior_tracker = get_behavior_tracker()
-        rf_service = get_rf_service()
-        if rf_service is None:
-            return jsonify({"error": "RF service not initialized"}), 500
+@app.route('/api/admin/train-rf-from-db', methods=['POST'])
+@jwt_required()
+def admin_train_rf_from_db():
+    """Train RF model using fraud_training_data from database, as a background job"""
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        return _queue_training_job('db')
+    except Exception as e:
+        logger.exception(f"[Train RF from DB] Error: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        # Export vote attempts with optional labeling
-        training_records = behavior_tracker.export_training_data(
-            labeled_only=False
-        )
-        if not training_records:
-            return jsonify({"error": "No training data available"}), 400
+@app.route('/api/admin/training-jobs', methods=['GET'])
+@jwt_required()
+def admin_training_jobs():
+    """Most recent training jobs, newest first"""
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        limit = min(int(request.args.get('limit', 20)), 100)
+        return jsonify([serialize_job(job) for job in get_training_jobs().list(limit)]), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Train and persist model
-        metrics = rf_service.train_and_save(training_records)
+@app.route('/api/admin/training-jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def admin_training_job_status(job_id):
+    """Status, progress, and (once finished) metrics or error of one training job"""
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        job = get_training_jobs().get(job_id)
+        if job is None:
+            return jsonify({"error": "Training job not found"}), 404
+        return jsonify(serialize_job(job)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        return jsonify({
-            "message": "Random Forest model trained and saved",
-            "metrics": metrics
-        }), 200
+@app.route('/api/admin/training-jobs/<job_id>/cancel', methods=['POST'])
+@jwt_required()
+def admin_cancel_training_job(job_id):
+    """Cancel a queued job or stop a running one; the current model stays in place"""
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
+        job = get_training_jobs().cancel(job_id)
+        if job is None:
+            return jsonify({"error": "Training job not found"}), 404
+        return jsonify(serialize_job(job)), 202 if job['status'] == 'running' else 200
     except Exception as e:
-        import traceback
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/admin/train-rf-from-csv', methods=['POST'])
+@app.route('/api/admin/tallies/reconcile', methods=['POST'])
 @jwt_required()
-def admin_train_rf_from_csv():
-    """Train RF model using the voting_fraud_dataset.csv file"""
+def admin_reconcile_tallies():
+    """Rebuild the materialized vote tallies from the votes collection and report drift"""
     try:
         claims = get_jwt()
         if claims.get('role') != 'admin':
             return jsonify({"error": "Admin access required"}), 403
-        
-        from random_forest_fraud import load_voting_fraud_dataset, get_rf_service
-        
-        # Load dataset from CSV
-        dataset_records = load_voting_fraud_dataset()
-        
-        if not dataset_records:
-            return jsonify({"error": "Failed to load dataset from CSV"}), 400
-        
-        print(f"[Train RF from CSV] Loaded {len(dataset_records)} records from CSV")
-        
-        # Train model
-        rf_service = get_rf_service()
-        if rf_service is None:
-            return jsonify({"error": "RF service not initialized"}), 500
-        
-        metrics = rf_service.train_and_save(dataset_records)
-        
-        return jsonify({
-            "message": "Random Forest model trained from CSV dataset",
-            "records_used": len(dataset_records),
-            "metrics": metrics
-        }), 200
-        
+
+        tally_store = get_tally_store()
+        if tally_store is None:
+            return jsonify({"error": "Database unavailable"}), 503
+
+        data = request.get_json(silent=True) or {}
+        report = tally_store.reconcile(dry_run=bool(data.get('dry_run', False)))
+        if report['applied']:
+            response_cache.invalidate_for('tallies_reconciled')
+        logger.info(f"[Reconcile Tallies] Drift in {report['drift_count']} counter(s), applied={report['applied']}")
+        return jsonify(report), 200
     except Exception as e:
-        print(f"[Train RF from CSV] Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error(f"[Reconcile Tallies] Error: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/admin/train-rf-from-db', methods=['POST'])
+@app.route('/api/admin/cache-stats', methods=['GET'])
 @jwt_required()
-def admin_train_rf_from_db():
-    """Train RF model using fraud_training_data from database"""
+def admin_cache_stats():
+    """Response and user cache hit/miss counters for sizing TTLs and capacity"""
     try:
         claims = get_jwt()
         if claims.get('role') != 'admin':
             return jsonify({"error": "Admin access required"}), 403
-        
-        from random_forest_fraud import get_rf_service
-        
-        # Get training data from database
-        training_collection = db['fraud_training_data']
-        dataset_records = list(training_collection.find({}, {'_id': 0}))
-        
-        if not dataset_records:
-            return jsonify({"error": "No training data found in database. Run load_dataset_to_db.py first"}), 400
-        
-        print(f"[Train RF from DB] Loaded {len(dataset_records)} records from database")
-        
-        # Normalize label field: map 'fraud_label' -> 'is_fraud' if needed
-        label_mapped = 0
-        for record in dataset_records:
-            if 'is_fraud' not in record and 'fraud_label' in record:
-                record['is_fraud'] = record['fraud_label']
-                label_mapped += 1
-        if label_mapped:
-            print(f"[Train RF from DB] Mapped label for {label_mapped} records (fraud_label -> is_fraud)")
 
-        # Convert MongoDB objects to JSON-serializable format
-        for record in dataset_records:
-            if 'timestamp' in record and hasattr(record['timestamp'], 'isoformat'):
-                record['timestamp'] = record['timestamp'].isoformat()
-        
-        # Train model
-        rf_service = get_rf_service()
-        if rf_service is None:
-            return jsonify({"error": "RF service not initialized"}), 500
-        
-        metrics = rf_service.train_and_save(dataset_records)
+        stats = response_cache.stats()
+        stats['user_cache'] = get_user_resolver().stats()
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        # Persist latest training metrics
-        try:
-            model_metrics_col = db['model_metrics']
-            metrics_doc = {
-                'model': 'random_forest',
-                'trained_at': datetime.utcnow(),
-                'records_used': len(dataset_records),
-                'metrics': metrics,
-            }
-            model_metrics_col.update_one({'model': 'random_forest'}, {'$set': metrics_doc}, upsert=True)
-            print("[Train RF from DB] Metrics persisted to model_metrics collection")
-        except Exception as me:
-            print(f"[Train RF from DB] Warning: failed to persist metrics: {me}")
+@app.route('/api/admin/fraud-scoring-stats', methods=['GET'])
+@jwt_required()
+def admin_fraud_scoring_stats():
+    """Scoring pool queue depth, timeouts and rule fallback rate, and voter feature update failures"""
+    try:
+        claims = get_jwt()
+        if claims.get('role') != 'admin':
+            return jsonify({"error": "Admin access required"}), 403
 
-        return jsonify({
-            "message": "Random Forest model trained from database",
-            "records_used": len(dataset_records),
-            "metrics": metrics
-        }), 200
-        
+        scoring_pool = get_scoring_pool()
+        if scoring_pool is None:
+            stats = {"running": False, "message": "Scoring pool disabled; votes are scored in-process"}
+        else:
+            stats = scoring_pool.metrics()
+        stats['voter_features'] = get_voter_feature_store().stats()
+        return jsonify(stats), 200
     except Exception as e:
-        print(f"[Train RF from DB] Error: {e}")
-        import traceback
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/admin/model-status', methods=['GET'])
@@ -1935,14 +2280,23 @@ def admin_model_status():
                     'roc_auc': mdoc.get('metrics', {}).get('roc_auc'),
                     'pr_auc': mdoc.get('metrics', {}).get('pr_auc'),
                     'n_train': mdoc.get('metrics', {}).get('n_train'),
-                    'n_test': mdoc.get('metrics', {}).get('n_test')
+                    'n_test': mdoc.get('metrics', {}).get('n_test'),
+                    'profile': mdoc.get('profile'),
+                    'search_winner': (mdoc.get('metrics', {}).get('search') or {}).get('winner'),
+                    # Accuracy, per-vote latency and size of each profile, to pick RF_MODEL_PROFILE
+                    'profiles': {
+                        name: {k: (v.isoformat() if hasattr(v, 'isoformat') else v) for k, v in p.items()}
+                        for name, p in (mdoc.get('profiles') or {}).items()
+                    }
                 }
         except Exception as e:
-            print(f"[Model Status] Warning: failed to read model metrics: {e}")
+            logger.warning(f"[Model Status] Failed to read model metrics: {e}")
 
         model_info = {
             'rf_service_ready': rf_service.is_ready() if rf_service else False,
             'model_path': rf_service.artifacts.model_path if rf_service else None,
+            'model_version': rf_service.version if rf_service else None,
+            'model_profile': rf_service.profile if rf_service else None,
             'model_type': fraud_detector.model_source if fraud_detector else 'unknown',
             'features_count': len(rf_service.model.features) if rf_service and rf_service.is_ready() else 0,
             'features': rf_service.model.features if rf_service and rf_service.is_ready() else [],
@@ -1999,24 +2353,43 @@ def fraud_analytics():
             'flagged_votes': flagged_votes
         }), 200
     except Exception as e:
-        print(f"Fraud analytics error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Fraud analytics error: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/admin/export-training-data', methods=['GET'])
 @jwt_required()
 def export_training_data():
-    """Export voter behavior data for model training"""
+    """
+    Export voter behavior data for model training
+
+    Query params:
+        format: 'json' (default, one document), or 'ndjson', 'csv', 'parquet'
+            streamed from the cursor in constant memory
+        compression: 'none' (default), 'gzip' or 'zstd' for the streamed formats
+        labeled_only: 'true' to skip attempts without a fraud assessment
+    """
     try:
         claims = get_jwt()
         if claims.get('role') != 'admin':
             return jsonify({"error": "Admin access required"}), 403
         
         behavior_tracker = get_behavior_tracker()
+        fmt = request.args.get('format', 'json').lower()
+        compression = request.args.get('compression', 'none').lower()
+        labeled_only = request.args.get('labeled_only', 'false').lower() == 'true'
+
+        if fmt != 'json':
+            try:
+                chunks = stream_export(behavior_tracker.export_training_data(labeled_only=labeled_only),
+                                       fmt, compression)
+            except ExportFormatError as e:
+                return jsonify({"error": str(e)}), 400
+            name = export_filename(f"training_data_{datetime.utcnow():%Y%m%dT%H%M%S}", fmt, compression)
+            return Response(stream_with_context(chunks), mimetype=export_mimetype(fmt, compression),
+                            headers={'Content-Disposition': f'attachment; filename="{name}"'}), 200
         
         # Export training data
-        training_data = behavior_tracker.export_training_data(labeled_only=False)
+        training_data = list(behavior_tracker.export_training_data(labeled_only=labeled_only))
         
         # Convert to JSON-serializable format
         for record in training_data:
@@ -2031,13 +2404,12 @@ def export_training_data():
             'data': training_data
         }), 200
     except Exception as e:
-        print(f"Export training data error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Export training data error: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/admin/fraud-stats', methods=['GET'])
 @jwt_required()
+@response_cache.cached('fraud_stats')
 def fraud_stats():
     """Get fraud detection statistics"""
     try:
@@ -2046,11 +2418,12 @@ def fraud_stats():
             return jsonify({"error": "Admin access required"}), 403
         
         # Count votes by fraud risk level
-        total_votes = votes_collection.count_documents({})
-        high_risk_votes = votes_collection.count_documents({'fraud_risk_level': 'high'})
-        medium_risk_votes = votes_collection.count_documents({'fraud_risk_level': 'medium'})
-        low_risk_votes = votes_collection.count_documents({'fraud_risk_level': 'low'})
-        flagged_votes = votes_collection.count_documents({'flagged_for_review': True})
+        tally = get_tally_store().load()
+        total_votes = tally.total
+        high_risk_votes = tally.risk_count('high')
+        medium_risk_votes = tally.risk_count('medium')
+        low_risk_votes = tally.risk_count('low')
+        flagged_votes = tally.flagged
         
         return jsonify({
             'total_votes': total_votes,
@@ -2061,7 +2434,7 @@ def fraud_stats():
             'fraud_detection_enabled': get_fraud_detector() is not None
         }), 200
     except Exception as e:
-        print(f"Fraud stats error: {e}")
+        logger.error(f"Fraud stats error: {e}")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
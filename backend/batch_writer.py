@@ -0,0 +1,136 @@
+"""
+Batch Writer Module
+- Base class for write-behind writers: callers queue items without blocking,
+  a background thread hands them to _write in batches
+- A batch is flushed when it reaches batch_size or flush_interval elapses,
+  whichever comes first; stop() flushes everything still queued
+- The queue is bounded: when it is full the item is dropped and counted
+  rather than slowing the caller down
+"""
+
+from __future__ import annotations
+
+import time
+import queue
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Queue sentinel for "flush interval elapsed" (None means "shut down")
+_TICK = object()
+
+
+class BatchWriter:
+    """Bounded queue drained in batches by one daemon thread; subclasses implement _write."""
+
+    thread_name = 'batch-writer'
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.items_written = 0
+        self.batches_written = 0
+        self.items_dropped = 0
+        self.write_errors = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+        return self
+
+    def put(self, item: Any) -> bool:
+        """
+        Queue one item without blocking the caller
+
+        Returns:
+            False when the writer is stopping or the queue is full and the item was dropped
+        """
+        if self._stopping.is_set():
+            return False
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.items_dropped += 1
+            return False
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything still queued and stop the writer thread."""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            thread.join(timeout)
+
+    def _prepare(self, item: Any) -> Optional[Any]:
+        """Turn a queued item into a batch entry on the writer thread; None skips it"""
+        return item
+
+    def _write(self, batch: List[Any]) -> None:
+        raise NotImplementedError
+
+    def _run(self) -> None:
+        batch: List[Any] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = _TICK
+            if item is None:
+                self._drain_into(batch)
+                self._flush(batch)
+                return
+            if item is not _TICK:
+                self._add(batch, item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _add(self, batch: List[Any], item: Any) -> None:
+        entry = self._prepare(item)
+        if entry is not None:
+            batch.append(entry)
+
+    def _drain_into(self, batch: List[Any]) -> None:
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                self._add(batch, item)
+
+    def _flush(self, batch: List[Any]) -> None:
+        if not batch:
+            return
+        try:
+            self._write(batch)
+            self.items_written += len(batch)
+            self.batches_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"{self.thread_name}: writing {len(batch)} item(s) failed: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queued': self._queue.qsize(),
+            'written': self.items_written,
+            'batches_written': self.batches_written,
+            'dropped': self.items_dropped,
+            'write_errors': self.write_errors,
+        }
@@ -1,5 +1,6 @@
+import bisect
 import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 
 _tracker = None
 
@@ -12,10 +13,12 @@ class BehaviorTracker:
             self.votes = db.get_collection('votes')
             self.vote_attempts = db.get_collection('vote_attempts')
             self.fraud_assessments = db.get_collection('fraud_assessments')
+            self.assessment_features = db.get_collection('assessment_features')
         else:
             self.votes = None
             self.vote_attempts = None
             self.fraud_assessments = None
+            self.assessment_features = None
 
     def get_recent_votes(self, user_id: str, hours: int = 1) -> int:
         if not self.enabled:
@@ -48,6 +51,30 @@ class BehaviorTracker:
         }
         self.vote_attempts.insert_one(doc)
 
+    def track_vote_attempts(self, attempts: List[Dict]) -> None:
+        """Bulk variant of track_vote_attempt; each item has the same keys as its arguments."""
+        if not self.enabled or not attempts:
+            return
+        now = datetime.datetime.utcnow()
+        self.vote_attempts.insert_many([{
+            'user_id': a['user_id'],
+            'session_id': a['session_id'],
+            'timestamp': now,
+            'vote_attempt': a['vote_attempt_data'],
+            'request': a['request_data']
+        } for a in attempts], ordered=False)
+
+    def store_fraud_assessments(self, assessments: List[Dict]) -> None:
+        if not self.enabled or not assessments:
+            return
+        now = datetime.datetime.utcnow()
+        docs = []
+        for assessment in assessments:
+            doc = dict(assessment)
+            doc['created_at'] = now
+            docs.append(doc)
+        self.fraud_assessments.insert_many(docs, ordered=False)
+
     def store_fraud_assessment(self, assessment: Dict) -> None:
         if not self.enabled:
             return
@@ -56,28 +83,60 @@ class BehaviorTracker:
         assessment['created_at'] = datetime.datetime.utcnow()
         self.fraud_assessments.insert_one(assessment)
 
-    def export_training_data(self, labeled_only: bool = False) -> List[Dict]:
+    def store_assessment_features(self, documents: List[Dict]) -> None:
+        """Full feature sets recorded after assessment (see feature_registry.FeatureRecorder)"""
+        if not self.enabled or not documents:
+            return
+        self.assessment_features.insert_many(documents, ordered=False)
+
+    def _assessment_index(self) -> Dict[str, Tuple[List[datetime.datetime], List[Optional[str]]]]:
+        """voter_id -> (sorted created_at times, risk levels in the same order), from one projected scan"""
+        grouped: Dict[str, List[Tuple[datetime.datetime, Optional[str]]]] = {}
+        cursor = self.fraud_assessments.find({}, {'_id': 0, 'voter_id': 1, 'risk_level': 1, 'created_at': 1})
+        for fa in cursor:
+            # Undated assessments sort first, so an undated attempt still finds them
+            created_at = fa.get('created_at') or datetime.datetime.min
+            grouped.setdefault(fa.get('voter_id'), []).append((created_at, fa.get('risk_level')))
+        index = {}
+        for voter_id, entries in grouped.items():
+            entries.sort(key=lambda entry: entry[0])
+            index[voter_id] = ([t for t, _ in entries], [label for _, label in entries])
+        return index
+
+    @staticmethod
+    def _nearest_label(entry: Tuple[List[datetime.datetime], List[Optional[str]]],
+                       timestamp: Optional[datetime.datetime]) -> Optional[str]:
+        times, labels = entry
+        if timestamp is None:
+            return labels[0]
+        i = bisect.bisect_left(times, timestamp)
+        if i == 0:
+            return labels[0]
+        if i == len(times):
+            return labels[-1]
+        # Ties go to the assessment at or after the attempt (it is stored right after it)
+        return labels[i] if times[i] - timestamp <= timestamp - times[i - 1] else labels[i - 1]
+
+    def export_training_data(self, labeled_only: bool = False) -> Iterator[Dict]:
+        """
+        Yield vote attempts joined with the fraud assessment of the same voter
+        nearest in time; wrap in list() when all records are needed at once.
+        """
         if not self.enabled:
-            return []
-        # Join vote_attempts with fraud_assessments by voter_id and timestamp proximity
-        attempts = list(self.vote_attempts.find().sort('timestamp', 1))
-        assessments = list(self.fraud_assessments.find().sort('timestamp', 1))
-        data: List[Dict] = []
-        for a in attempts:
-            label = None
-            match = next((fa for fa in assessments if fa.get('voter_id') == a.get('user_id')), None)
-            if match:
-                label = match.get('risk_level')
+            return
+        index = self._assessment_index()
+        for a in self.vote_attempts.find().sort('timestamp', 1):
+            entry = index.get(a.get('user_id'))
+            label = self._nearest_label(entry, a.get('timestamp')) if entry else None
             if labeled_only and label is None:
                 continue
-            data.append({
+            yield {
                 'user_id': a.get('user_id'),
                 'session_id': a.get('session_id'),
                 'timestamp': a.get('timestamp'),
                 'features': a.get('vote_attempt', {}),
                 'label': label
-            })
-        return data
+            }
 
     def get_fraud_assessments(self, risk_level: Optional[str] = None, limit: int = 100) -> List[Dict]:
         query = {}
@@ -0,0 +1,360 @@
+"""
+Benchmark: Random Forest fraud model training, inference, size and load time
+
+Measures how random_forest_fraud behaves as data and model grow:
+  - training:  train_from_matrix wall time and hold-out ROC AUC over a grid of
+               n_estimators x max_depth x row count
+  - inference: single-row (predict_proba) and batched (predict_proba_matrix)
+               latency p50/p99 for the flat and sklearn backends
+  - footprint: model and flattened-forest size on disk, and load time plus
+               RSS growth when a fresh process loads the artifacts (memory-mapped
+               and fully read)
+
+Results are written as JSON; with --baseline the run is compared metric by
+metric against an earlier result file and regressions are listed (and fail
+the run with --fail-on-regression): timings and sizes that grew by more than
+--threshold (timings also by more than --min-delta-ms) and ROC AUC that fell
+by more than --auc-drop. A baseline that measured a different model or
+dataset is not compared unless --allow-mismatch is given.
+
+Usage:
+    python benchmark_fraud_model.py                                   # synthetic data, default grid
+    python benchmark_fraud_model.py --trees 100 300 --depths none 16 --rows 20000 100000
+    python benchmark_fraud_model.py --csv voting_fraud_dataset.csv --output fraud_model_bench.json
+    python benchmark_fraud_model.py --models-dir models/rf --baseline fraud_model_bench.json --fail-on-regression
+    python benchmark_fraud_model.py --models-dir models/rf --profile tiny --skip-training
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
+import platform
+import statistics
+import tempfile
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from benchmark_rf_inference import synthetic_rows
+from random_forest_fraud import (DEFAULT_FEATURES, MODEL_PROFILES, RFArtifacts, RandomForestFraudModel,
+                                 load_voting_fraud_dataset, profile_artifacts)
+
+
+def synthetic_dataset(n: int):
+    """Synthetic rows with a learnable label (same rule as benchmark_rf_inference.synthetic_model)"""
+    X = synthetic_rows(n, seed=5)
+    risk = (X[:, 4] > 4) * 0.4 + (X[:, 5] < 60) * 0.3 + (X[:, 6] == 0) * 0.3
+    y = (risk + np.random.default_rng(11).normal(0, 0.15, n) > 0.5).astype(np.int8)
+    return X, y
+
+
+def csv_dataset(path: str):
+    model = RandomForestFraudModel()
+    df = model._labeled_frame(load_voting_fraud_dataset(path), 'is_fraud')
+    return df[model.features].to_numpy(dtype=np.float64), df['is_fraud'].to_numpy(dtype=np.int8)
+
+
+def percentiles(latencies_ms):
+    latencies_ms = sorted(latencies_ms)
+    return {
+        'p50_ms': round(statistics.median(latencies_ms), 4),
+        'p99_ms': round(latencies_ms[max(int(len(latencies_ms) * 0.99) - 1, 0)], 4),
+        'mean_ms': round(statistics.fmean(latencies_ms), 4),
+    }
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is a peak (KB on Linux, bytes on macOS); good enough where /proc is missing
+        scale = 1 if platform.system() == 'Darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _measure_load(model_path: str, features_path: str, mmap: bool) -> dict:
+    """Runs in a fresh process: load the artifacts and score once, recording time and RSS growth"""
+    import warnings
+    warnings.filterwarnings('ignore')
+    from random_forest_fraud import RFArtifacts, RandomForestFraudModel
+
+    before = rss_bytes()
+    started = time.perf_counter()
+    model = RandomForestFraudModel().load(RFArtifacts(model_path=model_path, features_path=features_path),
+                                          mmap=mmap)
+    load_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    model.predict_proba({name: 1 for name in model.features})
+    first_predict_ms = (time.perf_counter() - started) * 1000
+    return {
+        'mmap': mmap,
+        'load_ms': round(load_ms, 2),
+        'first_predict_ms': round(first_predict_ms, 2),
+        'rss_growth_bytes': rss_bytes() - before,
+    }
+
+
+def bench_training(X, y, trees, depths, rows, n_jobs):
+    results = []
+    print(f"{'trees':>6}{'depth':>7}{'rows':>10}{'fit s':>9}{'ROC AUC':>9}")
+    for n_rows in rows:
+        if n_rows > len(y):
+            print(f"  (skipping {n_rows} rows: dataset has {len(y)})")
+            continue
+        for depth in depths:
+            for n_trees in trees:
+                model = RandomForestFraudModel()
+                metrics = model.train_from_matrix(X[:n_rows], y[:n_rows], n_jobs=n_jobs,
+                                                  n_estimators=n_trees, max_depth=depth)
+                results.append({'trees': n_trees, 'max_depth': depth, 'rows': n_rows,
+                                'fit_seconds': metrics['fit_seconds'], 'roc_auc': round(metrics['roc_auc'], 4)})
+                print(f"{n_trees:>6}{str(depth):>7}{n_rows:>10}{metrics['fit_seconds']:>9.2f}"
+                      f"{metrics['roc_auc']:>9.4f}")
+    return results
+
+
+def bench_inference(artifacts: RFArtifacts, X_eval, batch_sizes, samples: int):
+    results = {}
+    rows = X_eval[:samples]
+    print(f"\n{'backend':<9}{'single p50':>12}{'single p99':>12}" +
+          ''.join(f"{f'batch {n} p99':>16}" for n in batch_sizes))
+    for backend in ('flat', 'sklearn'):
+        model = RandomForestFraudModel(inference_backend=backend).load(artifacts, mmap=True)
+        model.prepare_inference()
+        dicts = [dict(zip(model.features, row)) for row in rows]
+        model.predict_proba(dicts[0])  # warm-up (lazy estimator / flattening)
+
+        latencies = []
+        for features in dicts:
+            started = time.perf_counter()
+            model.predict_proba(features)
+            latencies.append((time.perf_counter() - started) * 1000)
+        entry = {'single_row': percentiles(latencies), 'batch': []}
+
+        for size in batch_sizes:
+            X = X_eval[:size] if size <= len(X_eval) else np.resize(X_eval, (size, X_eval.shape[1]))
+            latencies = []
+            for _ in range(max(3, 20000 // size)):
+                started = time.perf_counter()
+                model.predict_proba_matrix(X)
+                latencies.append((time.perf_counter() - started) * 1000)
+            stats = percentiles(latencies)
+            stats.update({'rows': size, 'rows_per_s': round(size / (stats['p50_ms'] / 1000))})
+            entry['batch'].append(stats)
+        results[backend] = entry
+        print(f"{backend:<9}{entry['single_row']['p50_ms']:>12}{entry['single_row']['p99_ms']:>12}" +
+              ''.join(f"{b['p99_ms']:>16}" for b in entry['batch']))
+    return results
+
+
+def bench_footprint(artifacts: RFArtifacts):
+    sizes = {
+        'model_bytes': os.path.getsize(artifacts.model_path),
+        'flat_bytes': os.path.getsize(artifacts.flat_path) if os.path.exists(artifacts.flat_path) else None,
+    }
+    loads = []
+    ctx = multiprocessing.get_context('spawn')
+    for mmap in (True, False):
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+            loads.append(executor.submit(_measure_load, artifacts.model_path, artifacts.features_path, mmap).result())
+    print(f"\nOn disk: model {sizes['model_bytes'] / 1e6:.1f} MB"
+          + (f", flattened forest {sizes['flat_bytes'] / 1e6:.1f} MB" if sizes['flat_bytes'] else ''))
+    for load in loads:
+        print(f"Load ({'mmap' if load['mmap'] else 'read'}): {load['load_ms']:.1f} ms, first predict "
+              f"{load['first_predict_ms']:.1f} ms, RSS +{load['rss_growth_bytes'] / 1e6:.1f} MB")
+    return {'disk': sizes, 'load': loads}
+
+
+def comparable_metrics(report: dict) -> dict:
+    """
+    Flatten a report into name -> value. Names ending in .roc_auc are
+    higher-is-better (see HIGHER_IS_BETTER); everything else is lower-is-better
+    """
+    metrics = {}
+    for t in report.get('training', []):
+        name = f"train[trees={t['trees']},depth={t['max_depth']},rows={t['rows']}]"
+        metrics[f"{name}.fit_seconds"] = t['fit_seconds']
+        metrics[f"{name}.roc_auc"] = t['roc_auc']
+    for backend, entry in report.get('inference', {}).items():
+        for key in ('p50_ms', 'p99_ms'):
+            metrics[f"{backend}.single_row.{key}"] = entry['single_row'][key]
+        for b in entry['batch']:
+            for key in ('p50_ms', 'p99_ms'):
+                metrics[f"{backend}.batch[{b['rows']}].{key}"] = b[key]
+    footprint = report.get('footprint', {})
+    for key, value in footprint.get('disk', {}).items():
+        if value is not None:
+            metrics[f"disk.{key}"] = value
+    for load in footprint.get('load', []):
+        mode = 'mmap' if load['mmap'] else 'read'
+        for key in ('load_ms', 'first_predict_ms', 'rss_growth_bytes'):
+            metrics[f"load[{mode}].{key}"] = load[key]
+    return metrics
+
+
+HIGHER_IS_BETTER = ('.roc_auc',)
+
+
+def mismatches(report: dict, baseline: dict) -> list:
+    """Why two runs measured different things (model or dataset); empty when comparable"""
+    reasons = []
+    for key in ('measured_model', 'dataset'):
+        if report.get(key) != baseline.get(key):
+            reasons.append(f"{key}: {baseline.get(key)} -> {report.get(key)}")
+    return reasons
+
+
+def is_regression(name: str, old, new, threshold: float, min_delta_ms: float, auc_drop: float) -> bool:
+    """
+    ROC AUC regresses when it drops by more than auc_drop (absolute). Anything
+    else regresses when it grows by more than threshold (relative); timings
+    must also grow by more than min_delta_ms, so sub-millisecond noise on
+    fast paths is not reported
+    """
+    if name.endswith(HIGHER_IS_BETTER):
+        return old - new > auc_drop
+    if not old or (new - old) / old <= threshold:
+        return False
+    if name.endswith('_ms'):
+        return new - old > min_delta_ms
+    if name.endswith('_seconds'):
+        return (new - old) * 1000 > min_delta_ms
+    return True
+
+
+def compare(report: dict, baseline: dict, threshold: float, min_delta_ms: float = 0.05,
+            auc_drop: float = 0.01, allow_mismatch: bool = False) -> dict:
+    summary = {'baseline_generated_at': baseline.get('generated_at'), 'threshold': threshold,
+               'min_delta_ms': min_delta_ms, 'auc_drop': auc_drop,
+               'mismatch': mismatches(report, baseline), 'metrics': [], 'regressions': []}
+    if summary['mismatch']:
+        for reason in summary['mismatch']:
+            print(f"✗ Baseline measured a different {reason}")
+        if not allow_mismatch:
+            print("✗ Not compared (pass --allow-mismatch to compare anyway)")
+            return summary
+
+    current, previous = comparable_metrics(report), comparable_metrics(baseline)
+    rows, regressions = summary['metrics'], summary['regressions']
+    for name in sorted(set(current) & set(previous)):
+        old, new = previous[name], current[name]
+        change = (new - old) / old if old else 0.0
+        rows.append({'metric': name, 'baseline': old, 'current': new, 'change': round(change, 4)})
+        if is_regression(name, old, new, threshold, min_delta_ms, auc_drop):
+            regressions.append(name)
+    print(f"\n{'metric':<52}{'baseline':>14}{'current':>14}{'change':>9}")
+    for row in rows:
+        mark = '✗' if row['metric'] in regressions else ' '
+        print(f"{mark} {row['metric']:<50}{row['baseline']:>14}{row['current']:>14}{row['change']:>+9.1%}")
+    only = sorted(set(current) ^ set(previous))
+    if only:
+        print(f"  ({len(only)} metric(s) present in only one run not compared)")
+    return summary
+
+
+def parse_depth(value: str):
+    return None if value.lower() == 'none' else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=None, help='Labeled CSV dataset (default: synthetic rows)')
+    parser.add_argument('--trees', type=int, nargs='+', default=[50, 100, 300], help='n_estimators values')
+    parser.add_argument('--depths', type=parse_depth, nargs='+', default=[None, 12],
+                        help="max_depth values ('none' = unlimited)")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000], help='Training row counts')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Cores used for fitting')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--samples', type=int, default=1000, help='Rows timed one at a time per backend')
+    parser.add_argument('--models-dir', default=None,
+                        help='Measure inference and load time on this published model (e.g. models/rf) '
+                             'instead of the largest model trained here')
+    parser.add_argument('--profile', default='full', choices=list(MODEL_PROFILES),
+                        help='Which published profile of --models-dir to measure')
+    parser.add_argument('--skip-training', action='store_true', help='Only measure --models-dir')
+    parser.add_argument('--baseline', default=None, help='Earlier --output JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative increase counted as regression')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='Timings must also grow by more than this many ms to count as regression')
+    parser.add_argument('--auc-drop', type=float, default=0.01,
+                        help='Absolute ROC AUC drop counted as regression')
+    parser.add_argument('--allow-mismatch', action='store_true',
+                        help='Compare even when the baseline measured a different model or dataset')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    if args.skip_training and not args.models_dir:
+        parser.error('--skip-training needs --models-dir')
+
+    X, y = csv_dataset(args.csv) if args.csv else synthetic_dataset(max(args.rows) + 20000)
+    X_eval = X[-20000:] if not args.csv else X
+    print(f"Dataset: {len(y)} rows ({'synthetic' if not args.csv else args.csv}), "
+          f"positive rate {y.mean():.3f}, {os.cpu_count()} CPU(s)\n")
+    report = {
+        'generated_at': datetime.utcnow().isoformat(),
+        'dataset': {'source': args.csv or 'synthetic', 'rows': int(len(y)), 'features': list(DEFAULT_FEATURES)},
+        'host': {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='fraud-bench-') as scratch:
+        if args.models_dir:
+            artifacts = profile_artifacts(args.models_dir, args.profile)
+            if not os.path.exists(artifacts.model_path):
+                print(f"✗ No model at {artifacts.model_path}")
+                sys.exit(1)
+        else:
+            artifacts = RFArtifacts(model_path=os.path.join(scratch, 'rf_fraud_model.pkl'),
+                                    features_path=os.path.join(scratch, 'rf_features.json'))
+
+        if not args.skip_training:
+            report['training'] = bench_training(X, y, args.trees, args.depths, sorted(args.rows), args.n_jobs)
+            if not args.models_dir:
+                # Inference and footprint on the largest configuration of the grid
+                fitting = [r for r in args.rows if r <= len(y)]
+                n_rows = max(fitting) if fitting else len(y)
+                model = RandomForestFraudModel()
+                model.train_from_matrix(X[:n_rows], y[:n_rows], n_jobs=args.n_jobs,
+                                        n_estimators=max(args.trees), max_depth=args.depths[0])
+                model.save(artifacts)
+                report['measured_model'] = {'trees': max(args.trees), 'max_depth': args.depths[0], 'rows': n_rows}
+        if args.models_dir:
+            report['measured_model'] = {'models_dir': args.models_dir, 'profile': args.profile,
+                                        'model_path': artifacts.model_path}
+
+        report['inference'] = bench_inference(artifacts, X_eval, args.batch_sizes, args.samples)
+        report['footprint'] = bench_footprint(artifacts)
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['comparison'] = compare(report, json.load(f), args.threshold, args.min_delta_ms,
+                                           args.auc_drop, args.allow_mismatch)
+        regressions = report['comparison']['regressions']
+        refused = bool(report['comparison']['mismatch']) and not args.allow_mismatch
+        if not refused:
+            mark = '✗' if regressions else '✓'
+            print(f"\n{mark} {len(regressions)} regression(s) beyond +{args.threshold:.0%} "
+                  f"(and {args.min_delta_ms} ms) or ROC AUC -{args.auc_drop} vs {args.baseline}")
+        failed = (bool(regressions) or refused) and args.fail_on_regression
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark: per-request logging overhead, print() vs queued structured logging
+
+Replays the log output of one cast_vote request from several threads:
+  - print: the statements cast_vote used to make (banner lines, the request
+    body, the full vote record, per-step status lines)
+  - structured: what it makes now (a debug line, a vote_cast info event with
+    extra fields) through structured_logging's queue handler
+
+Reports the time each request thread spends in logging calls and the time for
+the writer to drain afterwards.
+
+Usage:
+    python benchmark_logging.py --requests 20000 --threads 1 4 16 --output logging.json
+    python benchmark_logging.py --stdout      # write to the terminal instead of a temp file
+    python benchmark_logging.py --block-buffered
+
+By default the temp file is line buffered, like a terminal or a container
+running with PYTHONUNBUFFERED=1, so every print() line is its own write.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import contextlib
+import json
+import logging
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from structured_logging import configure_logging, shutdown_logging
+
+
+def sample_request(i: int):
+    user_id = f'voter_{i}'
+    data = {'candidate': 'Congress', 'precinct': 'Precinct 1', 'session_duration': 90,
+            'page_views': 3, 'time_on_page': 45, 'idempotency_key': uuid.uuid4().hex}
+    vote_record = {
+        'user_id': user_id, 'candidate': data['candidate'], 'precinct': data['precinct'],
+        'timestamp': datetime.utcnow(), 'transaction_id': uuid.uuid4().hex,
+        'fraud_probability': 0.1234, 'fraud_risk_level': 'low', 'is_flagged': False,
+        'ip_address': '127.0.0.1', 'user_agent': 'Mozilla/5.0 (benchmark)',
+    }
+    return user_id, data, vote_record
+
+
+def request_with_print(i: int) -> None:
+    user_id, data, vote_record = sample_request(i)
+    print(f"\n{'='*60}")
+    print(f"[Cast Vote] user_id={user_id}, candidate={data['candidate']}, precinct={data['precinct']}")
+    print(f"[Cast Vote] Full request data: {data}")
+    print(f"{'='*60}")
+    print("[Fraud Detection] Risk: low (probability: 0.1234)")
+    print("[Cast Vote] SUCCESS: Vote saved")
+    print(f"[Cast Vote] Record: {vote_record}")
+    print(f"[Cast Vote] Inserted ID: {i}, transaction_id: {vote_record['transaction_id']}")
+    print(f"{'='*60}\n")
+
+
+def request_with_logger(i: int, logger: logging.Logger) -> None:
+    user_id, data, vote_record = sample_request(i)
+    logger.debug(f"[Cast Vote] user_id={user_id}, candidate={data['candidate']}, precinct={data['precinct']}")
+    logger.info("[Cast Vote] Vote saved", extra={
+        'event': 'vote_cast', 'transaction_id': vote_record['transaction_id'], 'precinct': data['precinct'],
+        'risk_level': 'low', 'fraud_probability': 0.1234
+    })
+
+
+def run_threads(func, requests: int, threads: int) -> float:
+    """Run func(i) for every request across threads; returns summed in-call seconds."""
+    per_thread = [0.0] * threads
+
+    def worker(t):
+        spent = 0.0
+        for i in range(t, requests, threads):
+            started = time.perf_counter()
+            func(i)
+            spent += time.perf_counter() - started
+        per_thread[t] = spent
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return sum(per_thread)
+
+
+def bench_print(requests: int, threads: int, stream) -> dict:
+    with contextlib.redirect_stdout(stream):
+        started = time.perf_counter()
+        in_calls = run_threads(request_with_print, requests, threads)
+        stream.flush()
+        wall = time.perf_counter() - started
+    return {'us_per_request': in_calls / requests * 1e6, 'wall_seconds': wall, 'drain_seconds': 0.0}
+
+
+def bench_structured(requests: int, threads: int, stream, level: str, sample_rate: float) -> dict:
+    configure_logging(level=level, json_output=True, debug_sample_rate=sample_rate, stream=stream)
+    logger = logging.getLogger('benchmark.cast_vote')
+    started = time.perf_counter()
+    in_calls = run_threads(lambda i: request_with_logger(i, logger), requests, threads)
+    calls_done = time.perf_counter()
+    shutdown_logging()
+    stream.flush()
+    finished = time.perf_counter()
+    return {'us_per_request': in_calls / requests * 1e6, 'wall_seconds': finished - started,
+            'drain_seconds': finished - calls_done}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--level', default='INFO', help='LOG_LEVEL for the structured run')
+    parser.add_argument('--debug-sample-rate', type=float, default=1.0)
+    parser.add_argument('--stdout', action='store_true', help='Write log output to the real stdout')
+    parser.add_argument('--block-buffered', action='store_true',
+                        help='Block-buffer the temp file (stdout redirected to a file without PYTHONUNBUFFERED)')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    real_stdout = sys.stdout
+    results = []
+    for threads in args.threads:
+        row = {'threads': threads, 'requests': args.requests}
+        for name in ('print', 'structured'):
+            if args.stdout:
+                stream, path = real_stdout, None
+            else:
+                fd, path = tempfile.mkstemp(prefix=f'bench_logging_{name}_', suffix='.log')
+                stream = os.fdopen(fd, 'w', buffering=-1 if args.block_buffered else 1, encoding='utf-8')
+            try:
+                if name == 'print':
+                    row[name] = bench_print(args.requests, threads, stream)
+                else:
+                    row[name] = bench_structured(args.requests, threads, stream, args.level,
+                                                 args.debug_sample_rate)
+                row[name]['bytes_written'] = os.path.getsize(path) if path else None
+            finally:
+                if path:
+                    stream.close()
+                    os.remove(path)
+        row['speedup'] = row['print']['us_per_request'] / max(row['structured']['us_per_request'], 1e-9)
+        results.append(row)
+
+    print(f"\n{'threads':>8}{'print us/req':>15}{'logger us/req':>15}{'speedup':>10}{'drain s':>10}")
+    for row in results:
+        print(f"{row['threads']:>8}{row['print']['us_per_request']:>15.1f}"
+              f"{row['structured']['us_per_request']:>15.1f}{row['speedup']:>9.1f}x"
+              f"{row['structured']['drain_seconds']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'generated_at': datetime.utcnow().isoformat(), 'level': args.level,
+                       'buffering': 'stdout' if args.stdout else ('block' if args.block_buffered else 'line'),
+                       'debug_sample_rate': args.debug_sample_rate, 'results': results}, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark: Random Forest single-vote and batch inference, sklearn vs FlatForest
+
+Compares three ways to score a vote:
+  - legacy:  one-row pandas DataFrame + sklearn predict_proba (the old per-vote path)
+  - sklearn: NumPy row + sklearn predict_proba
+  - flat:    rf_inference.FlatForest on a plain feature vector
+
+Also checks parity: FlatForest must match sklearn's predict_proba on every
+sampled row within --tolerance, otherwise the script exits non-zero.
+
+Usage:
+    python benchmark_rf_inference.py                        # synthetic forest, 300 trees
+    python benchmark_rf_inference.py --model voting_fraud_model.pkl --output rf_inference.json
+    python benchmark_rf_inference.py --check-only           # parity check, no timings
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import json
+import statistics
+import time
+import warnings
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from random_forest_fraud import DEFAULT_FEATURES
+from rf_inference import FlatForest
+
+
+def synthetic_rows(n: int, seed: int = 7) -> np.ndarray:
+    """Rows shaped like extract_model_features output (hashed ids, small counts)."""
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 10 ** 8, n),       # voter_id
+        rng.integers(18, 90, n),           # age
+        rng.integers(0, 10 ** 8, n),       # ip_address
+        rng.integers(0, 10 ** 8, n),       # device_id
+        rng.integers(1, 8, n),             # login_attempts
+        rng.integers(5, 900, n),           # vote_duration_sec
+        rng.integers(0, 2, n),             # location_match
+        rng.integers(0, 4, n),             # previous_votes
+    ]).astype(np.float64)
+
+
+def synthetic_model(n_trees: int, n_rows: int = 20000) -> RandomForestClassifier:
+    X = synthetic_rows(n_rows)
+    risk = (X[:, 4] > 4) * 0.4 + (X[:, 5] < 60) * 0.3 + (X[:, 6] == 0) * 0.3
+    y = (risk + np.random.default_rng(11).normal(0, 0.15, n_rows) > 0.5).astype(int)
+    model = RandomForestClassifier(n_estimators=n_trees, n_jobs=-1, random_state=42)
+    model.fit(pd.DataFrame(X, columns=DEFAULT_FEATURES), y)
+    return model
+
+
+def time_calls(func, rows, repeats: int):
+    latencies = []
+    for _ in range(repeats):
+        for row in rows:
+            started = time.perf_counter()
+            func(row)
+            latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 4),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1], 4),
+        'mean_ms': round(statistics.fmean(latencies), 4),
+    }
+
+
+def check_parity(model, flat: FlatForest, X: np.ndarray, tolerance: float) -> dict:
+    expected = model.predict_proba(pd.DataFrame(X, columns=model.feature_names_in_)
+                                   if hasattr(model, 'feature_names_in_') else X)[:, 1]
+    batch = flat.predict_proba(X)
+    single = np.array([flat.predict_one(row) for row in X[:500]])
+    return {
+        'rows': int(len(X)),
+        'max_abs_diff_batch': float(np.max(np.abs(batch - expected))),
+        'max_abs_diff_single': float(np.max(np.abs(single - expected[:500]))),
+        'passed': bool(np.allclose(batch, expected, rtol=0, atol=tolerance)
+                       and np.allclose(single, expected[:500], rtol=0, atol=tolerance)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default=None, help='Pickled RandomForestClassifier (default: train a synthetic one)')
+    parser.add_argument('--trees', type=int, default=300, help='Trees in the synthetic forest')
+    parser.add_argument('--rows', type=int, default=200, help='Distinct rows timed per path')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[16, 64, 256, 1000, 10000],
+                        help='Batch sizes timed on both paths; pick RF_FLAT_MAX_BATCH_ROWS from the crossover')
+    parser.add_argument('--tolerance', type=float, default=1e-9)
+    parser.add_argument('--check-only', action='store_true')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    # sklearn warns on every call when array vs DataFrame input differs from fit time
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    warnings.filterwarnings('ignore', message='X has feature names')
+
+    model = joblib.load(args.model) if args.model else synthetic_model(args.trees)
+    columns = list(getattr(model, 'feature_names_in_', DEFAULT_FEATURES))
+
+    started = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    flatten_ms = (time.perf_counter() - started) * 1000
+    print(f"Flattened {flat.n_trees} trees / {flat.n_nodes} nodes (max depth {flat.max_depth}) in {flatten_ms:.1f} ms")
+
+    parity = check_parity(model, flat, synthetic_rows(5000, seed=99), args.tolerance)
+    mark = '✓' if parity['passed'] else '✗'
+    print(f"{mark} Parity on {parity['rows']} rows: max |diff| batch={parity['max_abs_diff_batch']:.2e} "
+          f"single={parity['max_abs_diff_single']:.2e} (tolerance {args.tolerance:.0e})")
+    report = {'generated_at': datetime.utcnow().isoformat(), 'trees': flat.n_trees, 'nodes': flat.n_nodes,
+              'max_depth': flat.max_depth, 'flatten_ms': round(flatten_ms, 2), 'parity': parity}
+
+    if not args.check_only:
+        rows = synthetic_rows(args.rows, seed=3)
+        single = {
+            'legacy': time_calls(lambda r: model.predict_proba(pd.DataFrame([r], columns=columns))[:, 1][0],
+                                 rows, args.repeats),
+            'sklearn': time_calls(lambda r: model.predict_proba(r.reshape(1, -1))[:, 1][0], rows, args.repeats),
+            'flat': time_calls(flat.predict_one, rows, args.repeats),
+        }
+        report['single_row'] = single
+        print(f"\n{'single row':<12}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, stats in single.items():
+            print(f"{name:<12}{stats['p50_ms']:>10}{stats['p99_ms']:>10}")
+
+        batches = []
+        print(f"\n{'batch':>8}{'sklearn rows/s':>16}{'flat rows/s':>14}")
+        for size in args.batch_sizes:
+            X = synthetic_rows(size, seed=size)
+            started = time.perf_counter()
+            model.predict_proba(X)
+            sklearn_s = time.perf_counter() - started
+            started = time.perf_counter()
+            flat.predict_proba(X)
+            flat_s = time.perf_counter() - started
+            batches.append({'rows': size, 'sklearn_rows_per_s': round(size / sklearn_s),
+                            'flat_rows_per_s': round(size / flat_s)})
+            print(f"{size:>8}{batches[-1]['sklearn_rows_per_s']:>16}{batches[-1]['flat_rows_per_s']:>14}")
+        report['batch'] = batches
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if not parity['passed']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Benchmark: per-pair count_documents vs single-pass tally aggregation
+
+Seeds a scratch database with synthetic votes and measures, for each size,
+how many MongoDB commands and how much wall time a dashboard refresh costs.
+
+Usage:
+    python benchmark_tally.py --sizes 10000 100000 1000000
+    python benchmark_tally.py --mongodb-uri mongodb://localhost:27017 --output tally_bench.json
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, monitoring
+
+from vote_tally import CANDIDATE_ALIASES, PRECINCTS, compute_tally, summarize_precincts
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server (one per round trip)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def legacy_refresh(votes_collection):
+    """Reproduces the queries the dashboards issued before vote_tally existed."""
+    result = {
+        'total_votes': votes_collection.count_documents({}),
+        'candidate_a_votes': votes_collection.count_documents({'candidate': {'$in': CANDIDATE_ALIASES['Congress']}}),
+        'candidate_b_votes': votes_collection.count_documents({'candidate': {'$in': CANDIDATE_ALIASES['BJP']}}),
+        'precincts': [],
+    }
+    for precinct in PRECINCTS:
+        result['precincts'].append({
+            'name': precinct,
+            'total_votes': votes_collection.count_documents({'precinct': precinct}),
+            'candidate_a_votes': votes_collection.count_documents({'precinct': precinct, 'candidate': {'$in': CANDIDATE_ALIASES['Congress']}}),
+            'candidate_b_votes': votes_collection.count_documents({'precinct': precinct, 'candidate': {'$in': CANDIDATE_ALIASES['BJP']}}),
+            'unique_voters': len(votes_collection.distinct('user_id', {'precinct': precinct})),
+        })
+    for level in ['high', 'medium', 'low']:
+        result[f'{level}_risk_votes'] = votes_collection.count_documents({'fraud_risk_level': level})
+    result['flagged_votes'] = votes_collection.count_documents({'flagged_for_review': True})
+    return result
+
+
+def tally_refresh(votes_collection):
+    tally = compute_tally(votes_collection)
+    result = {
+        'total_votes': tally.total,
+        'candidate_a_votes': tally.candidate_votes('Congress'),
+        'candidate_b_votes': tally.candidate_votes('BJP'),
+        'precincts': summarize_precincts(tally, PRECINCTS),
+    }
+    for level in ['high', 'medium', 'low']:
+        result[f'{level}_risk_votes'] = tally.risk_count(level)
+    result['flagged_votes'] = tally.flagged
+    return result
+
+
+def seed_votes(votes_collection, size, batch_size=10000):
+    votes_collection.drop()
+    candidates = [name for names in CANDIDATE_ALIASES.values() for name in names]
+    start = datetime.utcnow() - timedelta(days=1)
+    rng = random.Random(42)
+    inserted = 0
+    while inserted < size:
+        batch = []
+        for i in range(inserted, min(size, inserted + batch_size)):
+            risk = rng.choices(['low', 'medium', 'high'], weights=[85, 10, 5])[0]
+            batch.append({
+                'user_id': f'bench-voter-{i}',
+                'candidate': rng.choice(candidates),
+                'precinct': rng.choice(PRECINCTS),
+                'transaction_id': str(uuid.uuid4()),
+                'timestamp': start + timedelta(seconds=i),
+                'verified': True,
+                'fraud_score': rng.random(),
+                'fraud_risk_level': risk,
+                'flagged_for_review': risk == 'medium',
+            })
+        votes_collection.insert_many(batch, ordered=False)
+        inserted += len(batch)
+
+
+def measure(fn, votes_collection, counter, repeats):
+    latencies = []
+    commands = 0
+    result = None
+    for _ in range(repeats):
+        before = counter.count
+        started = time.perf_counter()
+        result = fn(votes_collection)
+        latencies.append((time.perf_counter() - started) * 1000)
+        commands = counter.count - before
+    return result, {
+        'queries_per_refresh': commands,
+        'latency_ms_median': round(statistics.median(latencies), 2),
+        'latency_ms_min': round(min(latencies), 2),
+        'latency_ms_max': round(max(latencies), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongodb-uri', default=os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db-name', default='election_benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = MongoClient(args.mongodb_uri, event_listeners=[counter])
+    votes_collection = client[args.db_name]['votes']
+
+    results = []
+    try:
+        for size in args.sizes:
+            print(f"Seeding {size} votes...")
+            seed_votes(votes_collection, size)
+            legacy_result, legacy_stats = measure(legacy_refresh, votes_collection, counter, args.repeats)
+            tally_result, tally_stats = measure(tally_refresh, votes_collection, counter, args.repeats)
+            if legacy_result != tally_result:
+                print(f"✗ Result mismatch at {size} votes")
+            row = {'votes': size, 'legacy': legacy_stats, 'tally': tally_stats, 'results_match': legacy_result == tally_result}
+            results.append(row)
+            print(f"  legacy: {legacy_stats['queries_per_refresh']} queries, {legacy_stats['latency_ms_median']} ms")
+            print(f"  tally:  {tally_stats['queries_per_refresh']} queries, {tally_stats['latency_ms_median']} ms")
+    finally:
+        client.drop_database(args.db_name)
+        client.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'generated_at': datetime.utcnow().isoformat(), 'results': results}, f, indent=2)
+        print(f"✓ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
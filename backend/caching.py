@@ -0,0 +1,224 @@
+"""
+Response Caching Module
+- Size-bounded LRU cache with per-entry TTL for read-heavy dashboard endpoints
+- Explicit invalidation hooks fired by writes (votes, registrations, verification)
+- Hit/miss/eviction counters per namespace for sizing
+
+The cache is per process: with several gunicorn workers an invalidation only
+reaches the worker that handled the write, so each namespace TTL bounds how
+stale another worker's copy can get.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import threading
+import logging
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._entries.pop(key, _MISSING) is not _MISSING
+
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                del self._entries[key]
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+# Seconds each dashboard response may be served from cache
+DEFAULT_TTLS = {
+    'statistics': 5.0,
+    'precinct_status': 5.0,
+    'user_stats': 15.0,
+    'fraud_stats': 10.0,
+}
+
+# Write events -> cached namespaces they make stale
+INVALIDATION_EVENTS = {
+    'vote_cast': ['statistics', 'precinct_status', 'fraud_stats'],
+    'voter_registered': ['statistics', 'user_stats'],
+    'user_registered': ['user_stats'],
+    'identity_verified': ['statistics', 'user_stats'],
+    'tallies_reconciled': ['statistics', 'precinct_status', 'fraud_stats'],
+}
+
+
+class ResponseCache:
+    """Caches successful Flask responses keyed by namespace, role and request path."""
+
+    def __init__(self, max_entries: int = 256, ttls: Optional[Dict[str, float]] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.ttls = dict(DEFAULT_TTLS)
+        self.ttls.update(ttls or {})
+        self._cache = TTLCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._namespace_stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        with self._lock:
+            counters = self._namespace_stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'invalidations': 0})
+            counters[outcome] += 1
+
+    def cached(self, namespace: str) -> Callable:
+        """
+        Decorator for view functions; apply it below @jwt_required() so the
+        caller's role claim is part of the cache key.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                from flask import current_app, make_response, request
+                from flask_jwt_extended import get_jwt
+
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                try:
+                    role = get_jwt().get('role')
+                except Exception:
+                    role = None
+                key = (namespace, role, request.full_path)
+
+                entry = self._cache.get(key)
+                if entry is not None:
+                    self._count(namespace, 'hits')
+                    data, status, mimetype = entry
+                    response = current_app.response_class(data, status=status, mimetype=mimetype)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count(namespace, 'misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    ttl = self.ttls.get(namespace, self._cache.default_ttl)
+                    self._cache.set(key, (response.get_data(), response.status_code, response.mimetype), ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *namespaces: str) -> int:
+        targets = set(namespaces)
+        removed = self._cache.invalidate_where(lambda key: key[0] in targets)
+        for namespace in targets:
+            self._count(namespace, 'invalidations')
+        return removed
+
+    def invalidate_for(self, event: str) -> int:
+        """Drop every cached response made stale by a write event (see INVALIDATION_EVENTS)."""
+        return self.invalidate(*INVALIDATION_EVENTS.get(event, []))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            namespaces = {name: dict(counters) for name, counters in self._namespace_stats.items()}
+        return {
+            'enabled': self.enabled,
+            'ttls': dict(self.ttls),
+            'cache': self._cache.stats(),
+            'namespaces': namespaces,
+        }
+
+
+def _ttls_from_env(namespaces: Iterable[str]) -> Dict[str, float]:
+    ttls = {}
+    for namespace in namespaces:
+        value = os.environ.get(f'RESPONSE_CACHE_TTL_{namespace.upper()}')
+        if value is not None:
+            try:
+                ttls[namespace] = float(value)
+            except ValueError:
+                logger.warning(f"Ignoring invalid TTL for {namespace}: {value}")
+    return ttls
+
+
+# Global cache instance (will be initialized in app)
+_response_cache: Optional[ResponseCache] = None
+
+
+def initialize_response_cache() -> ResponseCache:
+    global _response_cache
+    _response_cache = ResponseCache(
+        max_entries=int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256)),
+        ttls=_ttls_from_env(DEFAULT_TTLS),
+        enabled=os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() != 'false',
+    )
+    return _response_cache
+
+
+def get_response_cache() -> ResponseCache:
+    if _response_cache is None:
+        initialize_response_cache()
+    return _response_cache
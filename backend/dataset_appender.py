@@ -0,0 +1,288 @@
+"""
+Dataset Appender Module
+- Write-behind appender for voting_fraud_dataset.csv
+- Rows are queued by cast_vote and flushed in batches by a background thread
+  (batch_writer.BatchWriter), so the request never opens the file itself
+- Batches are written under an exclusive file lock, so rows from several
+  workers never interleave
+- Optional columnar copy (Parquet or Feather part files) of the whole dataset:
+  seeded once from the CSV, then extended under the same lock as the CSV, so
+  load_voting_fraud_dataset can read it instead of parsing the CSV
+- The copy's marker records the size and mtime of the CSV it matches; a failed
+  columnar write, or anything else rewriting the CSV, leaves the copy stale,
+  readers fall back to the CSV and the next batch re-seeds it
+"""
+
+from __future__ import annotations
+
+import os
+import csv
+import json
+import time
+import uuid
+import atexit
+import logging
+import importlib.util
+from typing import Dict, List, Optional
+
+from batch_writer import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+
+DATASET_COLUMNS = [
+    'voter_id', 'age', 'ip_address', 'device_id', 'login_attempts',
+    'vote_duration_sec', 'location_match', 'previous_votes', 'is_fraud'
+]
+
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+# Written whenever the columnar copy holds every CSV row, with the CSV's size and
+# mtime at that point; readers ignore the copy when it is missing or does not match
+SEED_MARKER = '_SEEDED'
+
+
+def _lock_file(f) -> None:
+    """Take an exclusive lock on an open file (blocks until acquired)."""
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after ~10 seconds; keep waiting
+                continue
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(f) -> None:
+    if os.name == 'nt':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def columnar_dir_for(dataset_path: str, columnar_format: str) -> str:
+    return f"{os.path.splitext(dataset_path)[0]}_{columnar_format}"
+
+
+def _csv_signature(stat) -> Dict:
+    return {'csv_size': stat.st_size, 'csv_mtime_ns': stat.st_mtime_ns}
+
+
+def _read_marker(columnar_dir: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(columnar_dir, SEED_MARKER)) as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return marker if isinstance(marker, dict) else None
+
+
+def _write_marker(columnar_dir: str, rows: int, stat) -> None:
+    tmp_path = os.path.join(columnar_dir, f".{SEED_MARKER}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump({'rows': rows, **_csv_signature(stat)}, f)
+    os.replace(tmp_path, os.path.join(columnar_dir, SEED_MARKER))
+
+
+def _is_current(columnar_dir: str, dataset_path: str) -> bool:
+    """True when the copy's marker matches the CSV as it is on disk now"""
+    marker = _read_marker(columnar_dir)
+    if marker is None or not os.path.exists(dataset_path):
+        return False
+    return all(marker.get(key) == value for key, value in _csv_signature(os.stat(dataset_path)).items())
+
+
+def invalidate_columnar_copy(dataset_path: str) -> None:
+    """
+    Mark every columnar copy of dataset_path stale; call after rewriting the CSV
+    outside the appender (the marker check catches it too, this just makes it certain)
+    """
+    for columnar_format in COLUMNAR_FORMATS:
+        try:
+            os.remove(os.path.join(columnar_dir_for(dataset_path, columnar_format), SEED_MARKER))
+        except FileNotFoundError:
+            pass
+
+
+def _write_part(columnar_dir: str, columnar_format: str, df, prefix: str = 'part') -> None:
+    os.makedirs(columnar_dir, exist_ok=True)
+    part_name = f"{prefix}-{int(time.time() * 1000)}-{os.getpid()}-{uuid.uuid4().hex[:8]}.{columnar_format}"
+    # Write under a temporary name so readers never see a partial part file
+    tmp_path = os.path.join(columnar_dir, f".{part_name}.tmp")
+    # Values are stored as text, like the CSV; read_columnar_dataset infers types again
+    df = df.astype(str).reset_index(drop=True)
+    if columnar_format == 'parquet':
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_feather(tmp_path)
+    os.replace(tmp_path, os.path.join(columnar_dir, part_name))
+
+
+class DatasetAppender(BatchWriter):
+    """Background thread that batches dataset rows and appends them to disk."""
+
+    thread_name = 'dataset-appender'
+
+    def __init__(self, dataset_path: str, columns: Optional[List[str]] = None,
+                 max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 2.0,
+                 columnar_format: Optional[str] = None, columnar_dir: Optional[str] = None):
+        if columnar_format and columnar_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unsupported columnar format: {columnar_format}")
+        if columnar_format and importlib.util.find_spec('pyarrow') is None:
+            # Without pyarrow every columnar write would fail; keep readers on the CSV
+            logger.warning(f"DATASET_COLUMNAR_FORMAT={columnar_format} needs pyarrow; keeping only the CSV")
+            invalidate_columnar_copy(dataset_path)
+            columnar_format = None
+        super().__init__(max_queue=max_queue, batch_size=batch_size, flush_interval=flush_interval)
+        self.dataset_path = dataset_path
+        self.columns = columns or list(DATASET_COLUMNS)
+        self.columnar_format = columnar_format
+        self.columnar_dir = columnar_dir or (columnar_dir_for(dataset_path, columnar_format)
+                                             if columnar_format else None)
+
+    def append(self, row: Dict) -> bool:
+        """
+        Queue one row without blocking the caller
+
+        Returns:
+            False when the queue is full and the row was dropped
+        """
+        queued = self.put(row)
+        if not queued and not self._stopping.is_set():
+            logger.warning(f"Dataset append queue full, dropped row ({self.items_dropped} dropped so far)")
+        return queued
+
+    def _write(self, batch: List[Dict]) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.dataset_path)), exist_ok=True)
+        with open(self.dataset_path, 'a+', newline='', encoding='utf-8') as f:
+            _lock_file(f)
+            try:
+                # Checked before this batch lands: the copy must match the CSV as it was
+                current = self.columnar_format is not None and _is_current(self.columnar_dir, self.dataset_path)
+                f.seek(0, os.SEEK_END)
+                writer = csv.writer(f)
+                # Header is written under the lock, so only the first writer adds it
+                if f.tell() == 0:
+                    writer.writerow(self.columns)
+                writer.writerows([[row.get(col, '') for col in self.columns] for row in batch])
+                f.flush()
+                if self.columnar_format:
+                    try:
+                        self._write_columnar(f, batch, current)
+                    except Exception as e:
+                        # The CSV has the batch and the copy does not: readers must not use it
+                        invalidate_columnar_copy(self.dataset_path)
+                        logger.error(f"{self.columnar_format} copy of {self.dataset_path} is stale "
+                                     f"(re-seeded on the next batch): {e}")
+            finally:
+                _unlock_file(f)
+
+    def _write_columnar(self, f, batch: List[Dict], current: bool) -> None:
+        """Called with the CSV lock held, so the copy and the CSV always hold the same rows"""
+        import pandas as pd
+
+        if not current:
+            # No copy yet, or it no longer matches the CSV: copy the CSV as it is
+            # now (already including this batch); later batches add part files
+            f.seek(0)
+            df = pd.read_csv(f, dtype=str, keep_default_na=False)
+            os.makedirs(self.columnar_dir, exist_ok=True)
+            for name in os.listdir(self.columnar_dir):
+                if name.endswith(f'.{self.columnar_format}'):
+                    os.remove(os.path.join(self.columnar_dir, name))
+            if len(df):
+                _write_part(self.columnar_dir, self.columnar_format, df, prefix='part-0-seed')
+            rows = len(df)
+            logger.info(f"Seeded {self.columnar_format} copy of {self.dataset_path} with {rows} row(s)")
+        else:
+            _write_part(self.columnar_dir, self.columnar_format,
+                        pd.DataFrame([[row.get(col, '') for col in self.columns] for row in batch],
+                                     columns=self.columns))
+            rows = int((_read_marker(self.columnar_dir) or {}).get('rows', 0)) + len(batch)
+        _write_marker(self.columnar_dir, rows, os.fstat(f.fileno()))
+
+    def stats(self) -> Dict:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queued': self._queue.qsize(),
+            'rows_written': self.items_written,
+            'batches_written': self.batches_written,
+            'rows_dropped': self.items_dropped,
+            'write_errors': self.write_errors,
+            'columnar_format': self.columnar_format,
+        }
+
+
+def columnar_copy(dataset_path: str) -> Optional[str]:
+    """Directory of the complete columnar copy of dataset_path, if DATASET_COLUMNAR_FORMAT keeps one"""
+    columnar_format = os.environ.get('DATASET_COLUMNAR_FORMAT', '').strip().lower()
+    if columnar_format not in COLUMNAR_FORMATS:
+        return None
+    columnar_dir = columnar_dir_for(dataset_path, columnar_format)
+    return columnar_dir if _is_current(columnar_dir, dataset_path) else None
+
+
+def read_columnar_dataset(columnar_dir: str):
+    """
+    Load every part file of a columnar copy into one DataFrame
+
+    Parts store text like the CSV; columns that are entirely numeric are
+    converted back, so the result matches what pd.read_csv returns.
+    """
+    import pandas as pd
+
+    frames = []
+    if os.path.isdir(columnar_dir):
+        for name in sorted(os.listdir(columnar_dir)):
+            path = os.path.join(columnar_dir, name)
+            if name.endswith('.parquet'):
+                frames.append(pd.read_parquet(path))
+            elif name.endswith('.feather'):
+                frames.append(pd.read_feather(path))
+    if not frames:
+        return pd.DataFrame(columns=DATASET_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    for col in df.columns:
+        values = df[col].where(df[col] != '')
+        numeric = pd.to_numeric(values, errors='coerce')
+        if numeric.notna().sum() == values.notna().sum():
+            df[col] = numeric
+    return df
+
+
+# Global appender instance (will be initialized in app)
+_appender: Optional[DatasetAppender] = None
+
+
+def initialize_dataset_appender(dataset_path: str) -> DatasetAppender:
+    global _appender
+    if _appender is not None:
+        _appender.stop()
+    columnar_format = os.environ.get('DATASET_COLUMNAR_FORMAT', '').strip().lower() or None
+    _appender = DatasetAppender(
+        dataset_path,
+        max_queue=int(os.environ.get('DATASET_APPEND_QUEUE_SIZE', 10000)),
+        batch_size=int(os.environ.get('DATASET_APPEND_BATCH_SIZE', 200)),
+        flush_interval=float(os.environ.get('DATASET_APPEND_FLUSH_SECONDS', 2.0)),
+        columnar_format=columnar_format,
+    ).start()
+    return _appender
+
+
+def get_dataset_appender() -> Optional[DatasetAppender]:
+    return _appender
+
+
+@atexit.register
+def _shutdown_appender() -> None:
+    if _appender is not None:
+        _appender.stop()
@@ -0,0 +1,215 @@
+"""
+Export Formats Module
+- Streams training-export records as NDJSON, CSV or Parquet, chunk by chunk,
+  so an export of any size runs in constant memory
+- Optional gzip (zlib, always available) or zstd (needs the zstandard package)
+  compression of the NDJSON/CSV byte stream; Parquet compresses its column
+  chunks itself (needs pyarrow)
+- Records are the dicts yielded by BehaviorTracker.export_training_data; the
+  nested features dict is written as a JSON string column in CSV and Parquet
+"""
+
+from __future__ import annotations
+
+import io
+import csv
+import json
+import zlib
+import logging
+import importlib.util
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+COLUMNS = ['user_id', 'session_id', 'timestamp', 'label', 'features']
+
+CHUNK_BYTES = 64 * 1024
+PARQUET_ROW_GROUP = 50000
+
+_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet'}
+_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+
+
+class ExportFormatError(ValueError):
+    """Unknown format/compression, or the optional package it needs is missing"""
+
+
+def validate(fmt: str, compression: str) -> None:
+    """Raise ExportFormatError before any byte is streamed"""
+    if fmt not in FORMATS:
+        raise ExportFormatError(f"format must be one of {', '.join(FORMATS)}")
+    if compression not in COMPRESSIONS:
+        raise ExportFormatError(f"compression must be one of {', '.join(COMPRESSIONS)}")
+    if fmt == 'parquet':
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ExportFormatError('parquet export requires the pyarrow package')
+    elif compression == 'zstd':
+        if importlib.util.find_spec('zstandard') is None:
+            raise ExportFormatError('zstd compression requires the zstandard package')
+
+
+def mimetype(fmt: str, compression: str) -> str:
+    if fmt != 'parquet' and compression == 'gzip':
+        return 'application/gzip'
+    if fmt != 'parquet' and compression == 'zstd':
+        return 'application/zstd'
+    return _MIMETYPES[fmt]
+
+
+def filename(stem: str, fmt: str, compression: str) -> str:
+    suffix = _EXTENSIONS.get(compression, '') if fmt != 'parquet' else ''
+    return f"{stem}.{fmt}{suffix}"
+
+
+def _scalar(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)  # ObjectId and friends
+
+
+def _row(record: Dict) -> Dict:
+    return {
+        'user_id': _scalar(record.get('user_id')),
+        'session_id': _scalar(record.get('session_id')),
+        'timestamp': _scalar(record.get('timestamp')),
+        'label': _scalar(record.get('label')),
+        'features': record.get('features') or {},
+    }
+
+
+# ---------------------------------------------------------------------------
+# Text formats
+# ---------------------------------------------------------------------------
+
+def _ndjson_lines(records: Iterable[Dict]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(_row(record), default=str) + '\n'
+
+
+def _csv_lines(records: Iterable[Dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for record in records:
+        row = _row(record)
+        row['features'] = json.dumps(row['features'], default=str)
+        writer.writerow([row[c] for c in COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _compressor(compression: str):
+    if compression == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 -> gzip container
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return None
+
+
+def _chunked(lines: Iterable[str], compression: str, chunk_bytes: int) -> Iterator[bytes]:
+    compressor = _compressor(compression)
+    pending: List[bytes] = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= chunk_bytes:
+            chunk = b''.join(pending)
+            pending, size = [], 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = b''.join(pending)
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Parquet
+# ---------------------------------------------------------------------------
+
+class _DrainableSink(io.RawIOBase):
+    """Write target for ParquetWriter whose contents are handed out and dropped after each row group"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def _parquet_chunks(records: Iterable[Dict], compression: str, row_group: int) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(c, pa.string()) for c in COLUMNS])
+    codec = {'gzip': 'gzip', 'zstd': 'zstd'}.get(compression, 'snappy')
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression=codec)
+    columns: Dict[str, List] = {c: [] for c in COLUMNS}
+
+    def write_group():
+        writer.write_table(pa.table({c: pa.array(v, pa.string()) for c, v in columns.items()}, schema=schema))
+        for values in columns.values():
+            values.clear()
+
+    try:
+        for record in records:
+            row = _row(record)
+            row['features'] = json.dumps(row['features'], default=str)
+            for c in COLUMNS:
+                value = row[c]
+                columns[c].append(None if value is None else str(value))
+            if len(columns['user_id']) >= row_group:
+                write_group()
+                data = sink.drain()
+                if data:
+                    yield data
+        if columns['user_id']:
+            write_group()
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_export(records: Iterable[Dict], fmt: str = 'ndjson', compression: str = 'none',
+                  chunk_bytes: int = CHUNK_BYTES, row_group: int = PARQUET_ROW_GROUP) -> Iterator[bytes]:
+    """
+    Encode records as a byte stream in fmt, compressed with compression
+
+    Memory stays bounded by chunk_bytes (NDJSON/CSV) or one row group (Parquet)
+    regardless of how many records the iterable yields.
+    """
+    validate(fmt, compression)
+    if fmt == 'parquet':
+        return _parquet_chunks(records, compression, row_group)
+    lines = _ndjson_lines(records) if fmt == 'ndjson' else _csv_lines(records)
+    return _chunked(lines, compression, chunk_bytes)
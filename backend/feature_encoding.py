@@ -0,0 +1,76 @@
+"""
+Feature Encoding Module
+- Deterministic identifier encoding shared by training and serving
+- Keyed BLAKE2b instead of Python's hash(), which is salted per process, so
+  every gunicorn worker (and the training job) maps an IP, device or voter to
+  the same number
+- LRU memo for repeated identifiers, and a vectorized form for pandas columns
+  that hashes each distinct value once
+
+Changing FEATURE_HASH_KEY changes every encoded value: retrain the model after
+changing it.
+"""
+
+from __future__ import annotations
+
+import os
+import hashlib
+from functools import lru_cache
+
+HASH_MODULUS = 10 ** 8
+# voting_fraud_dataset.csv stores voters as V#### and devices as DV####
+TOKEN_MODULUS = 10 ** 4
+
+_HASH_KEY = os.environ.get('FEATURE_HASH_KEY', 'election-fraud-features-v1').encode('utf-8')[:64]
+
+
+@lru_cache(maxsize=int(os.environ.get('FEATURE_HASH_CACHE_SIZE', 65536)))
+def stable_hash(value, modulus: int = HASH_MODULUS) -> int:
+    """Keyed, process-independent hash of str(value) in [0, modulus); None hashes like ''."""
+    text = '' if value is None else str(value)
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8, key=_HASH_KEY).digest()
+    return int.from_bytes(digest, 'big') % modulus
+
+
+def voter_token(user_id) -> str:
+    """Anonymized voter label written to the training dataset"""
+    return f"V{stable_hash(user_id, TOKEN_MODULUS):04d}"
+
+
+def device_token(user_agent) -> str:
+    """Device label written to the training dataset"""
+    return f"DV{stable_hash(user_agent or '', TOKEN_MODULUS)}"
+
+
+def encode_voter(user_id) -> int:
+    """Model voter_id: the digits of voter_token, as the dataset loader reads them"""
+    return stable_hash(user_id, TOKEN_MODULUS)
+
+
+def encode_ip(ip_address) -> int:
+    return stable_hash(ip_address)
+
+
+def encode_device(user_agent) -> int:
+    """Model device_id: the encoded device_token, as the dataset loader reads it"""
+    return stable_hash(device_token(user_agent))
+
+
+def encode_series(series, modulus: int = HASH_MODULUS):
+    """
+    stable_hash every value of a pandas Series
+
+    Values are factorized first, so each distinct identifier is hashed once
+    and the result is gathered with a NumPy take instead of a per-row apply.
+    Missing values (None, NaN) encode like stable_hash(None), not as 'nan'.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(series.fillna('').astype(str), sort=False)
+    encoded = np.fromiter((stable_hash(value, modulus) for value in uniques), dtype=np.int64, count=len(uniques))
+    return pd.Series(encoded[codes], index=series.index)
+
+
+def cache_info():
+    return stable_hash.cache_info()
@@ -0,0 +1,306 @@
+"""
+Feature Registry Module
+- Fraud features are produced by named extractor groups (temporal, profile,
+  session, device, history counts, history intervals, model inputs)
+- A FeatureContext runs a group only when one of its features is asked for,
+  and at most once per vote
+- Models declare the feature names they consume; the rest can be filled in
+  later, off the request path, by a FeatureRecorder
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from batch_writer import BatchWriter
+from feature_encoding import encode_device, encode_ip, encode_voter, stable_hash
+from voter_feature_store import VoterHistorySummary, as_history_summary
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureRegistry:
+    """Maps every feature name to the extractor group that computes it."""
+
+    def __init__(self):
+        self._extractors: Dict[str, Callable[['FeatureContext'], Dict]] = {}
+        self._provides: Dict[str, List[str]] = {}
+        self._group_of: Dict[str, str] = {}
+
+    def extractor(self, group: str, provides: List[str]) -> Callable:
+        """Decorator registering fn(ctx) -> {feature: value} for the listed features."""
+        def decorator(fn):
+            for name in provides:
+                if name in self._group_of:
+                    raise ValueError(f"Feature {name} already provided by group {self._group_of[name]}")
+                self._group_of[name] = group
+            self._extractors[group] = fn
+            self._provides[group] = list(provides)
+            return fn
+        return decorator
+
+    def group_of(self, name: str) -> Optional[str]:
+        return self._group_of.get(name)
+
+    def groups(self) -> List[str]:
+        return list(self._extractors)
+
+    def features(self, group: Optional[str] = None) -> List[str]:
+        if group is not None:
+            return list(self._provides[group])
+        return list(self._group_of)
+
+    def context(self, voter_data: Dict, vote_data: Dict, historical_data,
+                now: Optional[datetime] = None) -> 'FeatureContext':
+        return FeatureContext(self, voter_data, vote_data, historical_data, now)
+
+
+class FeatureContext:
+    """
+    Lazily computed features for one vote attempt.
+
+    historical_data may be a VoterHistorySummary (from the voter feature store)
+    or a list of vote documents, which is summarized once up front.
+    """
+
+    def __init__(self, registry: FeatureRegistry, voter_data: Dict, vote_data: Dict,
+                 historical_data, now: Optional[datetime] = None):
+        self.registry = registry
+        self.voter_data = voter_data
+        self.vote_data = vote_data
+        self.now = now or datetime.utcnow()
+        self.history: VoterHistorySummary = as_history_summary(historical_data, self.now)
+        self.vote_time = vote_data.get('timestamp', self.now)
+        self._values: Dict = {}
+        self._groups_run: List[str] = []
+
+    def _run(self, group: str) -> None:
+        if group in self._groups_run:
+            return
+        self._values.update(self.registry._extractors[group](self))
+        self._groups_run.append(group)
+
+    def get(self, name: str, default=0):
+        group = self.registry.group_of(name)
+        if group is None:
+            return default
+        self._run(group)
+        return self._values.get(name, default)
+
+    def collect(self, names: Iterable[str]) -> Dict:
+        """Registered features among names, in the given order; unknown names are skipped."""
+        features = {}
+        for name in names:
+            group = self.registry.group_of(name)
+            if group is not None:
+                self._run(group)
+                features[name] = self._values[name]
+        return features
+
+    @property
+    def groups_run(self) -> List[str]:
+        return list(self._groups_run)
+
+    def remaining(self) -> Dict:
+        """Run every group not run yet and return only the features they produced."""
+        before = set(self._values)
+        for group in self.registry.groups():
+            self._run(group)
+        return {k: v for k, v in self._values.items() if k not in before}
+
+    def all_features(self) -> Dict:
+        self.remaining()
+        return dict(self._values)
+
+    def detached(self) -> 'FeatureContext':
+        """Copy safe to finish on another thread after the request moves on."""
+        ctx = FeatureContext(self.registry, dict(self.voter_data), dict(self.vote_data),
+                             self.history, self.now)
+        ctx._values = dict(self._values)
+        ctx._groups_run = list(self._groups_run)
+        return ctx
+
+
+# ---------------------------------------------------------------------------
+# Default extractors (see FraudDetector for the models that consume them)
+# ---------------------------------------------------------------------------
+
+FRAUD_FEATURES = FeatureRegistry()
+
+
+@FRAUD_FEATURES.extractor('model_inputs', [
+    'voter_id', 'age', 'ip_address', 'device_id', 'login_attempts', 'vote_duration_sec'
+])
+def _model_inputs(ctx: FeatureContext) -> Dict:
+    voter, vote = ctx.voter_data, ctx.vote_data
+    return {
+        'voter_id': encode_voter(voter.get('voter_id', '')),
+        'age': voter.get('age', 0),
+        'ip_address': encode_ip(vote.get('ip_address', '')),
+        'device_id': encode_device(vote.get('user_agent', '')),
+        'login_attempts': vote.get('login_attempts', 1),
+        'vote_duration_sec': vote.get('session_duration', 0),
+    }
+
+
+@FRAUD_FEATURES.extractor('model_history', ['location_match', 'previous_votes'])
+def _model_history(ctx: FeatureContext) -> Dict:
+    history = ctx.history
+    if history:
+        location_match = 1 if history.has_ip(ctx.vote_data.get('ip_address', '')) else 0
+    else:
+        location_match = 1  # First vote, assume match
+    return {'location_match': location_match, 'previous_votes': len(history)}
+
+
+@FRAUD_FEATURES.extractor('temporal', ['hour_of_day', 'day_of_week', 'is_weekend', 'unusual_voting_time'])
+def _temporal(ctx: FeatureContext) -> Dict:
+    vote_time = ctx.vote_time
+    return {
+        'hour_of_day': vote_time.hour,
+        'day_of_week': vote_time.weekday(),
+        'is_weekend': 1 if vote_time.weekday() >= 5 else 0,
+        'unusual_voting_time': 1 if vote_time.hour < 6 or vote_time.hour > 22 else 0,
+    }
+
+
+@FRAUD_FEATURES.extractor('profile', [
+    'voter_age', 'voter_registration_days', 'has_verified_identity', 'has_mfa_enabled'
+])
+def _profile(ctx: FeatureContext) -> Dict:
+    voter = ctx.voter_data
+    return {
+        'voter_age': voter.get('age', 0),
+        'voter_registration_days': (ctx.now - voter.get('registration_date', ctx.now)).days,
+        'has_verified_identity': 1 if voter.get('identity_verified') else 0,
+        'has_mfa_enabled': 1 if voter.get('mfa_type', 'none') != 'none' else 0,
+    }
+
+
+@FRAUD_FEATURES.extractor('session', [
+    'login_attempts_today', 'session_duration_seconds', 'page_views_before_vote',
+    'time_on_voting_page_seconds', 'rapid_consecutive_votes', 'session_too_short', 'session_too_long'
+])
+def _session(ctx: FeatureContext) -> Dict:
+    vote = ctx.vote_data
+    session_duration = vote.get('session_duration', 0)
+    return {
+        'login_attempts_today': vote.get('login_attempts', 0),
+        'session_duration_seconds': session_duration,
+        'page_views_before_vote': vote.get('page_views', 0),
+        'time_on_voting_page_seconds': vote.get('time_on_page', 0),
+        'rapid_consecutive_votes': 1 if vote.get('votes_in_last_hour', 0) > 3 else 0,
+        'session_too_short': 1 if session_duration < 30 else 0,
+        'session_too_long': 1 if session_duration > 3600 else 0,
+    }
+
+
+@FRAUD_FEATURES.extractor('device', ['ip_address_hash', 'user_agent_hash', 'is_mobile_device'])
+def _device(ctx: FeatureContext) -> Dict:
+    vote = ctx.vote_data
+    return {
+        'ip_address_hash': stable_hash(vote.get('ip_address', '')),
+        'user_agent_hash': stable_hash(vote.get('user_agent', '')),
+        'is_mobile_device': 1 if vote.get('is_mobile') else 0,
+    }
+
+
+@FRAUD_FEATURES.extractor('history_counts', [
+    'total_previous_votes', 'unique_ip_addresses_used', 'unique_devices_used'
+])
+def _history_counts(ctx: FeatureContext) -> Dict:
+    history = ctx.history
+    if not history:
+        return {'total_previous_votes': 0, 'unique_ip_addresses_used': 1, 'unique_devices_used': 1}
+    return {
+        'total_previous_votes': len(history),
+        'unique_ip_addresses_used': history.unique_ips,
+        'unique_devices_used': history.unique_devices,
+    }
+
+
+@FRAUD_FEATURES.extractor('history_intervals', ['avg_time_between_votes', 'std_time_between_votes'])
+def _history_intervals(ctx: FeatureContext) -> Dict:
+    history = ctx.history
+    if not history.interval_count:
+        return {'avg_time_between_votes': 0, 'std_time_between_votes': 0}
+    return {'avg_time_between_votes': history.interval_mean, 'std_time_between_votes': history.interval_std}
+
+
+# Key order of the dict extract_voter_behavior_features has always returned
+BEHAVIOR_FEATURES = [
+    'hour_of_day', 'day_of_week', 'is_weekend',
+    'voter_age', 'voter_registration_days', 'has_verified_identity', 'has_mfa_enabled',
+    'login_attempts_today', 'session_duration_seconds', 'page_views_before_vote', 'time_on_voting_page_seconds',
+    'ip_address_hash', 'user_agent_hash', 'is_mobile_device',
+    'avg_time_between_votes', 'std_time_between_votes',
+    'total_previous_votes', 'unique_ip_addresses_used', 'unique_devices_used',
+    'rapid_consecutive_votes', 'unusual_voting_time', 'session_too_short', 'session_too_long',
+]
+
+
+class FeatureRecorder(BatchWriter):
+    """
+    Background thread that finishes feature extraction for assessed votes and
+    hands the complete feature set to a sink in batches.
+
+    The sink receives a list of {'assessment_id', 'voter_id', 'created_at',
+    'features'} documents.
+    """
+
+    thread_name = 'feature-recorder'
+
+    def __init__(self, sink: Callable[[List[Dict]], None], max_queue: int = 10000,
+                 batch_size: int = 200, flush_interval: float = 2.0):
+        super().__init__(max_queue=max_queue, batch_size=batch_size, flush_interval=flush_interval)
+        self.sink = sink
+        self.extraction_errors = 0
+
+    def submit(self, assessment_id: str, voter_id, ctx: FeatureContext) -> bool:
+        return self.put((assessment_id, voter_id, ctx.detached()))
+
+    def _prepare(self, item) -> Optional[Dict]:
+        assessment_id, voter_id, ctx = item
+        try:
+            features = ctx.all_features()
+        except Exception as e:
+            self.extraction_errors += 1
+            logger.warning(f"Feature extraction for assessment {assessment_id} failed: {e}")
+            return None
+        return {
+            'assessment_id': assessment_id,
+            'voter_id': voter_id,
+            'created_at': ctx.now,
+            'features': features,
+        }
+
+    def _write(self, batch: List[Dict]) -> None:
+        self.sink(batch)
+
+    def stats(self) -> Dict:
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'queued': self._queue.qsize(),
+            'recorded': self.items_written,
+            'dropped': self.items_dropped,
+            'errors': self.extraction_errors + self.write_errors,
+        }
+
+
+_recorders: List[FeatureRecorder] = []
+
+
+def start_feature_recorder(sink: Callable[[List[Dict]], None]) -> FeatureRecorder:
+    """Start a recorder that is flushed and stopped at interpreter exit."""
+    recorder = FeatureRecorder(sink).start()
+    _recorders.append(recorder)
+    return recorder
+
+
+@atexit.register
+def _shutdown_recorders() -> None:
+    for recorder in _recorders:
+        recorder.stop()
@@ -4,9 +4,11 @@ Uses a local Random Forest model if available, otherwise rule-based heuristics.
 """
 
 import numpy as np
+import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 import logging
+from feature_registry import FRAUD_FEATURES, BEHAVIOR_FEATURES, FeatureContext, start_feature_recorder
 try:
     # Optional local RandomForest model service
     from random_forest_fraud import get_rf_service
@@ -15,15 +17,49 @@ except Exception:
 import os
 import json
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Handlers are configured by the app (see structured_logging.py)
 logger = logging.getLogger(__name__)
 
+# Rule-based fallback: (rule name, behavior feature, default when missing, comparison, threshold, weight)
+# Scores are summed in this order, then capped at 1.0
+FRAUD_RULES = [
+    ('rapid_consecutive_votes', 'rapid_consecutive_votes', 0, '==', 1, 0.3),
+    ('excessive_login_attempts', 'login_attempts_today', 0, '>', 5, 0.2),
+    ('session_too_short', 'session_too_short', 0, '==', 1, 0.15),
+    ('multiple_ip_addresses', 'unique_ip_addresses_used', 1, '>', 3, 0.2),
+    ('multiple_devices', 'unique_devices_used', 1, '>', 3, 0.15),
+    ('no_mfa', 'has_mfa_enabled', 0, '==', 0, 0.1),
+    ('identity_not_verified', 'has_verified_identity', 0, '==', 0, 0.15),
+    ('unusual_voting_time', 'unusual_voting_time', 0, '==', 1, 0.05),
+]
+
+# Features each model consumes; assess_vote_risk extracts only the active model's
+RULE_FEATURES = [rule[1] for rule in FRAUD_RULES]
+MODEL_INPUT_FEATURES = FRAUD_FEATURES.features('model_inputs') + FRAUD_FEATURES.features('model_history')
+
 
 class FraudDetector:
     """Fraud detection using local model or rules"""
     def __init__(self):
         self.model_source = "random_forest_local" if (get_rf_service and get_rf_service()) else "rule_based"
+        self.feature_recorder = None
+        self.scoring_pool = None
+    
+    def enable_scoring_pool(self, pool) -> None:
+        """Score single votes in fraud_scoring_pool workers instead of the request thread"""
+        self.scoring_pool = pool
+    
+    def enable_feature_recording(self, sink) -> None:
+        """
+        Record every registered feature for each assessed vote, computed on a
+        background thread and passed to sink(list_of_documents) in batches
+        """
+        if self.feature_recorder is None:
+            self.feature_recorder = start_feature_recorder(sink)
+    
+    def _ready_rf_service(self):
+        rf_service = get_rf_service() if get_rf_service else None
+        return rf_service if rf_service and rf_service.is_ready() else None
     
     def extract_model_features(self, voter_data: Dict, vote_data: Dict, historical_data: List[Dict]) -> Dict:
         """
@@ -39,38 +75,7 @@ class FraudDetector:
         Returns:
             Dictionary of extracted features for the model
         """
-        features = {}
-        
-        # Voter ID (hash to numeric)
-        features['voter_id'] = hash(voter_data.get('voter_id', '')) % (10 ** 8)
-        
-        # Age
-        features['age'] = voter_data.get('age', 0)
-        
-        # IP address (hash to numeric)
-        features['ip_address'] = hash(vote_data.get('ip_address', '')) % (10 ** 8)
-        
-        # Device ID (hash of user agent to numeric)
-        features['device_id'] = hash(vote_data.get('user_agent', '')) % (10 ** 8)
-        
-        # Login attempts
-        features['login_attempts'] = vote_data.get('login_attempts', 1)
-        
-        # Vote duration (session duration)
-        features['vote_duration_sec'] = vote_data.get('session_duration', 0)
-        
-        # Location match (1 if IP is consistent with history, 0 otherwise)
-        if historical_data:
-            historical_ips = [h.get('ip_address', '') for h in historical_data]
-            current_ip = vote_data.get('ip_address', '')
-            features['location_match'] = 1 if current_ip in historical_ips else 0
-        else:
-            features['location_match'] = 1  # First vote, assume match
-        
-        # Previous votes count
-        features['previous_votes'] = len(historical_data)
-        
-        return features
+        return FRAUD_FEATURES.context(voter_data, vote_data, historical_data).collect(MODEL_INPUT_FEATURES)
     
     def extract_voter_behavior_features(self, voter_data: Dict, 
                                        vote_data: Dict, 
@@ -86,70 +91,7 @@ class FraudDetector:
         Returns:
             Dictionary of extracted features
         """
-        features = {}
-        
-        # Temporal features
-        now = datetime.utcnow()
-        vote_time = vote_data.get('timestamp', now)
-        
-        features['hour_of_day'] = vote_time.hour
-        features['day_of_week'] = vote_time.weekday()
-        features['is_weekend'] = 1 if vote_time.weekday() >= 5 else 0
-        
-        # Voter profile features
-        features['voter_age'] = voter_data.get('age', 0)
-        features['voter_registration_days'] = (now - voter_data.get('registration_date', now)).days
-        features['has_verified_identity'] = 1 if voter_data.get('identity_verified') else 0
-        features['has_mfa_enabled'] = 1 if voter_data.get('mfa_type', 'none') != 'none' else 0
-        
-        # Behavioral features from current session
-        features['login_attempts_today'] = vote_data.get('login_attempts', 0)
-        features['session_duration_seconds'] = vote_data.get('session_duration', 0)
-        features['page_views_before_vote'] = vote_data.get('page_views', 0)
-        features['time_on_voting_page_seconds'] = vote_data.get('time_on_page', 0)
-        
-        # Device and location features
-        features['ip_address_hash'] = hash(vote_data.get('ip_address', '')) % (10 ** 8)
-        features['user_agent_hash'] = hash(vote_data.get('user_agent', '')) % (10 ** 8)
-        features['is_mobile_device'] = 1 if vote_data.get('is_mobile') else 0
-        
-        # Historical pattern features
-        if historical_data:
-            # Calculate average time between votes for this voter
-            vote_times = [h.get('timestamp', now) for h in historical_data]
-            if len(vote_times) > 1:
-                time_diffs = [(vote_times[i] - vote_times[i-1]).total_seconds() 
-                             for i in range(1, len(vote_times))]
-                features['avg_time_between_votes'] = np.mean(time_diffs)
-                features['std_time_between_votes'] = np.std(time_diffs)
-            else:
-                features['avg_time_between_votes'] = 0
-                features['std_time_between_votes'] = 0
-            
-            # Historical voting count
-            features['total_previous_votes'] = len(historical_data)
-            
-            # IP address changes
-            unique_ips = len(set([h.get('ip_address', '') for h in historical_data]))
-            features['unique_ip_addresses_used'] = unique_ips
-            
-            # Device consistency
-            unique_devices = len(set([h.get('user_agent', '') for h in historical_data]))
-            features['unique_devices_used'] = unique_devices
-        else:
-            features['avg_time_between_votes'] = 0
-            features['std_time_between_votes'] = 0
-            features['total_previous_votes'] = 0
-            features['unique_ip_addresses_used'] = 1
-            features['unique_devices_used'] = 1
-        
-        # Anomaly indicators
-        features['rapid_consecutive_votes'] = 1 if vote_data.get('votes_in_last_hour', 0) > 3 else 0
-        features['unusual_voting_time'] = 1 if vote_time.hour < 6 or vote_time.hour > 22 else 0
-        features['session_too_short'] = 1 if features['session_duration_seconds'] < 30 else 0
-        features['session_too_long'] = 1 if features['session_duration_seconds'] > 3600 else 0
-        
-        return features
+        return FRAUD_FEATURES.context(voter_data, vote_data, historical_data).collect(BEHAVIOR_FEATURES)
     
     def predict_fraud_probability(self, features: Dict) -> Tuple[float, Dict]:
         """Predict fraud probability using local RF if available, else rules"""
@@ -163,16 +105,16 @@ class FraudDetector:
                         'timestamp': datetime.utcnow().isoformat(),
                         'features_used': list(features.keys())
                     }
-                    logger.info(f"RF fraud prediction: {fraud_prob:.4f}")
+                    logger.debug(f"RF fraud prediction: {fraud_prob:.4f}")
                     return fraud_prob, details
             except Exception as e:
                 logger.warning(f"Local RF prediction failed: {e}")
-        logger.info("Using rule-based detection")
+        logger.debug("Using rule-based detection")
         return self._rule_based_detection(features)
     
     def _rule_based_detection(self, features: Dict) -> Tuple[float, Dict]:
         """
-        Fallback rule-based fraud detection when Vertex AI is unavailable
+        Fallback rule-based fraud detection when the Random Forest is unavailable
         
         Args:
             features: Dictionary of extracted features
@@ -180,105 +122,166 @@ class FraudDetector:
         Returns:
             Tuple of (fraud_probability, prediction_details)
         """
-        fraud_score = 0.0
-        triggered_rules = []
-        
-        # Rule 1: Rapid consecutive votes
-        if features.get('rapid_consecutive_votes', 0) == 1:
-            fraud_score += 0.3
-            triggered_rules.append('rapid_consecutive_votes')
-        
-        # Rule 2: Too many login attempts
-        if features.get('login_attempts_today', 0) > 5:
-            fraud_score += 0.2
-            triggered_rules.append('excessive_login_attempts')
-        
-        # Rule 3: Session too short (rushed voting)
-        if features.get('session_too_short', 0) == 1:
-            fraud_score += 0.15
-            triggered_rules.append('session_too_short')
-        
-        # Rule 4: Multiple unique IPs (suspicious)
-        if features.get('unique_ip_addresses_used', 1) > 3:
-            fraud_score += 0.2
-            triggered_rules.append('multiple_ip_addresses')
-        
-        # Rule 5: Multiple devices (suspicious)
-        if features.get('unique_devices_used', 1) > 3:
-            fraud_score += 0.15
-            triggered_rules.append('multiple_devices')
-        
-        # Rule 6: No MFA enabled
-        if features.get('has_mfa_enabled', 0) == 0:
-            fraud_score += 0.1
-            triggered_rules.append('no_mfa')
-        
-        # Rule 7: Identity not verified
-        if features.get('has_verified_identity', 0) == 0:
-            fraud_score += 0.15
-            triggered_rules.append('identity_not_verified')
-        
-        # Rule 8: Unusual voting time
-        if features.get('unusual_voting_time', 0) == 1:
-            fraud_score += 0.05
-            triggered_rules.append('unusual_voting_time')
-        
-        # Normalize to [0, 1]
-        fraud_probability = min(fraud_score, 1.0)
-        
-        prediction_details = {
-            'model_type': 'rule_based',
-            'timestamp': datetime.utcnow().isoformat(),
-            'triggered_rules': triggered_rules,
-            'rule_count': len(triggered_rules)
-        }
+        probabilities, details = self._rule_based_detection_batch([features])
+        logger.debug(f"Rule-based fraud score: {probabilities[0]:.4f} "
+                     f"(triggered {details[0]['rule_count']} rules)")
+        return float(probabilities[0]), details[0]
+    
+    def _rule_based_detection_batch(self, features_list: List[Dict]) -> Tuple[np.ndarray, List[Dict]]:
+        """
+        Evaluate FRAUD_RULES for many behavior feature dicts as array operations
         
-        logger.info(f"Rule-based fraud score: {fraud_probability:.4f} "
-                   f"(triggered {len(triggered_rules)} rules)")
-        return fraud_probability, prediction_details
+        Returns:
+            Tuple of (fraud probabilities array, prediction_details per input)
+        """
+        n = len(features_list)
+        values = np.empty((n, len(FRAUD_RULES)), dtype=np.float64)
+        for j, (_, feature, default, _, _, _) in enumerate(FRAUD_RULES):
+            values[:, j] = np.fromiter((f.get(feature, default) for f in features_list),
+                                       dtype=np.float64, count=n)
+        
+        triggered = np.empty_like(values, dtype=bool)
+        scores = np.zeros(n, dtype=np.float64)
+        for j, (_, _, _, op, threshold, weight) in enumerate(FRAUD_RULES):
+            triggered[:, j] = values[:, j] > threshold if op == '>' else values[:, j] == threshold
+            # Column-by-column keeps the same summation order as scoring one vote at a time
+            scores += np.where(triggered[:, j], weight, 0.0)
+        probabilities = np.minimum(scores, 1.0)
+        
+        timestamp = datetime.utcnow().isoformat()
+        rule_names = [rule[0] for rule in FRAUD_RULES]
+        details = []
+        for row in triggered:
+            triggered_rules = [name for name, hit in zip(rule_names, row) if hit]
+            details.append({
+                'model_type': 'rule_based',
+                'timestamp': timestamp,
+                'triggered_rules': triggered_rules,
+                'rule_count': len(triggered_rules)
+            })
+        return probabilities, details
     
     def assess_vote_risk(self, voter_data: Dict, vote_data: Dict, 
-                        historical_data: List[Dict]) -> Dict:
+                        historical_data) -> Dict:
         """
         Complete fraud risk assessment for a vote attempt
         
         Args:
             voter_data: Current voter information
             vote_data: Current vote attempt data
-            historical_data: Historical voting patterns
+            historical_data: Historical voting patterns (vote documents or a VoterHistorySummary)
             
         Returns:
             Dictionary containing risk assessment results
         """
-        # Extract model-compatible features for ML prediction
-        model_features = self.extract_model_features(
-            voter_data, vote_data, historical_data
-        )
+        ctx = FRAUD_FEATURES.context(voter_data, vote_data, historical_data)
+        fraud_prob, prediction_details, model_features, behavior_features = self._score(ctx)
         
-        # Extract behavior features for rule-based fallback
-        behavior_features = self.extract_voter_behavior_features(
-            voter_data, vote_data, historical_data
+        assessment = self._build_assessment(
+            fraud_prob, prediction_details, voter_data, model_features, behavior_features
         )
+        self._record_remaining(assessment, ctx)
+        logger.debug(f"Vote risk assessment: {assessment['risk_level']} risk (prob={fraud_prob:.4f})")
+        return assessment
+    
+    def _score(self, ctx: FeatureContext) -> Tuple[float, Dict, Dict, Dict]:
+        """
+        Score one vote with the active model, extracting only the features it declares
         
-        # Try ML prediction first with model features, fallback to rules with behavior features
-        rf_service = get_rf_service() if get_rf_service else None
-        if rf_service and rf_service.is_ready():
+        Returns:
+            Tuple of (fraud_probability, prediction_details, model_features, behavior_features);
+            the feature dict of the model that did not run is empty
+        """
+        rf_service = self._ready_rf_service()
+        model_features = {}
+        if rf_service:
+            model_features = ctx.collect(rf_service.model.features)
+            fallback_reason = None
             try:
-                fraud_prob = rf_service.predict_proba(model_features)
-                prediction_details = {
-                    'model_type': 'random_forest_local',
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'features_used': list(model_features.keys())
-                }
-                logger.info(f"RF fraud prediction: {fraud_prob:.4f}")
+                if self.scoring_pool is not None:
+                    fraud_prob, fallback_reason = self.scoring_pool.score(model_features)
+                else:
+                    fraud_prob = rf_service.predict_proba(model_features)
+                if fallback_reason is None:
+                    prediction_details = {
+                        'model_type': 'random_forest_local',
+                        'timestamp': datetime.utcnow().isoformat(),
+                        'features_used': list(model_features.keys())
+                    }
+                    logger.debug(f"RF fraud prediction: {fraud_prob:.4f}")
+                    return fraud_prob, prediction_details, model_features, {}
+                logger.debug(f"RF scoring pool fallback ({fallback_reason}), using rules")
             except Exception as e:
                 logger.warning(f"ML prediction failed: {e}, falling back to rules")
-                fraud_prob, prediction_details = self._rule_based_detection(behavior_features)
-        else:
-            # Use rule-based detection with behavior features
+            behavior_features = ctx.collect(RULE_FEATURES)
             fraud_prob, prediction_details = self._rule_based_detection(behavior_features)
+            if fallback_reason is not None:
+                prediction_details['fallback_reason'] = fallback_reason
+            return fraud_prob, prediction_details, model_features, behavior_features
+        behavior_features = ctx.collect(RULE_FEATURES)
+        fraud_prob, prediction_details = self._rule_based_detection(behavior_features)
+        return fraud_prob, prediction_details, model_features, behavior_features
+    
+    def _record_remaining(self, assessment: Dict, ctx: FeatureContext) -> None:
+        if self.feature_recorder is not None:
+            self.feature_recorder.submit(assessment['assessment_id'], assessment.get('voter_id'), ctx)
+    
+    def assess_batch(self, voters: List[Dict], attempts: List[Dict],
+                     histories: List) -> List[Dict]:
+        """
+        Fraud risk assessment for many vote attempts at once
+        
+        Features are extracted per vote into one NumPy matrix; the Random
+        Forest (or the rule fallback) then scores the whole matrix at once.
+        
+        Args:
+            voters: Voter information, one entry per vote
+            attempts: Vote attempt data, aligned with voters
+            histories: Historical voting patterns (vote documents or a VoterHistorySummary), aligned with voters
+            
+        Returns:
+            List of assessments in the same order as the inputs
+        """
+        if not (len(voters) == len(attempts) == len(histories)):
+            raise ValueError('voters, attempts and histories must have the same length')
+        
+        contexts = [FRAUD_FEATURES.context(v, a, h) for v, a, h in zip(voters, attempts, histories)]
+        model_features = [{} for _ in contexts]
+        behavior_features = [{} for _ in contexts]
         
-        # Determine risk level
+        probabilities = None
+        rf_service = self._ready_rf_service()
+        if rf_service and contexts:
+            model_features = [ctx.collect(rf_service.model.features) for ctx in contexts]
+            try:
+                X = rf_service.model.features_matrix(model_features)
+                probabilities = rf_service.predict_proba_matrix(X)
+                timestamp = datetime.utcnow().isoformat()
+                details = [{
+                    'model_type': 'random_forest_local',
+                    'timestamp': timestamp,
+                    'features_used': list(features.keys())
+                } for features in model_features]
+                logger.debug(f"RF batch fraud prediction for {len(probabilities)} vote(s)")
+            except Exception as e:
+                logger.warning(f"Batch ML prediction failed: {e}, falling back to rules")
+                probabilities = None
+        if probabilities is None:
+            behavior_features = [ctx.collect(RULE_FEATURES) for ctx in contexts]
+            probabilities, details = self._rule_based_detection_batch(behavior_features)
+        
+        assessments = [
+            self._build_assessment(prob, detail, voter, model, behavior)
+            for prob, detail, voter, model, behavior
+            in zip(probabilities.tolist(), details, voters, model_features, behavior_features)
+        ]
+        for assessment, ctx in zip(assessments, contexts):
+            self._record_remaining(assessment, ctx)
+        return assessments
+    
+    def _build_assessment(self, fraud_prob: float, prediction_details: Dict, voter_data: Dict,
+                          model_features: Dict, behavior_features: Dict) -> Dict:
+        """Map a fraud probability to a risk level and recommended action"""
         if fraud_prob < 0.3:
             risk_level = 'low'
             action = 'allow'
@@ -289,8 +292,8 @@ class FraudDetector:
             risk_level = 'high'
             action = 'block'
         
-        # Compile assessment
-        assessment = {
+        return {
+            'assessment_id': uuid.uuid4().hex,
             'fraud_probability': fraud_prob,
             'risk_level': risk_level,
             'recommended_action': action,
@@ -300,9 +303,6 @@ class FraudDetector:
             'behavior_features': behavior_features,
             'prediction_details': prediction_details
         }
-        
-        logger.info(f"Vote risk assessment: {risk_level} risk (prob={fraud_prob:.4f})")
-        return assessment
 
 
 # Global instance (will be initialized in app)
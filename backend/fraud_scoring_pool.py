@@ -0,0 +1,233 @@
+"""
+Fraud Scoring Pool Module
+- Runs Random Forest scoring in a ProcessPoolExecutor so inference does not
+  hold the GIL of the Flask request thread
+- Workers load the model once in their initializer and are warmed before the
+  pool takes traffic; they follow retrained models through the model version
+  file like any other process
+- Every call has a latency budget; on timeout, a full queue or a worker error
+  the caller gets no probability and falls back to rule-based scoring
+- The number of calls in flight is bounded: callers wait for a slot for at
+  most the budget (backpressure) instead of queueing without limit
+- A dead worker breaks the whole pool; exactly one replacement is built in the
+  background while callers use the rule-based fallback
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+# ---------------------------------------------------------------------------
+# Worker side (runs in the child processes)
+# ---------------------------------------------------------------------------
+
+def _init_worker(models_dir: str) -> None:
+    from random_forest_fraud import initialize_rf_service
+
+    service = initialize_rf_service(models_dir)
+    if service.is_ready():
+        # First call builds lazy inference state; pay for it before real traffic
+        service.predict_proba({name: 0 for name in service.model.features})
+
+
+def _warm_worker(_) -> int:
+    from random_forest_fraud import get_rf_service
+
+    service = get_rf_service()
+    if service is None or not service.is_ready():
+        raise RuntimeError('RandomForest model not ready in scoring worker')
+    return os.getpid()
+
+
+def _score_in_worker(features: Dict) -> float:
+    from random_forest_fraud import get_rf_service
+
+    return get_rf_service().predict_proba(features)
+
+
+# ---------------------------------------------------------------------------
+# Request side
+# ---------------------------------------------------------------------------
+
+class FraudScoringPool:
+    def __init__(self, models_dir: str, workers: int = 2, max_pending: int = 64, budget_ms: float = 50.0):
+        self.models_dir = models_dir
+        self.workers = workers
+        self.max_pending = max_pending
+        self.budget = budget_ms / 1000.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._restarting = False
+        self._counters = {'submitted': 0, 'completed': 0, 'timeouts': 0, 'rejected': 0, 'errors': 0}
+        self._latency_total = 0.0
+        self._started_at: Optional[float] = None
+
+    def start(self, warm_timeout: float = 60.0) -> bool:
+        """Start the workers and wait until each has loaded the model; False if they could not"""
+        # spawn, never fork: forking a threaded Flask process can copy held locks into the workers
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(self.models_dir,))
+        try:
+            pids = set(executor.map(_warm_worker, range(self.workers * 2), timeout=warm_timeout))
+        except Exception as e:
+            logger.warning(f"Fraud scoring pool not started: {e}")
+            executor.shutdown(wait=False, cancel_futures=True)
+            return False
+        old, self._executor = self._executor, executor
+        self._started_at = time.time()
+        if old is not None:
+            old.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Fraud scoring pool ready: {len(pids)} worker(s), budget {self.budget * 1000:.0f} ms")
+        return True
+
+    def restart(self) -> bool:
+        """Replace the workers, e.g. after one died; the old pool drains in the background"""
+        return self.start()
+
+    def _restart_broken(self, broken: ProcessPoolExecutor) -> None:
+        """Start one background restart for a broken executor; later reports of the same break are ignored"""
+        with self._lock:
+            # Already replaced, or a restart is under way: nothing to do
+            if self._restarting or self._executor is not broken:
+                return
+            self._restarting = True
+        threading.Thread(target=self._run_restart, name='fraud-pool-restart', daemon=True).start()
+
+    def _run_restart(self) -> None:
+        try:
+            if not self.restart():
+                logger.error("Fraud scoring pool could not be restarted; the next failed call retries")
+        finally:
+            with self._lock:
+                self._restarting = False
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def _release(self, started: float, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._latency_total += time.perf_counter() - started
+        self._slots.release()
+
+    def score(self, features: Dict) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Fraud probability for one model feature dict
+
+        Returns:
+            (probability, None) on success, or (None, reason) where reason is
+            'timeout', 'backpressure', 'error', 'restarting' or 'not_running';
+            the caller then scores with the rule-based fallback
+        """
+        executor = self._executor
+        if executor is None:
+            return None, 'not_running'
+        if self._restarting:
+            return None, 'restarting'
+        deadline = time.perf_counter() + self.budget
+        if not self._slots.acquire(timeout=self.budget):
+            self._count('rejected')
+            return None, 'backpressure'
+
+        started = time.perf_counter()
+        try:
+            future = executor.submit(_score_in_worker, features)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._slots.release()
+            self._count('errors')
+            logger.warning(f"Fraud scoring pool unavailable: {e}")
+            if isinstance(e, BrokenProcessPool):
+                self._restart_broken(executor)
+            return None, 'error'
+        with self._lock:
+            self._in_flight += 1
+            self._counters['submitted'] += 1
+        # The slot is held until the worker is done, even after the caller gave up
+        future.add_done_callback(lambda f: self._release(started, f))
+
+        try:
+            probability = future.result(timeout=max(deadline - time.perf_counter(), 0.0))
+        except FutureTimeout:
+            future.cancel()
+            self._count('timeouts')
+            return None, 'timeout'
+        except BrokenProcessPool as e:
+            self._count('errors')
+            logger.error(f"Fraud scoring worker died, restarting pool: {e}")
+            self._restart_broken(executor)
+            return None, 'error'
+        except Exception as e:
+            self._count('errors')
+            logger.warning(f"Fraud scoring in worker failed: {e}")
+            return None, 'error'
+        self._count('completed')
+        return float(probability), None
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            in_flight = self._in_flight
+            latency_total = self._latency_total
+        attempts = counters['submitted'] + counters['rejected']
+        fallbacks = counters['timeouts'] + counters['rejected'] + counters['errors']
+        finished = counters['submitted'] - in_flight
+        return {
+            'running': self.running,
+            'restarting': self._restarting,
+            'workers': self.workers,
+            'budget_ms': self.budget * 1000,
+            'max_pending': self.max_pending,
+            'queue_depth': in_flight,
+            **counters,
+            'fallbacks': fallbacks,
+            'fallback_rate': round(fallbacks / attempts, 4) if attempts else 0.0,
+            'avg_worker_latency_ms': round(latency_total / finished * 1000, 3) if finished > 0 else None,
+            'started_at': self._started_at,
+        }
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def initialize_scoring_pool(models_dir: str) -> Optional[FraudScoringPool]:
+    """Start the pool unless FRAUD_SCORING_POOL_WORKERS is 0; None when disabled or failed"""
+    global _pool
+    workers = int(os.environ.get('FRAUD_SCORING_POOL_WORKERS', 2))
+    # Spawned children re-import the app's main module; never start a pool from inside a worker
+    if workers <= 0 or multiprocessing.parent_process() is not None:
+        return None
+    pool = FraudScoringPool(
+        models_dir,
+        workers=workers,
+        max_pending=int(os.environ.get('FRAUD_SCORING_MAX_PENDING', 64)),
+        budget_ms=float(os.environ.get('FRAUD_SCORING_BUDGET_MS', 50)),
+    )
+    if not pool.start():
+        return None
+    _pool = pool
+    return _pool
+
+
+def get_scoring_pool() -> Optional[FraudScoringPool]:
+    return _pool
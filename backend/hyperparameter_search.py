@@ -0,0 +1,258 @@
+"""
+Hyperparameter Search Module
+- Optional search over forest hyperparameters and class weighting for the
+  Random Forest fraud model ({"mode": "search"} on the training endpoints)
+- Candidates are cross-validated on the training split only, so the hold-out
+  set used for the final metrics is never seen by the search
+- Runs candidates in a process pool sized by a core budget (cores per
+  candidate x workers <= max_cores) and stops submitting at a wall-clock budget
+- A candidate is abandoned between folds once even perfect scores on its
+  remaining folds could not beat the best mean ROC AUC found so far
+- The grid can be bounded by a model profile's size limits, so the winner is
+  never larger than the profile it is fitted for
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import random
+import logging
+import itertools
+import statistics
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SPACE = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [None, 10, 16, 24],
+    'min_samples_leaf': [1, 2, 5],
+    'max_features': ['sqrt', 0.5, None],
+    'class_weight': ['balanced', 'balanced_subsample', None],
+}
+
+# The configuration train_from_matrix uses today; always evaluated first so the
+# search has a score to beat and never picks something worse than the default
+BASELINE = {'n_estimators': 300, 'max_depth': None, 'min_samples_leaf': 1,
+            'max_features': 'sqrt', 'class_weight': 'balanced'}
+
+# Highest possible ROC AUC of a fold, used for the optimistic bound
+_SCORE_CEILING = 1.0
+
+
+def bounded_space(limits: Optional[Dict] = None) -> Tuple[Dict[str, List], Dict]:
+    """
+    SEARCH_SPACE and BASELINE restricted to a MODEL_PROFILES entry: no more
+    trees, no deeper trees and no smaller leaves than the profile allows.
+    The profile's own sizes are always in the space and make up the baseline.
+    """
+    if not limits:
+        return SEARCH_SPACE, BASELINE
+    trees, depth, leaf = limits['n_estimators'], limits['max_depth'], limits['min_samples_leaf']
+    space = dict(SEARCH_SPACE)
+    space['n_estimators'] = sorted({n for n in SEARCH_SPACE['n_estimators'] if n <= trees} | {trees})
+    if depth is not None:
+        space['max_depth'] = sorted({d for d in SEARCH_SPACE['max_depth'] if d is not None and d <= depth} | {depth})
+    space['min_samples_leaf'] = sorted({m for m in SEARCH_SPACE['min_samples_leaf'] if m >= leaf} | {leaf})
+    return space, {**BASELINE, 'n_estimators': trees, 'max_depth': depth, 'min_samples_leaf': leaf}
+
+
+def candidate_grid(max_candidates: int, seed: int = 42, space: Optional[Dict[str, List]] = None,
+                   baseline: Optional[Dict] = None) -> List[Dict]:
+    """The baseline (default BASELINE) followed by a seeded random sample of the rest of the grid"""
+    space = space or SEARCH_SPACE
+    baseline = baseline or BASELINE
+    keys = list(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+    grid = [c for c in grid if c != baseline]
+    random.Random(seed).shuffle(grid)
+    return [dict(baseline)] + grid[:max(max_candidates - 1, 0)]
+
+
+def search_params(options: Dict) -> Dict:
+    """run_search arguments from a request body, defaulting to RF_SEARCH_* settings"""
+    max_cores = options.get('max_cores', os.environ.get('RF_SEARCH_MAX_CORES'))
+    params = {
+        'time_budget_s': float(options.get('time_budget_s', os.environ.get('RF_SEARCH_TIME_BUDGET_SECONDS', 600))),
+        'max_candidates': int(options.get('max_candidates', os.environ.get('RF_SEARCH_MAX_CANDIDATES', 24))),
+        'folds': int(options.get('folds', os.environ.get('RF_SEARCH_FOLDS', 3))),
+        'cores_per_candidate': int(options.get('cores_per_candidate',
+                                               os.environ.get('RF_SEARCH_CORES_PER_CANDIDATE', 1))),
+        'max_cores': int(max_cores) if max_cores else None,
+        'seed': int(options.get('seed', 42)),
+    }
+    if params['time_budget_s'] <= 0 or params['max_candidates'] < 1 or params['cores_per_candidate'] < 1:
+        raise ValueError('time_budget_s, max_candidates and cores_per_candidate must be positive')
+    if params['folds'] < 2:
+        raise ValueError('folds must be at least 2')
+    return params
+
+
+# ---------------------------------------------------------------------------
+# Worker side (runs in the pool processes)
+# ---------------------------------------------------------------------------
+
+_worker: Dict = {}
+
+
+def _exit_with_parent() -> None:
+    # A cancelled training job terminates the search process; don't outlive it
+    parent = multiprocessing.parent_process()
+    if parent is not None:
+        parent.join()
+        os._exit(1)
+
+
+def _init_worker(x_path: str, y_path: str, best, deadline: float) -> None:
+    threading.Thread(target=_exit_with_parent, name='rf-search-parent-watch', daemon=True).start()
+    # Memory-mapped, so every worker reads the same pages instead of a pickled copy
+    _worker.update(X=np.load(x_path, mmap_mode='r'), y=np.load(y_path, mmap_mode='r'),
+                   best=best, deadline=deadline)
+
+
+def _evaluate(index: int, params: Dict, folds: int, n_jobs: int, seed: int) -> Dict:
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import StratifiedKFold
+
+    X, y, best = _worker['X'], _worker['y'], _worker['best']
+    started = time.perf_counter()
+    scores: List[float] = []
+    status = 'completed'
+    for train_idx, valid_idx in StratifiedKFold(folds, shuffle=True, random_state=seed).split(X, y):
+        if time.time() > _worker['deadline']:
+            status = 'time_budget'
+            break
+        rf = RandomForestClassifier(**params, n_jobs=n_jobs, random_state=42)
+        rf.fit(X[train_idx], y[train_idx])
+        scores.append(float(roc_auc_score(y[valid_idx], rf.predict_proba(X[valid_idx])[:, 1])))
+        if len(scores) < folds:
+            bound = (sum(scores) + (folds - len(scores)) * _SCORE_CEILING) / folds
+            if bound <= best.value:
+                status = 'pruned'
+                break
+
+    result = {
+        'candidate': index,
+        'params': params,
+        'status': status,
+        'fold_scores': [round(s, 5) for s in scores],
+        'folds_run': len(scores),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    if status == 'completed':
+        result['score'] = statistics.fmean(scores)
+        with best.get_lock():
+            if result['score'] > best.value:
+                best.value = result['score']
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+def _leaderboard(results: List[Dict]) -> List[Dict]:
+    """Completed candidates by score, then abandoned ones by their partial mean"""
+    def key(r):
+        partial = statistics.fmean(r['fold_scores']) if r['fold_scores'] else 0.0
+        return (r['status'] != 'completed', -r.get('score', partial))
+    board = sorted(results, key=key)
+    for rank, r in enumerate(board, 1):
+        r['rank'] = rank
+        if 'score' in r:
+            r['score'] = round(r['score'], 5)
+    return board
+
+
+def run_search(X, y, time_budget_s: float = 600, max_cores: Optional[int] = None, cores_per_candidate: int = 1,
+               max_candidates: int = 24, folds: int = 3, seed: int = 42,
+               progress: Optional[Callable[[float, str], None]] = None, limits: Optional[Dict] = None) -> Dict:
+    """
+    Cross-validate candidate configurations in parallel within the budgets
+
+    X and y are the full labeled data; candidates see only the training part of
+    the same 80/20 split train_from_matrix makes. limits (a MODEL_PROFILES
+    entry) bounds the grid, see bounded_space.
+
+    Returns:
+        Dict with 'winner' (params of the best completed candidate, None when
+        none finished in time), 'best_score', the full 'leaderboard' and counts
+    """
+    from sklearn.model_selection import train_test_split
+
+    report = progress or (lambda fraction, stage: None)
+    started = time.time()
+    deadline = started + time_budget_s
+    X = X.to_numpy(dtype=np.float64) if hasattr(X, 'to_numpy') else np.asarray(X, dtype=np.float64)
+    y = y.to_numpy() if hasattr(y, 'to_numpy') else np.asarray(y)
+    X_train, _, y_train, _ = train_test_split(X, y.astype(int), test_size=0.2, random_state=42, stratify=y)
+
+    max_cores = max_cores or os.cpu_count() or 1
+    cores_per_candidate = min(cores_per_candidate, max_cores)
+    workers = max_cores // cores_per_candidate
+    space, baseline = bounded_space(limits)
+    candidates = candidate_grid(max_candidates, seed, space, baseline)
+    ctx = multiprocessing.get_context('spawn')
+    best = ctx.Value('d', -1.0)
+    results: List[Dict] = []
+
+    with tempfile.TemporaryDirectory(prefix='rf-search-') as scratch:
+        x_path, y_path = os.path.join(scratch, 'X.npy'), os.path.join(scratch, 'y.npy')
+        np.save(x_path, X_train)
+        np.save(y_path, y_train)
+        del X_train, y_train
+
+        pending = list(enumerate(candidates))
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(x_path, y_path, best, deadline)) as executor:
+            while pending or running:
+                # Keep one candidate per worker in flight; nothing new after the deadline
+                while pending and len(running) < workers and time.time() < deadline:
+                    index, params = pending.pop(0)
+                    running[executor.submit(_evaluate, index, params, folds, cores_per_candidate, seed)] = index
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        logger.warning(f"Search candidate {index} failed: {e}")
+                        results.append({'candidate': index, 'params': candidates[index], 'status': 'error',
+                                        'error': str(e), 'fold_scores': [], 'folds_run': 0})
+                report(len(results) / len(candidates),
+                       f'searched {len(results)}/{len(candidates)} candidates (best ROC AUC {best.value:.4f})')
+
+    for index, params in pending:
+        results.append({'candidate': index, 'params': params, 'status': 'skipped', 'fold_scores': [], 'folds_run': 0})
+    board = _leaderboard(results)
+    completed = [r for r in board if r['status'] == 'completed']
+    counts = {status: sum(1 for r in board if r['status'] == status)
+              for status in ('completed', 'pruned', 'time_budget', 'skipped', 'error')}
+    summary = {
+        'winner': completed[0]['params'] if completed else None,
+        'best_score': completed[0]['score'] if completed else None,
+        'metric': f'mean ROC AUC over {folds} folds',
+        'candidates': len(candidates),
+        'space': space,
+        **counts,
+        'elapsed_seconds': round(time.time() - started, 2),
+        'time_budget_s': time_budget_s,
+        'workers': workers,
+        'cores_per_candidate': cores_per_candidate,
+        'leaderboard': board,
+    }
+    logger.info(f"RF search: {counts['completed']} completed, {counts['pruned']} pruned, "
+                f"{counts['skipped'] + counts['time_budget']} out of time in {summary['elapsed_seconds']}s; "
+                f"best ROC AUC {summary['best_score']} with {summary['winner']}")
+    return summary
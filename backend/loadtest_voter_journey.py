@@ -0,0 +1,312 @@
+"""
+Load test: register -> login -> verify-otp -> verify-identity -> cast-vote
+
+Drives N simulated voters through the full voter journey with a fixed number
+of concurrent workers and reports per-endpoint latency percentiles and
+throughput. Results are saved as JSON so runs can be compared.
+
+Targets:
+    --target memory   Run app_mongodb in-process against an in-memory MongoDB
+                      stand-in (requires `pip install mongomock`)
+    --target local    Run app_mongodb in-process against the local mongod
+    --base-url URL    Drive an already running server over HTTP (OTP codes are
+                      read from --mongodb-uri)
+
+Usage:
+    python loadtest_voter_journey.py --voters 200 --concurrency 16 --output run.json
+    python loadtest_voter_journey.py --base-url http://localhost:5000 --compare run.json
+
+verify-identity needs face_recognition installed and --photo pointing at an
+image with a real face. Without the module, or with the generated placeholder
+photo, verify-identity fails and journeys stop before cast-vote.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import argparse
+import base64
+import io
+import json
+import math
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ENDPOINTS = ['register', 'login', 'verify_otp', 'verify_identity', 'cast_vote']
+PERCENTILES = [50, 95, 99]
+
+
+def make_photo_data_url(photo_path: Optional[str] = None) -> str:
+    if photo_path:
+        with open(photo_path, 'rb') as f:
+            raw = f.read()
+    else:
+        from PIL import Image, ImageDraw
+        img = Image.new('RGB', (240, 240), (200, 200, 200))
+        draw = ImageDraw.Draw(img)
+        draw.ellipse((60, 40, 180, 200), fill=(224, 172, 105))
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=90)
+        raw = buf.getvalue()
+    return 'data:image/jpeg;base64,' + base64.b64encode(raw).decode('ascii')
+
+
+class InProcessClient:
+    """Flask test client per thread; no network between harness and app."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, path: str, payload: Dict, token: Optional[str] = None) -> Tuple[int, Dict]:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = client.post(path, json=payload, headers=headers)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpClient:
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, path: str, payload: Dict, token: Optional[str] = None) -> Tuple[int, Dict]:
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        req = urllib.request.Request(self.base_url + path, data=json.dumps(payload).encode('utf-8'),
+                                     headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, json.loads(resp.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b'{}')
+            except ValueError:
+                return e.code, {}
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.errors: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.status_codes: Dict[str, Dict[str, int]] = {name: {} for name in ENDPOINTS}
+
+    def record(self, endpoint: str, seconds: float, status: int, ok: bool) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds * 1000)
+            codes = self.status_codes[endpoint]
+            codes[str(status)] = codes.get(str(status), 0) + 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_journey(index: int, run_id: str, client, otp_lookup, recorder: Recorder, photo: str) -> bool:
+    username = f'load_{run_id}_{index}'
+    password = 'LoadTest#123'
+
+    def call(endpoint, path, payload, expected=(200,), token=None):
+        started = time.perf_counter()
+        status, body = client.post(path, payload, token)
+        ok = status in expected
+        recorder.record(endpoint, time.perf_counter() - started, status, ok)
+        return ok, body
+
+    ok, _ = call('register', '/api/register/voter', {
+        'username': username, 'password': password, 'email': f'{username}@example.com',
+        'voter_id': f'LT{index:06d}', 'photo': photo
+    }, expected=(201,))
+    if not ok:
+        return False
+
+    ok, body = call('login', '/api/login', {'username': username, 'password': password})
+    if not ok:
+        return False
+    token = body.get('access_token')
+    if body.get('mfa_required'):
+        otp = otp_lookup(body.get('user_id'))
+        if not otp:
+            recorder.record('verify_otp', 0.0, 0, False)
+            return False
+        ok, body = call('verify_otp', '/api/verify-otp', {'user_id': body.get('user_id'), 'otp': otp})
+        if not ok:
+            return False
+        token = body.get('access_token')
+
+    ok, _ = call('verify_identity', '/api/verify-identity', {'live_photo': photo, 'camera_source': 'loadtest'},
+                 token=token)
+    if not ok:
+        return False
+
+    ok, _ = call('cast_vote', '/api/cast-vote', {
+        'candidate': 'Congress' if index % 2 else 'BJP',
+        'precinct': f'Precinct {index % 3 + 1}',
+        'session_duration': 90, 'page_views': 3, 'time_on_page': 45
+    }, token=token)
+    return ok
+
+
+def make_otp_lookup(otp_collection):
+    def lookup(user_id):
+        record = otp_collection.find_one({'user_id': user_id, 'verified': False}, sort=[('created_at', -1)])
+        return record.get('otp_code') if record else None
+    return lookup
+
+
+def setup_in_process(target: str):
+    """Import the app and, for the memory target, point it at mongomock."""
+    import app_mongodb
+
+    if target == 'memory':
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("The memory target needs mongomock: pip install mongomock")
+        from behavior_tracker import initialize_behavior_tracker
+        from vote_tally import initialize_tally_store
+        from user_resolver import initialize_user_resolver
+        from voter_feature_store import initialize_voter_feature_store
+
+        mock_db = mongomock.MongoClient()[app_mongodb.MONGODB_DB_NAME]
+        app_mongodb.db = mock_db
+        app_mongodb.mongodb_available = True
+        app_mongodb.users_collection = mock_db['users']
+        app_mongodb.login_otp_collection = mock_db['login_otp']
+        app_mongodb.master_voter_list_collection = mock_db['master_voter_list']
+        app_mongodb.votes_collection = mock_db['votes']
+        # Rebind every singleton that captured the real collections at import
+        initialize_behavior_tracker(mock_db)
+        initialize_tally_store(mock_db)
+        initialize_user_resolver(mock_db['users'])
+        initialize_voter_feature_store(mock_db)
+        app_mongodb.init_db()
+    elif not app_mongodb.mongodb_available:
+        raise SystemExit("MongoDB is not reachable; use --target memory or start mongod")
+
+    # Keep synthetic voters out of the real training dataset
+    from dataset_appender import initialize_dataset_appender
+    app_mongodb.dataset_appender = initialize_dataset_appender(
+        os.path.join(tempfile.mkdtemp(prefix='loadtest_dataset_'), 'voting_fraud_dataset.csv')
+    )
+
+    return InProcessClient(app_mongodb.app), make_otp_lookup(app_mongodb.login_otp_collection)
+
+
+def summarize(recorder: Recorder, journeys: int, completed: int, elapsed: float, args) -> Dict:
+    endpoints = {}
+    for name in ENDPOINTS:
+        values = sorted(recorder.latencies[name])
+        stats = {
+            'requests': len(values),
+            'errors': recorder.errors[name],
+            'status_codes': recorder.status_codes[name],
+            'requests_per_second': round(len(values) / elapsed, 2) if elapsed else 0.0,
+            'mean_ms': round(sum(values) / len(values), 2) if values else 0.0,
+        }
+        for pct in PERCENTILES:
+            stats[f'p{pct}_ms'] = round(percentile(values, pct), 2)
+        endpoints[name] = stats
+    total_requests = sum(len(v) for v in recorder.latencies.values())
+    return {
+        'generated_at': datetime.utcnow().isoformat(),
+        'config': {
+            'voters': journeys,
+            'concurrency': args.concurrency,
+            'target': args.base_url or args.target,
+        },
+        'elapsed_seconds': round(elapsed, 3),
+        'journeys_completed': completed,
+        'journeys_failed': journeys - completed,
+        'journeys_per_second': round(completed / elapsed, 2) if elapsed else 0.0,
+        'requests_per_second': round(total_requests / elapsed, 2) if elapsed else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None) -> None:
+    print(f"\nVoters: {report['config']['voters']}  Concurrency: {report['config']['concurrency']}  "
+          f"Elapsed: {report['elapsed_seconds']}s")
+    print(f"Journeys: {report['journeys_completed']} ok, {report['journeys_failed']} failed, "
+          f"{report['journeys_per_second']} journeys/s, {report['requests_per_second']} req/s\n")
+    header = f"{'endpoint':<16}{'reqs':>7}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, stats in report['endpoints'].items():
+        line = (f"{name:<16}{stats['requests']:>7}{stats['errors']:>8}{stats['requests_per_second']:>9}"
+                f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+        if baseline and name in baseline.get('endpoints', {}):
+            before = baseline['endpoints'][name].get('p95_ms') or 0.0
+            if before:
+                line += f"   p95 {((stats['p95_ms'] - before) / before) * 100:+.1f}% vs baseline"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--voters', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--target', choices=['memory', 'local'], default='memory')
+    parser.add_argument('--base-url', default=None)
+    parser.add_argument('--mongodb-uri', default=os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db-name', default=os.environ.get('MONGODB_DB_NAME', 'election_db'))
+    parser.add_argument('--photo', default=None, help='Face image used for registration and verification')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    parser.add_argument('--compare', default=None, help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    if args.base_url:
+        from pymongo import MongoClient
+        client = HttpClient(args.base_url)
+        otp_lookup = make_otp_lookup(MongoClient(args.mongodb_uri)[args.db_name]['login_otp'])
+    else:
+        if args.target == 'memory':
+            # Registration photos are written under the working directory
+            os.chdir(tempfile.mkdtemp(prefix='loadtest_'))
+        client, otp_lookup = setup_in_process(args.target)
+
+    photo = make_photo_data_url(args.photo)
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:8]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(
+            lambda i: run_journey(i, run_id, client, otp_lookup, recorder, photo),
+            range(args.voters)
+        ))
+    elapsed = time.perf_counter() - started
+
+    report = summarize(recorder, args.voters, sum(1 for ok in outcomes if ok), elapsed, args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
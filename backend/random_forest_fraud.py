@@ -2,36 +2,105 @@
 Random Forest Fraud Detection Module
 - Train and serve a local RandomForestClassifier as an alternative to Vertex AI
 - Uses behavior features already present in the app
+- Artifacts are written atomically (temp file + os.replace) and published by
+  a version file; every process polls it and swaps in the new model without
+  interrupting predictions already running on the old one
+- The flattened forest is saved next to the model and loaded memory-mapped,
+  so worker processes share its pages; the sklearn estimator itself is only
+  loaded when something needs it
+- Model profiles (full, compact, tiny) trade accuracy for latency and size;
+  each has its own artifacts and RF_MODEL_PROFILE selects the one served
 """
 
 from __future__ import annotations
 
 import os
+import copy
 import json
 import joblib
+import time
+import uuid
 import logging
+import tempfile
+import threading
+import warnings
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, roc_auc_score, average_precision_score
 from sklearn.model_selection import train_test_split
 from sklearn.utils.class_weight import compute_class_weight
 
+from dataset_appender import columnar_copy, read_columnar_dataset
+from feature_encoding import encode_series
+from rf_inference import FlatForest, build_flat_forest
+
 logger = logging.getLogger(__name__)
 
 
+# 'flat' scores with rf_inference.FlatForest, 'sklearn' with the estimator itself
+INFERENCE_BACKENDS = ('flat', 'sklearn')
+
+# Stored on each fitted estimator (and pickled with it): how many of the
+# oldest-first training rows it was trained from, so incremental updates can
+# hold out only rows added after that
+TRAINING_ROWS_ATTR = 'n_training_rows_'
+# Smallest hold-out of new rows an incremental update is evaluated on
+INCREMENTAL_MIN_HOLDOUT = 50
+
+# FlatForest wins on single votes and small batches; larger batches go to
+# sklearn's predict_proba, which vectorises better across rows, when the
+# estimator is the one the FlatForest was built from in this process
+FLAT_MAX_BATCH_ROWS = 64
+
 DEFAULT_FEATURES = [
     'voter_id', 'age', 'ip_address', 'device_id', 
     'login_attempts', 'vote_duration_sec', 'location_match', 'previous_votes'
 ]
 
+# Forest size per model profile. Smaller forests score faster and take less
+# memory and disk for some accuracy; RF_MODEL_PROFILE picks the one a process
+# serves, and a full retrain fits that one unless asked for others
+MODEL_PROFILES = {
+    'full': {'n_estimators': 300, 'max_depth': None, 'min_samples_leaf': 1},
+    'compact': {'n_estimators': 100, 'max_depth': 14, 'min_samples_leaf': 2},
+    'tiny': {'n_estimators': 30, 'max_depth': 8, 'min_samples_leaf': 5},
+}
+DEFAULT_PROFILE = 'full'
+
+
+def resolve_profile(name: Optional[str]) -> str:
+    profile = (name or DEFAULT_PROFILE).lower()
+    if profile not in MODEL_PROFILES:
+        logger.warning(f"Unknown RF model profile '{name}', using '{DEFAULT_PROFILE}'")
+        return DEFAULT_PROFILE
+    return profile
+
+
+def training_profiles(names: Optional[List[str]] = None) -> List[str]:
+    """
+    Profiles a full retrain fits: names, else RF_TRAIN_PROFILES, else only the
+    served RF_MODEL_PROFILE; ValueError on unknown ones
+    """
+    if names is None:
+        configured = os.environ.get('RF_TRAIN_PROFILES', '')
+        names = [n.strip() for n in configured.split(',') if n.strip()] \
+            or [resolve_profile(os.environ.get('RF_MODEL_PROFILE'))]
+    unknown = [n for n in names if n not in MODEL_PROFILES]
+    if unknown:
+        raise ValueError(f"Unknown model profile(s): {', '.join(unknown)}; "
+                         f"choose from {', '.join(MODEL_PROFILES)}")
+    return list(dict.fromkeys(names))
+
 
 def load_voting_fraud_dataset(csv_path: Optional[str] = None) -> List[Dict]:
     """
-    Load voting fraud dataset from CSV file
+    Load voting fraud dataset from CSV file (or from its columnar copy when
+    DATASET_COLUMNAR_FORMAT keeps one)
     
     Args:
         csv_path: Path to CSV file. If None, uses default path relative to this file
@@ -48,7 +117,13 @@ def load_voting_fraud_dataset(csv_path: Optional[str] = None) -> List[Dict]:
         return []
     
     try:
-        df = pd.read_csv(csv_path)
+        columnar_dir = columnar_copy(csv_path)
+        if columnar_dir is not None:
+            # Same rows as the CSV (see dataset_appender), without parsing text
+            df = read_columnar_dataset(columnar_dir)
+            logger.info(f"Reading columnar copy {columnar_dir} instead of the CSV")
+        else:
+            df = pd.read_csv(csv_path)
         
         # Convert numeric features to appropriate types
         numeric_columns = ['voter_id', 'age', 'ip_address', 'device_id', 'login_attempts', 
@@ -58,13 +133,13 @@ def load_voting_fraud_dataset(csv_path: Optional[str] = None) -> List[Dict]:
         if 'voter_id' in df.columns and df['voter_id'].dtype == object:
             df['voter_id'] = df['voter_id'].str.extract(r'(\d+)').astype(int)
         
-        # Handle ip_address: convert to hash or numeric representation
+        # Handle ip_address: convert to a stable numeric encoding
         if 'ip_address' in df.columns and df['ip_address'].dtype == object:
-            df['ip_address'] = df['ip_address'].apply(lambda x: hash(str(x)) % (10 ** 8))
+            df['ip_address'] = encode_series(df['ip_address'])
         
-        # Handle device_id: convert to hash or numeric representation  
+        # Handle device_id: convert to a stable numeric encoding
         if 'device_id' in df.columns and df['device_id'].dtype == object:
-            df['device_id'] = df['device_id'].apply(lambda x: hash(str(x)) % (10 ** 8))
+            df['device_id'] = encode_series(df['device_id'])
         
         # Ensure numeric columns are integers
         for col in ['age', 'login_attempts', 'vote_duration_sec', 'location_match', 'previous_votes']:
@@ -94,12 +169,109 @@ def load_voting_fraud_dataset(csv_path: Optional[str] = None) -> List[Dict]:
 class RFArtifacts:
     model_path: str
     features_path: str
+    flat_path: Optional[str] = None
+    version_path: Optional[str] = None
+    search_path: Optional[str] = None
+
+    def __post_init__(self):
+        stem = os.path.splitext(self.model_path)[0]
+        self.flat_path = self.flat_path or f'{stem}.flat.joblib'
+        self.version_path = self.version_path or f'{stem}.version'
+        self.search_path = self.search_path or f'{stem}.search.json'
+
+
+def _atomic_write(path: str, write) -> None:
+    """Call write(tmp_path), then move the result over path in one rename"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def profile_artifacts(models_dir: str, profile: str) -> RFArtifacts:
+    """Artifact paths of a profile; 'full' keeps the original file names"""
+    if profile == DEFAULT_PROFILE:
+        model_path = os.path.join(models_dir, 'rf_fraud_model.pkl')
+        # The voting_fraud_model.pkl shipped next to this module is only a
+        # fallback until the first retrain writes models_dir
+        backend_model_path = os.path.join(os.path.dirname(__file__), 'voting_fraud_model.pkl')
+        if not os.path.exists(model_path) and os.path.exists(backend_model_path):
+            model_path = backend_model_path
+    else:
+        model_path = os.path.join(models_dir, f'rf_fraud_model.{profile}.pkl')
+    return RFArtifacts(model_path=model_path, features_path=os.path.join(models_dir, 'rf_features.json'))
+
+
+def read_model_version(artifacts: RFArtifacts) -> Optional[str]:
+    try:
+        with open(artifacts.version_path, 'r') as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+
+
+# Marks a FlatForest loaded from its artifact, i.e. valid for the lazily loaded estimator
+_FROM_ARTIFACT = object()
+
+
+def _feature_value(value) -> float:
+    """Missing, None and NaN features score as 0, for single votes and batches alike"""
+    if value is None:
+        return 0.0
+    value = float(value)
+    return 0.0 if value != value else value
 
 
 class RandomForestFraudModel:
-    def __init__(self, features: Optional[List[str]] = None):
-        self.model: Optional[RandomForestClassifier] = None
+    def __init__(self, features: Optional[List[str]] = None, inference_backend: Optional[str] = None):
+        self._model: Optional[RandomForestClassifier] = None
+        self._model_path: Optional[str] = None
         self.features = features or list(DEFAULT_FEATURES)
+        backend = (inference_backend or os.environ.get('RF_INFERENCE_BACKEND', 'flat')).lower()
+        self.inference_backend = backend if backend in INFERENCE_BACKENDS else 'flat'
+        self.flat_max_rows = int(os.environ.get('RF_FLAT_MAX_BATCH_ROWS', FLAT_MAX_BATCH_ROWS))
+        self._flat: Optional[FlatForest] = None
+        self._flat_source = None
+
+    @property
+    def model(self) -> Optional[RandomForestClassifier]:
+        """The sklearn estimator, loaded from disk on first access when load() deferred it"""
+        if self._model is None and self._model_path is not None:
+            self._model = joblib.load(self._model_path)
+            self._model_path = None
+        return self._model
+
+    @model.setter
+    def model(self, value: Optional[RandomForestClassifier]) -> None:
+        self._model = value
+        self._model_path = None
+        if self._flat_source is _FROM_ARTIFACT:
+            self._flat, self._flat_source = None, None
+
+    def is_loaded(self) -> bool:
+        return self._model is not None or self._model_path is not None
+
+    def _flat_forest(self) -> Optional[FlatForest]:
+        """FlatForest for the current model, rebuilt whenever self.model is replaced"""
+        if self.inference_backend != 'flat' or not self.is_loaded():
+            return None
+        if self._flat_source is _FROM_ARTIFACT:
+            return self._flat
+        if self._flat_source is not self.model:
+            self._flat = build_flat_forest(self.model)
+            self._flat_source = self.model
+        return self._flat
+
+    def prepare_inference(self) -> str:
+        """Flatten the forest now rather than on the first prediction; returns the backend in use"""
+        return 'flat' if self._flat_forest() is not None else 'sklearn'
 
     def prepare_dataframe(self, records: List[Dict]) -> pd.DataFrame:
         df = pd.DataFrame(records)
@@ -121,18 +293,18 @@ class RandomForestFraudModel:
         # voter_id may be like "V0001" -> extract digits
         if 'voter_id' in df.columns and df['voter_id'].dtype == object:
             df['voter_id'] = df['voter_id'].astype(str).str.extract(r'(\d+)').fillna('0').astype(int)
-        # Convert textual ip/device to stable numeric hashes
+        # Convert textual ip/device to stable numeric hashes (same encoding as serving)
         if 'ip_address' in df.columns and df['ip_address'].dtype == object:
-            df['ip_address'] = df['ip_address'].astype(str).apply(lambda x: hash(x) % (10 ** 8))
+            df['ip_address'] = encode_series(df['ip_address'])
         if 'device_id' in df.columns and df['device_id'].dtype == object:
-            df['device_id'] = df['device_id'].astype(str).apply(lambda x: hash(x) % (10 ** 8))
+            df['device_id'] = encode_series(df['device_id'])
         # Cast remaining numeric features to int
         for col in ['age', 'login_attempts', 'vote_duration_sec', 'location_match', 'previous_votes']:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
         return df
 
-    def train_from_records(self, records: List[Dict], target: str = 'is_fraud') -> Dict:
+    def _labeled_frame(self, records: List[Dict], target: str) -> pd.DataFrame:
         df = self.prepare_dataframe(records)
         if target not in df.columns:
             # derive from probability if available
@@ -140,110 +312,598 @@ class RandomForestFraudModel:
                 df[target] = (df['fraud_probability'] > 0.5).astype(int)
             else:
                 raise ValueError("No target label present in records (need 'is_fraud' or 'fraud_probability')")
-        X = df[self.features]
-        y = df[target].astype(int)
+        df[target] = df[target].astype(int)
+        return df
+
+    @staticmethod
+    def _balanced_class_weights(y: pd.Series) -> Dict[int, float]:
+        classes = np.array([0, 1])
+        class_weights = compute_class_weight(class_weight='balanced', classes=classes, y=y)
+        return {c: w for c, w in zip(classes, class_weights)}
+
+    @staticmethod
+    def _grow(rf: RandomForestClassifier, X, y, total: int, report: Callable[[float, str], None],
+              start: float = 0.05, end: float = 0.9) -> None:
+        """Fit rf up to total trees; with warm_start, in ten steps reporting progress"""
+        if not rf.warm_start:
+            rf.set_params(n_estimators=total)
+            rf.fit(X, y)
+            return
+        done = len(getattr(rf, 'estimators_', []))
+        step = max((total - done) // 10, 1)
+        for grown in range(done + step, total + step, step):
+            rf.set_params(n_estimators=min(grown, total))
+            rf.fit(X, y)
+            report(start + (end - start) * (rf.n_estimators - done) / max(total - done, 1),
+                   f'fitting {rf.n_estimators - done}/{total - done} trees')
+
+    @staticmethod
+    def evaluate(rf: RandomForestClassifier, X_test, y_test) -> Dict:
+        """Hold-out metrics reported by every training mode"""
+        y_prob = rf.predict_proba(X_test)[:, 1]
+        y_pred = (y_prob >= 0.5).astype(int)
+        return {
+            'classification_report': classification_report(y_test, y_pred, digits=4, output_dict=True),
+            'roc_auc': float(roc_auc_score(y_test, y_prob)),
+            'pr_auc': float(average_precision_score(y_test, y_prob)),
+        }
+
+    def train_from_records(self, records: List[Dict], target: str = 'is_fraud', n_jobs: int = -1,
+                           progress: Optional[Callable[[float, str], None]] = None,
+                           n_estimators: int = 300) -> Dict:
+        """
+        Fit a new forest on records
+
+        Args:
+            n_jobs: Cores used by fit and evaluation (-1 = all)
+            progress: Optional callback(fraction, stage); when given, trees are
+                grown in steps with warm_start so it is called as they are added
+                (same trees as a single fit for a fixed random_state)
+        """
+        report = progress or (lambda fraction, stage: None)
+        report(0.0, 'preparing')
+        df = self._labeled_frame(records, target)
+        return self.train_from_matrix(df[self.features], df[target], n_jobs=n_jobs, progress=progress,
+                                      n_estimators=n_estimators)
+
+    def _as_frame(self, X, y):
+        """Wrap arrays in self.features columns (no copy) so the estimator records feature names"""
+        if not isinstance(X, pd.DataFrame):
+            X = pd.DataFrame(X, columns=self.features, copy=False)
+        if not isinstance(y, pd.Series):
+            y = pd.Series(y, index=X.index)
+        return X, y.astype(int)
+
+    def train_from_matrix(self, X, y, n_jobs: int = -1,
+                          progress: Optional[Callable[[float, str], None]] = None,
+                          n_estimators: int = 300, max_depth: Optional[int] = None,
+                          min_samples_leaf: int = 1, max_features='sqrt',
+                          class_weight: Optional[str] = 'balanced') -> Dict:
+        """
+        Fit a new forest on a feature matrix (columns in self.features order,
+        e.g. from training_loader) and its 0/1 labels; see train_from_records
+
+        n_estimators, max_depth and min_samples_leaf take MODEL_PROFILES values;
+        max_features and class_weight are RandomForestClassifier's (a search
+        winner sets all five, see hyperparameter_search).
+        """
+        report = progress or (lambda fraction, stage: None)
+        started = time.perf_counter()
+        X, y = self._as_frame(X, y)
 
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=0.2, random_state=42, stratify=y
         )
 
-        # Balanced class weights
-        import numpy as np
-        classes = np.array([0, 1])
-        class_weights = compute_class_weight(class_weight='balanced', classes=classes, y=y_train)
-        class_weight_dict = {c: w for c, w in zip(classes, class_weights)}
-
         rf = RandomForestClassifier(
-            n_estimators=300,
-            max_depth=None,
+            n_estimators=n_estimators,
+            max_depth=max_depth,
             min_samples_split=2,
-            n_jobs=-1,
-            class_weight=class_weight_dict,
+            min_samples_leaf=min_samples_leaf,
+            max_features=max_features,
+            n_jobs=n_jobs,
+            class_weight=self._balanced_class_weights(y_train) if class_weight == 'balanced' else class_weight,
             random_state=42,
+            warm_start=progress is not None,
         )
-        rf.fit(X_train, y_train)
+        self._grow(rf, X_train, y_train, n_estimators, report)
+        rf.set_params(warm_start=False)
+        setattr(rf, TRAINING_ROWS_ATTR, len(X))
+        report(0.9, 'evaluating')
+
+        metrics = self.evaluate(rf, X_test, y_test)
+        metrics.update({
+            'mode': 'full',
+            'n_train': int(len(y_train)),
+            'n_test': int(len(y_test)),
+            'pos_rate_train': float(y_train.mean()),
+            'pos_rate_test': float(y_test.mean()),
+            'trees_fitted': n_estimators,
+            'max_depth': max_depth,
+            'min_samples_leaf': min_samples_leaf,
+            'max_features': max_features,
+            'class_weight': class_weight,
+            'fit_seconds': round(time.perf_counter() - started, 3),
+        })
 
-        y_prob = rf.predict_proba(X_test)[:, 1]
-        y_pred = (y_prob >= 0.5).astype(int)
+        self.model = rf
+        logger.info(f"RF trained: ROC AUC={metrics['roc_auc']:.4f} PR AUC={metrics['pr_auc']:.4f}")
+        return metrics
 
-        metrics = {
-            'classification_report': classification_report(y_test, y_pred, digits=4, output_dict=True),
-            'roc_auc': float(roc_auc_score(y_test, y_prob)),
-            'pr_auc': float(average_precision_score(y_test, y_prob)),
+    def train_incremental(self, records: List[Dict], target: str = 'is_fraud', new_trees: int = 50,
+                          max_trees: int = 300, window: Optional[int] = None, n_jobs: int = -1,
+                          progress: Optional[Callable[[float, str], None]] = None,
+                          compare_full: bool = False, max_depth: Optional[int] = None,
+                          min_samples_leaf: int = 1) -> Dict:
+        """
+        Add trees fitted on recent records to the current forest and retire the oldest ones
+
+        Records are ordered by timestamp when present, else input order, and
+        are assumed to be append-only since the current model was trained. The
+        hold-out is the newest 20% of the records added since then, so neither
+        the current model nor the new trees have seen it. new_trees trees are
+        grown with warm_start on the last `window` records before the hold-out,
+        and the forest keeps its newest max_trees trees. Without a current model
+        this falls back to a full retrain.
+
+        Metrics are those of a full retrain plus deltas against the previous
+        model on the same hold-out and, with compare_full, against a full
+        retrain on every record before the hold-out (which costs a full fit).
+        The fallback and the comparison retrain fit max_trees trees with
+        max_depth and min_samples_leaf, i.e. the served profile's shape.
+        """
+        report = progress or (lambda fraction, stage: None)
+        report(0.0, 'preparing')
+        df = self._labeled_frame(records, target)
+        if 'timestamp' in df.columns:
+            df = df.sort_values('timestamp', kind='stable')
+        return self.train_incremental_matrix(df[self.features], df[target], new_trees=new_trees,
+                                             max_trees=max_trees, window=window, n_jobs=n_jobs,
+                                             progress=progress, compare_full=compare_full,
+                                             max_depth=max_depth, min_samples_leaf=min_samples_leaf)
+
+    def train_incremental_matrix(self, X, y, new_trees: int = 50, max_trees: int = 300,
+                                 window: Optional[int] = None, n_jobs: int = -1,
+                                 progress: Optional[Callable[[float, str], None]] = None,
+                                 compare_full: bool = False, max_depth: Optional[int] = None,
+                                 min_samples_leaf: int = 1) -> Dict:
+        """train_incremental on a feature matrix whose rows are oldest first"""
+        previous = self.model
+        if previous is None or not hasattr(previous, 'estimators_'):
+            logger.info("RF incremental training requested without a fitted model; training from scratch")
+            return self.train_from_matrix(X, y, n_jobs=n_jobs, progress=progress, n_estimators=max_trees,
+                                          max_depth=max_depth, min_samples_leaf=min_samples_leaf)
+        report = progress or (lambda fraction, stage: None)
+        started = time.perf_counter()
+        X, y = self._as_frame(X, y)
+
+        # Hold out only rows added after the previous model's training data
+        seen = getattr(previous, TRAINING_ROWS_ATTR, None)
+        if seen is None or seen > len(X):
+            raise ValueError('The current model does not match these records (trained on '
+                             f'{seen if seen is not None else "an unknown number of"} rows, {len(X)} given); '
+                             'retrain fully')
+        n_test = int((len(X) - seen) * 0.2)
+        if n_test < INCREMENTAL_MIN_HOLDOUT or y.iloc[-n_test:].nunique() < 2:
+            raise ValueError(f'{len(X) - seen} records since the last training are too few to hold out '
+                             f'{INCREMENTAL_MIN_HOLDOUT}+ rows of both classes; wait for more or retrain fully')
+        X_test, y_test = X.iloc[-n_test:], y.iloc[-n_test:]
+        X_train, y_train = X.iloc[:-n_test], y.iloc[:-n_test]
+        if window:
+            X_train, y_train = X_train.iloc[-window:], y_train.iloc[-window:]
+        if y_train.nunique() < 2:
+            raise ValueError('Recent window has a single class; widen the window or retrain fully')
+
+        # Share the fitted trees; only the list of estimators is new
+        rf = copy.copy(previous)
+        rf.estimators_ = list(previous.estimators_)
+        rf.set_params(warm_start=True, n_jobs=n_jobs, class_weight=self._balanced_class_weights(y_train))
+        kept_before = len(rf.estimators_)
+        self._grow(rf, X_train, y_train, kept_before + new_trees, report,
+                   end=0.6 if compare_full else 0.85)
+        retired = max(len(rf.estimators_) - max_trees, 0)
+        if retired:
+            rf.estimators_ = rf.estimators_[retired:]
+        rf.set_params(n_estimators=len(rf.estimators_), warm_start=False)
+        setattr(rf, TRAINING_ROWS_ATTR, len(X))
+        fit_seconds = time.perf_counter() - started
+        report(0.85 if not compare_full else 0.6, 'evaluating')
+
+        metrics = self.evaluate(rf, X_test, y_test)
+        before = self.evaluate(previous, X_test, y_test)
+        metrics.update({
+            'mode': 'incremental',
             'n_train': int(len(y_train)),
             'n_test': int(len(y_test)),
             'pos_rate_train': float(y_train.mean()),
             'pos_rate_test': float(y_test.mean()),
-        }
+            'window': int(len(y_train)),
+            'rows_since_previous': int(len(X) - seen),
+            'trees_fitted': new_trees,
+            'trees_retired': retired,
+            'trees_total': len(rf.estimators_),
+            'fit_seconds': round(fit_seconds, 3),
+            'vs_previous': {
+                'roc_auc': before['roc_auc'],
+                'pr_auc': before['pr_auc'],
+                'roc_auc_delta': metrics['roc_auc'] - before['roc_auc'],
+                'pr_auc_delta': metrics['pr_auc'] - before['pr_auc'],
+            },
+        })
+
+        if compare_full:
+            report(0.65, 'full retrain for comparison')
+            full_started = time.perf_counter()
+            full_X, full_y = X.iloc[:-n_test], y.iloc[:-n_test]
+            full = RandomForestClassifier(
+                n_estimators=max_trees, max_depth=max_depth, min_samples_split=2,
+                min_samples_leaf=min_samples_leaf, n_jobs=n_jobs,
+                class_weight=self._balanced_class_weights(full_y), random_state=42,
+            )
+            full.fit(full_X, full_y)
+            full_seconds = time.perf_counter() - full_started
+            full_metrics = self.evaluate(full, X_test, y_test)
+            metrics['vs_full_retrain'] = {
+                'roc_auc': full_metrics['roc_auc'],
+                'pr_auc': full_metrics['pr_auc'],
+                'roc_auc_delta': metrics['roc_auc'] - full_metrics['roc_auc'],
+                'pr_auc_delta': metrics['pr_auc'] - full_metrics['pr_auc'],
+                'fit_seconds': round(full_seconds, 3),
+                'n_train': int(len(full_y)),
+                'cost_ratio': round(fit_seconds / full_seconds, 4) if full_seconds else None,
+            }
 
         self.model = rf
-        logger.info(f"RF trained: ROC AUC={metrics['roc_auc']:.4f} PR AUC={metrics['pr_auc']:.4f}")
+        logger.info(f"RF incremental: +{new_trees} trees, -{retired} retired, "
+                    f"ROC AUC={metrics['roc_auc']:.4f} ({metrics['vs_previous']['roc_auc_delta']:+.4f}) "
+                    f"in {fit_seconds:.1f}s")
         return metrics
 
+    def features_matrix(self, feature_dicts: List[Dict]) -> np.ndarray:
+        """
+        Stack feature dicts into an (n_samples, n_features) float matrix
+
+        Columns follow self.features; missing, None and NaN values become 0.
+        """
+        X = np.zeros((len(feature_dicts), len(self.features)), dtype=np.float64)
+        for j, name in enumerate(self.features):
+            X[:, j] = np.fromiter((_feature_value(features.get(name)) for features in feature_dicts),
+                                  dtype=np.float64, count=len(feature_dicts))
+        return X
+
+    def predict_proba_matrix(self, X: np.ndarray) -> np.ndarray:
+        """
+        Fraud probability for every row of a matrix built by features_matrix
+
+        Batches of up to flat_max_rows rows use the flattened forest; larger
+        ones use the estimator's predict_proba, except when the flattened
+        forest was mapped from its artifact: the estimator pickle on disk may
+        since have been replaced, so every batch stays on the served forest
+        """
+        if not self.is_loaded():
+            raise RuntimeError('Model not loaded/trained')
+        if X.shape[0] == 0:
+            return np.zeros(0, dtype=np.float64)
+        flat = self._flat_forest()
+        if flat is not None and (X.shape[0] <= self.flat_max_rows or self._flat_source is _FROM_ARTIFACT):
+            return flat.predict_proba(X)
+        with warnings.catch_warnings():
+            # Models fitted on a DataFrame warn when scored on a bare array;
+            # columns are already in self.features order
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return self.model.predict_proba(X)[:, 1]
+
     def predict_proba(self, features_dict: Dict) -> float:
-        if self.model is None:
+        if not self.is_loaded():
             raise RuntimeError('Model not loaded/trained')
-        row = {k: features_dict.get(k, 0) for k in self.features}
-        X = pd.DataFrame([row])[self.features].fillna(0)
-        return float(self.model.predict_proba(X)[:, 1][0])
+        flat = self._flat_forest()
+        if flat is not None:
+            return flat.predict_one([_feature_value(features_dict.get(name)) for name in self.features])
+        return float(self.predict_proba_matrix(self.features_matrix([features_dict]))[0])
+
+    def predict_proba_batch(self, feature_dicts: List[Dict]) -> List[float]:
+        """Score many feature dicts with a single predict_proba call"""
+        return self.predict_proba_matrix(self.features_matrix(feature_dicts)).tolist()
+
+    def serving_profile(self, X_sample, rows: int = 200) -> Dict:
+        """Per-vote latency, batch throughput and node count of the model as it is served"""
+        X_sample = X_sample.to_numpy(dtype=np.float64) if hasattr(X_sample, 'to_numpy') \
+            else np.asarray(X_sample, dtype=np.float64)
+        dicts = [dict(zip(self.features, row)) for row in X_sample[:rows].tolist()]
+        self.predict_proba(dicts[0])  # builds lazy inference state
+        latencies = []
+        for features in dicts:
+            started = time.perf_counter()
+            self.predict_proba(features)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+        started = time.perf_counter()
+        self.predict_proba_matrix(X_sample)
+        batch_seconds = time.perf_counter() - started
+        flat = self._flat_forest()
+        return {
+            'backend': 'flat' if flat is not None else 'sklearn',
+            'single_row_p50_ms': round(latencies[len(latencies) // 2], 4),
+            'single_row_p99_ms': round(latencies[max(int(len(latencies) * 0.99) - 1, 0)], 4),
+            'batch_rows': int(len(X_sample)),
+            'batch_rows_per_s': round(len(X_sample) / batch_seconds) if batch_seconds > 0 else None,
+            'n_nodes': int(flat.n_nodes if flat is not None
+                           else sum(tree.tree_.node_count for tree in self.model.estimators_)),
+        }
 
-    def save(self, artifacts: RFArtifacts):
+    def save(self, artifacts: RFArtifacts) -> str:
+        """
+        Write estimator, flattened forest and features atomically, then publish
+        them by replacing the version file; returns the new version
+        """
         if self.model is None:
             raise RuntimeError('No trained model to save')
-        os.makedirs(os.path.dirname(artifacts.model_path), exist_ok=True)
-        os.makedirs(os.path.dirname(artifacts.features_path), exist_ok=True)
-        joblib.dump(self.model, artifacts.model_path)
-        with open(artifacts.features_path, 'w') as f:
-            json.dump(self.features, f)
-
-    def load(self, artifacts: RFArtifacts):
-        self.model = joblib.load(artifacts.model_path)
+        _atomic_write(artifacts.model_path, lambda tmp: joblib.dump(self.model, tmp))
+        flat = self._flat_forest() if self.inference_backend == 'flat' else build_flat_forest(self.model)
+        if flat is not None:
+            # Uncompressed, so load() can memory-map the node arrays
+            _atomic_write(artifacts.flat_path, lambda tmp: joblib.dump(flat, tmp))
+        _atomic_write(artifacts.features_path, lambda tmp: _write_json(tmp, self.features))
+        version = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        _atomic_write(artifacts.version_path, lambda tmp: _write_json(tmp, {
+            'version': version,
+            'saved_at': datetime.utcnow().isoformat(),
+            'model_path': os.path.basename(artifacts.model_path),
+            'flat_path': os.path.basename(artifacts.flat_path) if flat is not None else None,
+        }))
+        return version
+
+    def load(self, artifacts: RFArtifacts, mmap: bool = True):
+        """
+        Load artifacts; with the flat backend and a flattened forest on disk the
+        node arrays are memory-mapped and the estimator is loaded on first use
+        """
         if os.path.exists(artifacts.features_path):
             with open(artifacts.features_path, 'r') as f:
                 self.features = json.load(f)
+        flat = None
+        if self.inference_backend == 'flat' and os.path.exists(artifacts.flat_path) \
+                and os.path.getmtime(artifacts.flat_path) >= os.path.getmtime(artifacts.model_path):
+            try:
+                flat = joblib.load(artifacts.flat_path, mmap_mode='r' if mmap else None)
+            except Exception as e:
+                logger.warning(f"Flattened forest unreadable, rebuilding from the estimator: {e}")
+        if flat is not None and flat.n_features == len(self.features):
+            self._model, self._model_path = None, artifacts.model_path
+            self._flat, self._flat_source = flat, _FROM_ARTIFACT
+        else:
+            self.model = joblib.load(artifacts.model_path)
+            flat = self._flat_forest()
+            if flat is not None:
+                # Older artifacts have no flattened forest; write one so other processes can map it
+                try:
+                    _atomic_write(artifacts.flat_path, lambda tmp: joblib.dump(flat, tmp))
+                except OSError as e:
+                    logger.warning(f"Could not write flattened forest: {e}")
         return self
 
 
+def _write_json(path: str, payload) -> None:
+    with open(path, 'w') as f:
+        json.dump(payload, f)
+
+
 class RandomForestFraudService:
-    def __init__(self, models_dir: str = './models/rf'):
+    def __init__(self, models_dir: str = './models/rf', profile: Optional[str] = None):
         self.models_dir = models_dir
-        # First try to load voting_fraud_model.pkl from backend directory
-        backend_model_path = os.path.join(os.path.dirname(__file__), 'voting_fraud_model.pkl')
-        
-        self.artifacts = RFArtifacts(
-            model_path=backend_model_path if os.path.exists(backend_model_path) else os.path.join(models_dir, 'rf_fraud_model.pkl'),
-            features_path=os.path.join(models_dir, 'rf_features.json'),
-        )
+        self.profile = resolve_profile(profile or os.environ.get('RF_MODEL_PROFILE'))
+        self.artifacts = profile_artifacts(models_dir, self.profile)
         self.model = RandomForestFraudModel()
+        self.version: Optional[str] = None
         self._ready = False
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
         self._try_load()
 
-    def _try_load(self):
+    def _try_load(self) -> bool:
         try:
             if os.path.exists(self.artifacts.model_path):
-                # Load the pre-trained model
-                self.model.model = joblib.load(self.artifacts.model_path)
-                
-                # Try to load features if available
-                if os.path.exists(self.artifacts.features_path):
-                    with open(self.artifacts.features_path, 'r') as f:
-                        self.model.features = json.load(f)
-                
-                self._ready = True
-                logger.info(f'Loaded RandomForest model from: {self.artifacts.model_path}')
+                version = read_model_version(self.artifacts)
+                # Build the replacement completely before swapping it in; predictions
+                # already running keep the model object they started with
+                model = RandomForestFraudModel().load(self.artifacts)
+                backend = model.prepare_inference()
+                self.model, self.version, self._ready = model, version, True
+                logger.info(f'Loaded RandomForest model from: {self.artifacts.model_path} '
+                            f'(inference: {backend}, version: {version})')
+                return True
             else:
                 logger.warning(f'Model file not found at: {self.artifacts.model_path}')
         except Exception as e:
             logger.warning(f'RF load failed: {e}')
-            self._ready = False
+        return False
+
+    def check_for_update(self) -> bool:
+        """Reload when another process published a new model version; True if swapped"""
+        version = read_model_version(self.artifacts)
+        if version is None or version == self.version:
+            return False
+        with self._reload_lock:
+            if version == self.version:
+                return False
+            return self._try_load()
+
+    def start_reload_watcher(self, interval: float) -> None:
+        """Poll the version file every interval seconds on a daemon thread"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check_for_update()
+                except Exception as e:
+                    logger.warning(f'RF reload check failed: {e}')
+
+        self._watcher = threading.Thread(target=watch, name='rf-model-watcher', daemon=True)
+        self._watcher.start()
 
     def is_ready(self) -> bool:
         return self._ready
 
-    def train_and_save(self, records: List[Dict]) -> Dict:
-        metrics = self.model.train_from_records(records)
-        self.model.save(self.artifacts)
-        self._ready = True
+    def train_and_save(self, records: List[Dict], n_jobs: int = -1,
+                       progress: Optional[Callable[[float, str], None]] = None,
+                       incremental: Optional[Dict] = None, profiles: Optional[List[str]] = None,
+                       search: Optional[Dict] = None) -> Dict:
+        """
+        Train, save and swap in a new model
+
+        Args:
+            incremental: Keyword arguments for RandomForestFraudModel.train_incremental
+                (new_trees, max_trees, window, compare_full); None for a full retrain.
+                max_trees defaults to the served profile's n_estimators
+            profiles: MODEL_PROFILES fitted by a full retrain (see train_and_save_matrix)
+            search: Keyword arguments for hyperparameter_search.run_search; the
+                served profile is then fitted with the winning configuration
+        """
+        if incremental is not None:
+            options = self._incremental_options(incremental)
+            return self._train_and_publish(
+                lambda model: model.train_incremental(records, n_jobs=n_jobs, progress=progress, **options),
+                progress, warm=True)
+        if progress:
+            progress(0.0, 'preparing')
+        df = self.model._labeled_frame(records, 'is_fraud')
+        return self.train_and_save_matrix(df[self.model.features], df['is_fraud'], n_jobs=n_jobs,
+                                          progress=progress, profiles=profiles, search=search)
+
+    def train_and_save_matrix(self, X: np.ndarray, y: np.ndarray, n_jobs: int = -1,
+                              progress: Optional[Callable[[float, str], None]] = None,
+                              incremental: Optional[Dict] = None, profiles: Optional[List[str]] = None,
+                              search: Optional[Dict] = None) -> Dict:
+        """
+        train_and_save for a matrix in self.model.features column order (see training_loader)
+
+        A full retrain fits every profile in profiles (default: training_profiles(),
+        i.e. the served profile)
+        plus the served one, publishes each to its own artifacts and swaps in the
+        served one. The returned metrics are the served profile's, with
+        'profiles' mapping each fitted profile to its accuracy, latency and size.
+        An incremental update only grows the served profile's forest, and a
+        search only refits the served profile (see _search_and_publish).
+        """
+        if incremental is not None:
+            options = self._incremental_options(incremental)
+            return self._train_and_publish(
+                lambda model: model.train_incremental_matrix(X, y, n_jobs=n_jobs, progress=progress, **options),
+                progress, warm=True)
+        if search is not None:
+            return self._search_and_publish(X, y, n_jobs, progress, search)
+
+        names = training_profiles(profiles)
+        if self.profile not in names:
+            names.append(self.profile)
+        weights = [MODEL_PROFILES[name]['n_estimators'] for name in names]
+        total, done = sum(weights), 0
+        results = {}
+        for name, weight in zip(names, weights):
+            scaled = (
+                lambda fraction, stage, base=done / total, span=weight / total, name=name:
+                progress(base + fraction * span, f'{name}: {stage}')
+            ) if progress else None
+            results[name] = self._train_and_publish(
+                lambda model, params=MODEL_PROFILES[name], scaled=scaled: model.train_from_matrix(
+                    X, y, n_jobs=n_jobs, progress=scaled, **params),
+                scaled, profile=name, X_sample=X[:1000])
+            done += weight
+
+        metrics = dict(results[self.profile])
+        metrics['profiles'] = {name: {
+            'roc_auc': m['roc_auc'],
+            'pr_auc': m['pr_auc'],
+            'n_estimators': m['trees_fitted'],
+            'max_depth': m['max_depth'],
+            'min_samples_leaf': m['min_samples_leaf'],
+            'fit_seconds': m['fit_seconds'],
+            'model_version': m['model_version'],
+            **m['serving'],
+        } for name, m in results.items()}
+        logger.info('RF profiles: ' + ', '.join(
+            f"{name} AUC={p['roc_auc']:.4f} p99={p['single_row_p99_ms']}ms {p['model_bytes'] / 1e6:.1f}MB"
+            for name, p in metrics['profiles'].items()))
+        return metrics
+
+    def _incremental_options(self, incremental: Dict) -> Dict:
+        """train_incremental arguments with max_trees and the fallback's shape taken from the served profile"""
+        params = MODEL_PROFILES[self.profile]
+        options = {'max_trees': params['n_estimators'], 'max_depth': params['max_depth'],
+                   'min_samples_leaf': params['min_samples_leaf']}
+        options.update({key: value for key, value in incremental.items() if value is not None})
+        return options
+
+    def _search_and_publish(self, X, y, n_jobs: int, progress: Optional[Callable[[float, str], None]],
+                            search: Dict) -> Dict:
+        """
+        Search hyperparameters within the budget, fit the winner on the served
+        profile and save the winner and full leaderboard next to its artifacts
+        """
+        from hyperparameter_search import run_search
+
+        report = progress or (lambda fraction, stage: None)
+        options = dict(search)
+        # Never more cores than the training job was given
+        cores = n_jobs if n_jobs and n_jobs > 0 else os.cpu_count()
+        options['max_cores'] = min(options['max_cores'], cores) if options.get('max_cores') else cores
+        result = run_search(X, y, progress=lambda fraction, stage: report(0.02 + 0.68 * fraction, stage),
+                            limits=MODEL_PROFILES[self.profile], **options)
+
+        params = dict(MODEL_PROFILES[self.profile])
+        if result['winner'] is not None:
+            params.update(result['winner'])
+        else:
+            logger.warning(f"No search candidate finished within {options.get('time_budget_s')}s; "
+                           f"fitting the '{self.profile}' profile defaults")
+        metrics = self._train_and_publish(
+            lambda model: model.train_from_matrix(
+                X, y, n_jobs=n_jobs, progress=lambda fraction, stage: report(0.7 + 0.3 * fraction, stage), **params),
+            lambda fraction, stage: report(0.7 + 0.3 * fraction, stage))
+
+        record = {
+            **result,
+            'fitted_params': params,
+            'model_version': metrics['model_version'],
+            'holdout': {'roc_auc': metrics['roc_auc'], 'pr_auc': metrics['pr_auc']},
+            'searched_at': datetime.utcnow().isoformat(),
+        }
+        _atomic_write(self.artifacts.search_path, lambda tmp: _write_json(tmp, record))
+        metrics['search'] = {**record, 'path': self.artifacts.search_path}
+        return metrics
+
+    def _train_and_publish(self, fit: Callable[['RandomForestFraudModel'], Dict],
+                           progress: Optional[Callable[[float, str], None]], warm: bool = False,
+                           profile: Optional[str] = None, X_sample=None) -> Dict:
+        profile = profile or self.profile
+        artifacts = self.artifacts if profile == self.profile else profile_artifacts(self.models_dir, profile)
+        # Train a separate instance so predictions keep using the current model meanwhile
+        model = RandomForestFraudModel(features=list(self.model.features),
+                                       inference_backend=self.model.inference_backend)
+        if warm:
+            model.model = self.model.model if self._ready else None
+        metrics = fit(model)
+        if progress:
+            progress(0.95, 'saving')
+        model.prepare_inference()
+        if profile == self.profile:
+            with self._reload_lock:
+                version = model.save(artifacts)
+                self.model, self.version, self._ready = model, version, True
+        else:
+            # Published for processes serving that profile; this one keeps its own
+            version = model.save(artifacts)
+        metrics['model_version'] = version
+        metrics['profile'] = profile
+        if X_sample is not None:
+            metrics['serving'] = model.serving_profile(X_sample)
+            metrics['serving'].update({
+                'model_bytes': os.path.getsize(artifacts.model_path),
+                'flat_bytes': os.path.getsize(artifacts.flat_path) if os.path.exists(artifacts.flat_path) else None,
+            })
         return metrics
 
     def predict_proba(self, feature_dict: Dict) -> float:
@@ -251,6 +911,16 @@ class RandomForestFraudService:
             raise RuntimeError('RandomForest model not ready')
         return self.model.predict_proba(feature_dict)
 
+    def predict_proba_batch(self, feature_dicts: List[Dict]) -> List[float]:
+        if not self._ready:
+            raise RuntimeError('RandomForest model not ready')
+        return self.model.predict_proba_batch(feature_dicts)
+
+    def predict_proba_matrix(self, X: np.ndarray) -> np.ndarray:
+        if not self._ready:
+            raise RuntimeError('RandomForest model not ready')
+        return self.model.predict_proba_matrix(X)
+
 
 # Global service instance
 _rf_service: Optional[RandomForestFraudService] = None
@@ -260,6 +930,8 @@ def initialize_rf_service(models_dir: Optional[str] = None) -> RandomForestFraud
     global _rf_service
     models_dir = models_dir or os.environ.get('RF_MODELS_DIR', './models/rf')
     _rf_service = RandomForestFraudService(models_dir=models_dir)
+    # Every process (app workers, scoring pool workers) follows the published version
+    _rf_service.start_reload_watcher(float(os.environ.get('RF_MODEL_RELOAD_INTERVAL_SECONDS', 5)))
     return _rf_service
 
 
@@ -0,0 +1,140 @@
+"""
+Random Forest Inference Module
+- Flattens a fitted sklearn RandomForestClassifier into contiguous NumPy node
+  arrays (all trees concatenated) once, at load time
+- Scores plain feature vectors by walking every tree one level per step, with
+  no DataFrame construction or sklearn input validation per call
+- Matches sklearn's predict_proba to floating point tolerance: inputs are
+  rounded to float32 like sklearn does before comparing against thresholds
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TREE_LEAF = -1
+# Levels walked between "all trees on a leaf?" checks
+_LEAF_CHECK_EVERY = 4
+
+
+class FlatForest:
+    """A fitted forest as flat arrays; children of a leaf point back at the leaf."""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 leaf_proba: np.ndarray, roots: np.ndarray, max_depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.leaf_proba = leaf_proba
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model, positive_class=1) -> 'FlatForest':
+        """
+        Build from a fitted RandomForestClassifier (or any fitted forest whose
+        estimators_ expose tree_)
+        """
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators:
+            raise ValueError('Model is not a fitted tree ensemble')
+        classes = list(getattr(model, 'classes_', []))
+        if len(classes) < 2:
+            raise ValueError('Forest must be fitted on at least two classes')
+        class_index = classes.index(positive_class) if positive_class in classes else len(classes) - 1
+
+        features, thresholds, lefts, rights, probas, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            local = np.arange(n, dtype=np.intp)
+            is_leaf = tree.children_left == _TREE_LEAF
+            # Leaves loop back to themselves so every row can take the same number of steps
+            lefts.append(np.where(is_leaf, local, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, local, tree.children_right) + offset)
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+            # Older sklearn stores class counts per node, newer stores fractions; normalize both
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1)
+            totals[totals == 0] = 1.0
+            probas.append(value[:, class_index] / totals)
+            roots.append(offset)
+            max_depth = max(max_depth, int(tree.max_depth))
+            offset += n
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            left=np.ascontiguousarray(np.concatenate(lefts).astype(np.intp)),
+            right=np.ascontiguousarray(np.concatenate(rights).astype(np.intp)),
+            leaf_proba=np.ascontiguousarray(np.concatenate(probas)),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            n_features=int(getattr(model, 'n_features_in_', estimators[0].tree_.n_features)),
+        )
+
+    def _prepare(self, X) -> np.ndarray:
+        # sklearn validates trees' input as float32; round the same way so values
+        # that sit exactly on a threshold go to the same side
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f'Expected {self.n_features} features, got {X.shape[1]}')
+        return X
+
+    def predict_one(self, x) -> float:
+        """Fraud probability for a single feature vector"""
+        x = self._prepare(x)[0]
+        nodes = self.roots
+        for depth in range(self.max_depth):
+            nodes = np.where(x[self.feature[nodes]] <= self.threshold[nodes],
+                             self.left[nodes], self.right[nodes])
+            # Most paths reach a leaf well before max_depth; stop once every tree has
+            if depth % _LEAF_CHECK_EVERY == _LEAF_CHECK_EVERY - 1 and (self.left[nodes] == nodes).all():
+                break
+        return float(self.leaf_proba[nodes].mean())
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Fraud probability for every row of X, shape (n_samples,)"""
+        X = self._prepare(X)
+        n = X.shape[0]
+        if n == 0:
+            return np.zeros(0, dtype=np.float64)
+        if n == 1:
+            return np.array([self.predict_one(X[0])])
+        rows = np.arange(n, dtype=np.intp)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, self.n_trees))
+        for depth in range(self.max_depth):
+            nodes = np.where(X[rows, self.feature[nodes]] <= self.threshold[nodes],
+                             self.left[nodes], self.right[nodes])
+            if depth % _LEAF_CHECK_EVERY == _LEAF_CHECK_EVERY - 1 and (self.left[nodes] == nodes).all():
+                break
+        return self.leaf_proba[nodes].mean(axis=1)
+
+
+def build_flat_forest(model) -> Optional[FlatForest]:
+    """FlatForest for a fitted forest, or None when the model cannot be flattened."""
+    try:
+        return FlatForest.from_sklearn(model)
+    except Exception as e:
+        logger.warning(f"Falling back to sklearn inference: {e}")
+        return None
@@ -0,0 +1,210 @@
+"""
+Structured Logging Module
+- Queue-based logging: request threads only enqueue records, a single
+  writer thread formats them and writes each batch with one flush
+- JSON lines output (or plain text for local development)
+- Level from LOG_LEVEL, and debug records sampled by LOG_DEBUG_SAMPLE_RATE
+- Extra fields passed as logger.info("...", extra={...}) become JSON keys
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import copy
+import json
+import queue
+import random
+import time
+import atexit
+import logging
+import logging.handlers
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any extra fields."""
+
+    def __init__(self, caller_info: bool = False):
+        super().__init__()
+        self.caller_info = caller_info
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if self.caller_info:
+            entry['caller'] = f"{record.filename}:{record.lineno} {record.funcName}"
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps a fraction of DEBUG records; INFO and above always pass."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the writer thread.
+
+    The stock prepare() copies the record and renders the full formatted line
+    in the calling thread; here the caller only merges msg % args and renders
+    a traceback if one is attached, on a shallow copy so other handlers (e.g.
+    pytest's capture) still see the original record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _LogWriter:
+    """Drains the log queue in batches: format every record, one write and flush per batch."""
+
+    def __init__(self, log_queue: "queue.Queue", stream, formatter: logging.Formatter,
+                 max_batch: int = 512, linger: float = 0.01):
+        self.queue = log_queue
+        self.stream = stream
+        self.formatter = formatter
+        self.max_batch = max_batch
+        self.linger = linger
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Write everything already queued, then stop."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put_nowait(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            if batch[0] is not None and self.linger:
+                # Let a burst accumulate instead of waking (and taking the GIL) once per record
+                time.sleep(self.linger)
+            while batch[-1] is not None and len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            lines = []
+            for record in batch:
+                if record is None:
+                    continue
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    lines.append(f'{{"level": "ERROR", "msg": "unformattable log record from {record.name}"}}')
+            if lines:
+                try:
+                    self.stream.write('\n'.join(lines) + '\n')
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if stopping:
+                return
+
+
+_writer: Optional[_LogWriter] = None
+_queue_handler: Optional[logging.Handler] = None
+_lock = threading.Lock()
+
+
+def configure_logging(level: Optional[str] = None, json_output: Optional[bool] = None,
+                      debug_sample_rate: Optional[float] = None, stream=None,
+                      caller_info: Optional[bool] = None) -> logging.Logger:
+    """
+    Route the root logger through a queue to a single writer thread
+
+    Safe to call more than once; later calls replace the previous setup.
+
+    Args:
+        level: Level name, default LOG_LEVEL or INFO
+        json_output: JSON lines when True, plain text when False (default LOG_FORMAT, json)
+        debug_sample_rate: Fraction of DEBUG records kept (default LOG_DEBUG_SAMPLE_RATE or 1.0)
+        stream: Output stream, default stdout
+        caller_info: Add the file/line/function of each call to its line
+            (default LOG_CALLER_INFO, off)
+    """
+    global _writer, _queue_handler
+
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    if json_output is None:
+        json_output = os.environ.get('LOG_FORMAT', 'json').lower() != 'text'
+    if debug_sample_rate is None:
+        try:
+            debug_sample_rate = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+        except ValueError:
+            debug_sample_rate = 1.0
+    if caller_info is None:
+        caller_info = os.environ.get('LOG_CALLER_INFO', 'false').lower() == 'true'
+
+    if json_output:
+        formatter = JsonFormatter(caller_info=caller_info)
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s'
+                                      + (' %(filename)s:%(lineno)d' if caller_info else '') + ': %(message)s')
+
+    with _lock:
+        root = logging.getLogger()
+        if _writer is not None:
+            _writer.stop()
+        if _queue_handler is not None:
+            root.removeHandler(_queue_handler)
+
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        _queue_handler = _DeferredQueueHandler(log_queue)
+        _queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+        root.addHandler(_queue_handler)
+        root.setLevel(getattr(logging, level, logging.INFO))
+
+        _writer = _LogWriter(log_queue, stream or sys.stdout, formatter)
+        _writer.start()
+    return root
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _writer
+    with _lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+
+
+atexit.register(shutdown_logging)
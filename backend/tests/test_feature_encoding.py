@@ -0,0 +1,26 @@
+"""
+Training encodes identifier columns with encode_series and serving encodes
+single values with stable_hash; both must give every value the same code
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from feature_encoding import encode_series, stable_hash  # noqa: E402
+
+
+def test_series_matches_single_values():
+    values = ['10.0.0.1', '10.0.0.2', '10.0.0.1', 'DV1234']
+    assert encode_series(pd.Series(values)).tolist() == [stable_hash(v) for v in values]
+
+
+@pytest.mark.parametrize('missing', [None, float('nan')], ids=['none', 'nan'])
+def test_missing_values_encode_like_serving(missing):
+    encoded = encode_series(pd.Series(['10.0.0.1', missing], dtype=object))
+    assert encoded.tolist() == [stable_hash('10.0.0.1'), stable_hash(None)]
+    assert stable_hash(None) == stable_hash('')
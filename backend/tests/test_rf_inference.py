@@ -0,0 +1,89 @@
+"""
+FlatForest must score exactly like the sklearn forest it was built from,
+on single rows, small batches and large batches alike
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('sklearn')
+
+from sklearn.ensemble import RandomForestClassifier  # noqa: E402
+
+from random_forest_fraud import DEFAULT_FEATURES, RandomForestFraudModel  # noqa: E402
+from rf_inference import FlatForest  # noqa: E402
+
+TOLERANCE = 1e-9
+
+
+def _rows(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 10 ** 8, n),
+        rng.integers(18, 90, n),
+        rng.integers(0, 10 ** 8, n),
+        rng.integers(0, 10 ** 8, n),
+        rng.integers(1, 8, n),
+        rng.integers(5, 900, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 4, n),
+    ]).astype(np.float64)
+
+
+@pytest.fixture(scope='module', params=[{'max_depth': None}, {'max_depth': 6, 'min_samples_leaf': 5}],
+                ids=['unlimited', 'shallow'])
+def forest(request):
+    X = _rows(3000, seed=1)
+    risk = (X[:, 4] > 4) * 0.4 + (X[:, 5] < 60) * 0.3 + (X[:, 6] == 0) * 0.3
+    y = (risk + np.random.default_rng(2).normal(0, 0.15, len(X)) > 0.5).astype(int)
+    model = RandomForestClassifier(n_estimators=25, random_state=42, **request.param)
+    model.fit(X, y)
+    return model
+
+
+def test_batch_matches_sklearn(forest):
+    X = _rows(2000, seed=3)
+    expected = forest.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(FlatForest.from_sklearn(forest).predict_proba(X), expected, rtol=0, atol=TOLERANCE)
+
+
+def test_single_row_matches_sklearn(forest):
+    flat = FlatForest.from_sklearn(forest)
+    X = _rows(200, seed=4)
+    expected = forest.predict_proba(X)[:, 1]
+    single = np.array([flat.predict_one(row) for row in X])
+    np.testing.assert_allclose(single, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_values_on_thresholds_go_the_same_way(forest):
+    # Feature values equal to split thresholds are where float32 rounding matters
+    tree = forest.estimators_[0].tree_
+    X = _rows(len(tree.threshold), seed=5)
+    internal = tree.children_left != -1
+    X[internal, tree.feature[internal]] = tree.threshold[internal]
+    expected = forest.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(FlatForest.from_sklearn(forest).predict_proba(X), expected, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize('rows', [1, 8, 64, 65, 500])
+def test_predict_proba_matrix_matches_sklearn_on_both_paths(forest, rows):
+    model = RandomForestFraudModel(features=list(DEFAULT_FEATURES), inference_backend='flat')
+    model.model = forest
+    model.flat_max_rows = 64
+    X = _rows(rows, seed=rows)
+    np.testing.assert_allclose(model.predict_proba_matrix(X), forest.predict_proba(X)[:, 1],
+                               rtol=0, atol=TOLERANCE)
+
+
+def test_single_and_batch_score_missing_values_alike(forest):
+    model = RandomForestFraudModel(features=list(DEFAULT_FEATURES), inference_backend='flat')
+    model.model = forest
+    features = dict(zip(DEFAULT_FEATURES, _rows(1, seed=6)[0]))
+    features[DEFAULT_FEATURES[4]] = float('nan')
+    features[DEFAULT_FEATURES[5]] = None
+    del features[DEFAULT_FEATURES[6]]
+    assert model.predict_proba(features) == pytest.approx(model.predict_proba_batch([features])[0], abs=TOLERANCE)
@@ -23,15 +23,30 @@ try {
     
     try {
         $trainResponse = Invoke-RestMethod -Uri "http://localhost:5000/api/admin/train-rf-from-db" -Method POST -Headers $headers
+        Write-Host "Training job queued: $($trainResponse.job_id)" -ForegroundColor Cyan
         
-        Write-Host "Model trained successfully!" -ForegroundColor Green
-        Write-Host "Message: $($trainResponse.message)" -ForegroundColor Cyan
-        Write-Host "Records used: $($trainResponse.records_used)" -ForegroundColor Cyan
-        Write-Host "Metrics:" -ForegroundColor Yellow
-        Write-Host "  ROC AUC: $($trainResponse.metrics.roc_auc)" -ForegroundColor Cyan
-        Write-Host "  PR AUC: $($trainResponse.metrics.pr_auc)" -ForegroundColor Cyan
-        Write-Host "  Training samples: $($trainResponse.metrics.n_train)" -ForegroundColor Cyan
-        Write-Host "  Test samples: $($trainResponse.metrics.n_test)" -ForegroundColor Cyan
+        # The server trains in the background; poll the job until it finishes
+        $job = $null
+        do {
+            Start-Sleep -Seconds 5
+            $job = Invoke-RestMethod -Uri "http://localhost:5000$($trainResponse.status_url)" -Method GET -Headers $headers
+            Write-Host "  $($job.status): $([math]::Round($job.progress * 100))% $($job.stage)" -ForegroundColor Gray
+        } while ($job.status -eq "queued" -or $job.status -eq "running")
+        
+        if ($job.status -eq "succeeded") {
+            Write-Host "Model trained successfully!" -ForegroundColor Green
+            Write-Host "Records used: $($job.records_used)" -ForegroundColor Cyan
+            Write-Host "Metrics:" -ForegroundColor Yellow
+            Write-Host "  ROC AUC: $($job.metrics.roc_auc)" -ForegroundColor Cyan
+            Write-Host "  PR AUC: $($job.metrics.pr_auc)" -ForegroundColor Cyan
+            Write-Host "  Training samples: $($job.metrics.n_train)" -ForegroundColor Cyan
+            Write-Host "  Test samples: $($job.metrics.n_test)" -ForegroundColor Cyan
+        } else {
+            Write-Host "Training $($job.status)" -ForegroundColor Red
+            if ($job.error) {
+                Write-Host $job.error -ForegroundColor Red
+            }
+        }
         
     } catch {
         Write-Host "Training failed:" -ForegroundColor Red
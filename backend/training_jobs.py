@@ -0,0 +1,499 @@
+"""
+Training Jobs Module
+- Runs Random Forest training as background jobs instead of inside HTTP requests
+- Each job trains in its own spawned process, niced and capped to a number of
+  cores so vote traffic keeps the rest of the machine
+- Jobs live in the training_jobs collection (in memory without MongoDB):
+  status, progress, heartbeat, metrics and errors, so any app worker can
+  report on or cancel a job another worker is running
+- A worker must lease one of TRAINING_MAX_RUNNING_JOBS slot documents
+  (training_slots) before claiming a job, so the limit holds across workers
+- A finished job publishes the model through the model version file; every
+  process hot-reloads it (see random_forest_fraud)
+"""
+
+from __future__ import annotations
+
+import os
+import copy
+import uuid
+import queue
+import socket
+import logging
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_SOURCES = ('behavior', 'csv', 'db')
+# A running job whose owner stopped heartbeating for this long is marked failed,
+# and its slot lease runs out after the same time
+STALE_AFTER = timedelta(minutes=5)
+
+_manager = None
+
+
+# ---------------------------------------------------------------------------
+# Training process
+# ---------------------------------------------------------------------------
+
+def _load_records(source: str, params: Dict, mongo_uri: Optional[str], db_name: Optional[str]) -> List[Dict]:
+    if source == 'csv':
+        from random_forest_fraud import load_voting_fraud_dataset
+        return load_voting_fraud_dataset(params.get('csv_path'))
+
+    from pymongo import MongoClient
+    from behavior_tracker import BehaviorTracker
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        return list(BehaviorTracker(client[db_name]).export_training_data(labeled_only=False))
+    finally:
+        client.close()
+
+
+def _train_from_collection(service, params: Dict, n_jobs: int, mongo_uri: Optional[str],
+                           db_name: Optional[str], events) -> Dict:
+    """'db' source: stream fraud_training_data into a matrix instead of loading documents"""
+    from pymongo import MongoClient
+    from training_loader import load_training_matrix
+
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    try:
+        matrix = load_training_matrix(
+            client[db_name]['fraud_training_data'], service.model.features,
+            batch_size=int(params.get('batch_size', os.environ.get('TRAINING_LOAD_BATCH_SIZE', 5000))),
+            sort=[('_id', 1)],
+            progress=lambda rows, expected: events.put(
+                ('progress', 0.01 + 0.04 * min(rows / max(expected, 1), 1.0), f'loaded {rows} rows')),
+        )
+    finally:
+        client.close()
+    if matrix.rows == 0:
+        raise ValueError('No training data found in database. Run load_dataset_to_db.py first')
+    events.put(('records', matrix.rows))
+    events.put(('load_stats', {'rows': matrix.rows, 'skipped_unlabeled': matrix.skipped,
+                               'seconds': round(matrix.seconds, 3),
+                               'rows_per_second': round(matrix.rows_per_second),
+                               'matrix_mb': round(matrix.nbytes / 1e6, 2)}))
+    return service.train_and_save_matrix(
+        matrix.X, matrix.y, n_jobs=n_jobs,
+        progress=lambda fraction, stage: events.put(('progress', fraction, stage)),
+        incremental=params.get('incremental'), profiles=params.get('profiles'),
+        search=params.get('search')
+    )
+
+
+def _run_training(job_id: str, source: str, params: Dict, models_dir: str, n_jobs: int, nice: int,
+                  mongo_uri: Optional[str], db_name: Optional[str], events) -> None:
+    """Entry point of the training process; reports through the events queue"""
+    try:
+        if nice and hasattr(os, 'nice'):
+            os.nice(nice)
+        from random_forest_fraud import RandomForestFraudService
+
+        service = RandomForestFraudService(models_dir=models_dir)
+        events.put(('progress', 0.01, 'loading records'))
+        if source == 'db':
+            events.put(('succeeded', _train_from_collection(service, params, n_jobs, mongo_uri, db_name, events)))
+            return
+        records = _load_records(source, params, mongo_uri, db_name)
+        if not records:
+            events.put(('failed', 'No training data available'))
+            return
+        events.put(('records', len(records)))
+
+        metrics = service.train_and_save(
+            records, n_jobs=n_jobs, progress=lambda fraction, stage: events.put(('progress', fraction, stage)),
+            incremental=params.get('incremental'), profiles=params.get('profiles'),
+            search=params.get('search')
+        )
+        events.put(('succeeded', metrics))
+    except Exception as e:
+        events.put(('failed', f'{type(e).__name__}: {e}'))
+
+
+# ---------------------------------------------------------------------------
+# Job storage
+# ---------------------------------------------------------------------------
+
+class _MemoryJobStore:
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._slots: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def insert(self, job: Dict) -> None:
+        with self._lock:
+            self._jobs[job['_id']] = dict(job)
+
+    def update(self, job_id: str, fields: Dict) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def update_if(self, job_id: str, status: str, fields: Dict) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != status:
+                return False
+            job.update(fields)
+            return True
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job else None
+
+    def list(self, limit: int) -> List[Dict]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j['created_at'], reverse=True)[:limit]
+            return copy.deepcopy(jobs)
+
+    def acquire_slot(self, slots: int, lease: str, until: datetime) -> Optional[int]:
+        with self._lock:
+            now = datetime.utcnow()
+            for slot in range(slots):
+                held = self._slots.get(slot)
+                if held is None or held['until'] < now:
+                    self._slots[slot] = {'lease': lease, 'until': until}
+                    return slot
+            return None
+
+    def renew_slot(self, slot: int, lease: str, until: datetime) -> None:
+        with self._lock:
+            if (self._slots.get(slot) or {}).get('lease') == lease:
+                self._slots[slot]['until'] = until
+
+    def release_slot(self, slot: int, lease: str) -> None:
+        with self._lock:
+            if (self._slots.get(slot) or {}).get('lease') == lease:
+                del self._slots[slot]
+
+    def has_queued(self) -> bool:
+        with self._lock:
+            return any(j['status'] == 'queued' for j in self._jobs.values())
+
+    def claim_next(self, owner: Dict, slot: int) -> Optional[Dict]:
+        with self._lock:
+            queued = [j for j in self._jobs.values() if j['status'] == 'queued']
+            if not queued:
+                return None
+            job = min(queued, key=lambda j: j['created_at'])
+            job.update({'status': 'running', 'started_at': datetime.utcnow(),
+                        'heartbeat_at': datetime.utcnow(), 'owner': owner, 'slot': slot})
+            return dict(job)
+
+    def fail_stale(self, before: datetime) -> int:
+        return 0  # Jobs die with the process that holds them
+
+
+class _MongoJobStore:
+    def __init__(self, collection, slots):
+        self.collection = collection
+        self.slots = slots
+        self.collection.create_index([('status', 1), ('created_at', 1)])
+
+    def insert(self, job: Dict) -> None:
+        self.collection.insert_one(job)
+
+    def update(self, job_id: str, fields: Dict) -> None:
+        self.collection.update_one({'_id': job_id}, {'$set': fields})
+
+    def update_if(self, job_id: str, status: str, fields: Dict) -> bool:
+        return self.collection.update_one({'_id': job_id, 'status': status}, {'$set': fields}).modified_count == 1
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.collection.find_one({'_id': job_id})
+
+    def list(self, limit: int) -> List[Dict]:
+        return list(self.collection.find().sort('created_at', -1).limit(limit))
+
+    def acquire_slot(self, slots: int, lease: str, until: datetime) -> Optional[int]:
+        """Take a free or expired slot with one conditional write; None when all are held"""
+        from pymongo.errors import DuplicateKeyError
+        now = datetime.utcnow()
+        for slot in range(slots):
+            try:
+                # Matches a free slot, or inserts a missing one; a held slot makes
+                # the upsert collide on _id and is skipped
+                self.slots.update_one(
+                    {'_id': slot, '$or': [{'lease': None}, {'until': {'$lt': now}}]},
+                    {'$set': {'lease': lease, 'until': until}},
+                    upsert=True,
+                )
+                return slot
+            except DuplicateKeyError:
+                continue
+        return None
+
+    def renew_slot(self, slot: int, lease: str, until: datetime) -> None:
+        self.slots.update_one({'_id': slot, 'lease': lease}, {'$set': {'until': until}})
+
+    def release_slot(self, slot: int, lease: str) -> None:
+        self.slots.update_one({'_id': slot, 'lease': lease}, {'$set': {'lease': None, 'until': None}})
+
+    def has_queued(self) -> bool:
+        return self.collection.find_one({'status': 'queued'}, {'_id': 1}) is not None
+
+    def claim_next(self, owner: Dict, slot: int) -> Optional[Dict]:
+        from pymongo import ReturnDocument
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {'status': 'queued'},
+            {'$set': {'status': 'running', 'started_at': now, 'heartbeat_at': now, 'owner': owner, 'slot': slot}},
+            sort=[('created_at', 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def fail_stale(self, before: datetime) -> int:
+        result = self.collection.update_many(
+            {'status': 'running', 'heartbeat_at': {'$lt': before}},
+            {'$set': {'status': 'failed', 'error': 'Training worker stopped responding',
+                      'finished_at': datetime.utcnow()}},
+        )
+        return result.modified_count
+
+
+# ---------------------------------------------------------------------------
+# Manager
+# ---------------------------------------------------------------------------
+
+class TrainingJobManager:
+    def __init__(self, db, models_dir: str, mongo_uri: Optional[str] = None, db_name: Optional[str] = None,
+                 max_cores: Optional[int] = None, nice: int = 10, max_running: int = 1,
+                 poll_interval: float = 2.0, on_success: Optional[Callable[[Dict], None]] = None):
+        self.db = db
+        self.models_dir = models_dir
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.max_cores = max_cores or max(1, (os.cpu_count() or 2) // 2)
+        self.nice = nice
+        self.max_running = max_running
+        self.poll_interval = poll_interval
+        self.on_success = on_success
+        self.store = _MongoJobStore(db['training_jobs'], db['training_slots']) if db is not None \
+            else _MemoryJobStore()
+        self.owner = {'host': socket.gethostname(), 'pid': os.getpid()}
+        self._wakeup = threading.Event()
+        self._processes: Dict[str, multiprocessing.Process] = {}
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name='training-dispatcher', daemon=True)
+            self._dispatcher.start()
+
+    def submit(self, source: str, params: Optional[Dict] = None, requested_by: Optional[str] = None) -> Dict:
+        """Queue a training job; returns the job document"""
+        if source not in JOB_SOURCES:
+            raise ValueError(f'Unknown training source: {source}')
+        if source != 'csv' and self.db is None:
+            raise RuntimeError('MongoDB is required to train from the database')
+        now = datetime.utcnow()
+        job = {
+            '_id': uuid.uuid4().hex,
+            'source': source,
+            'params': params or {},
+            'status': 'queued',
+            'progress': 0.0,
+            'stage': 'queued',
+            'requested_by': requested_by,
+            'created_at': now,
+            'cancel_requested': False,
+        }
+        self.store.insert(job)
+        self._wakeup.set()
+        logger.info(f"Training job {job['_id']} queued ({source})")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def list(self, limit: int = 20) -> List[Dict]:
+        return self.store.list(limit)
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a queued job, or ask the process that runs it to stop; the
+        owning app worker terminates the training process on its next poll
+        """
+        # Conditional writes, so a job claimed between a read and the write is not
+        # marked cancelled while its training process runs on
+        if not self.store.update_if(job_id, 'queued', {'status': 'cancelled', 'finished_at': datetime.utcnow()}):
+            if self.store.update_if(job_id, 'running', {'cancel_requested': True}):
+                process = self._processes.get(job_id)
+                if process is not None:
+                    process.terminate()
+        return self.store.get(job_id)
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                self.store.fail_stale(datetime.utcnow() - STALE_AFTER)
+                # Cheap read first, so an idle dispatcher does not take and drop a slot every tick
+                if not self.store.has_queued():
+                    continue
+                lease = uuid.uuid4().hex
+                slot = self.store.acquire_slot(self.max_running, lease, datetime.utcnow() + STALE_AFTER)
+                if slot is None:
+                    continue
+                try:
+                    job = self.store.claim_next(self.owner, slot)
+                    if job is not None:
+                        self._run(job, lease)
+                finally:
+                    self.store.release_slot(slot, lease)
+            except Exception as e:
+                logger.warning(f"Training dispatcher error: {e}")
+
+    def _run(self, job: Dict, lease: str) -> None:
+        """Run one claimed job to completion, relaying progress from the training process"""
+        job_id = job['_id']
+        renewed = checked = datetime.utcnow()
+        ctx = multiprocessing.get_context('spawn')
+        events = ctx.Queue()
+        process = ctx.Process(
+            target=_run_training, name=f'training-{job_id[:8]}',
+            args=(job_id, job['source'], job.get('params') or {}, self.models_dir, self.max_cores, self.nice,
+                  self.mongo_uri, self.db_name, events),
+            # Not daemonic: the estimator may start worker processes of its own
+            daemon=False,
+        )
+        self._processes[job_id] = process
+        process.start()
+        self.store.update(job_id, {'pid': process.pid, 'n_jobs': self.max_cores, 'nice': self.nice})
+        logger.info(f"Training job {job_id} started (pid {process.pid}, {self.max_cores} cores, nice {self.nice})")
+
+        outcome: Dict = {}
+        try:
+            while not outcome:
+                try:
+                    event = events.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    event = None
+                now = datetime.utcnow()
+                if now - renewed >= timedelta(seconds=self.poll_interval):
+                    self.store.renew_slot(job['slot'], lease, now + STALE_AFTER)
+                    renewed = now
+                # On a timer rather than when the queue is quiet: a job that keeps
+                # reporting progress must still notice a cancel from another worker
+                if now - checked >= timedelta(seconds=self.poll_interval):
+                    checked = now
+                    if (self.store.get(job_id) or {}).get('cancel_requested'):
+                        process.terminate()
+                        outcome = {'status': 'cancelled'}
+                        break
+                if event is None:
+                    if not process.is_alive():
+                        outcome = {'status': 'failed', 'error': f'Training process exited with code {process.exitcode}'}
+                    else:
+                        self.store.update(job_id, {'heartbeat_at': now})
+                elif event[0] == 'progress':
+                    self.store.update(job_id, {'progress': round(event[1], 3), 'stage': event[2], 'heartbeat_at': now})
+                elif event[0] == 'records':
+                    self.store.update(job_id, {'records_used': event[1], 'heartbeat_at': now})
+                elif event[0] == 'load_stats':
+                    self.store.update(job_id, {'load_stats': event[1], 'heartbeat_at': now})
+                elif event[0] == 'succeeded':
+                    outcome = {'status': 'succeeded', 'progress': 1.0, 'stage': 'done', 'metrics': event[1]}
+                elif event[0] == 'failed':
+                    outcome = {'status': 'failed', 'error': event[1]}
+        finally:
+            process.join(timeout=10)
+            self._processes.pop(job_id, None)
+            if not outcome:
+                outcome = {'status': 'failed', 'error': 'Training monitor stopped'}
+            if (self.store.get(job_id) or {}).get('cancel_requested') and outcome['status'] != 'succeeded':
+                outcome = {'status': 'cancelled'}
+            outcome['finished_at'] = datetime.utcnow()
+            self.store.update(job_id, outcome)
+            logger.info(f"Training job {job_id} {outcome['status']}")
+
+        if outcome['status'] == 'succeeded':
+            self._persist_metrics(job_id)
+            from random_forest_fraud import get_rf_service
+            service = get_rf_service()
+            if service is not None:
+                # Swap the new model in here now rather than at the next version poll
+                service.check_for_update()
+            if self.on_success is not None:
+                try:
+                    self.on_success(self.store.get(job_id) or {})
+                except Exception as e:
+                    logger.warning(f"Training job {job_id} success hook failed: {e}")
+
+    def _persist_metrics(self, job_id: str) -> None:
+        if self.db is None:
+            return
+        job = self.store.get(job_id) or {}
+        metrics = job.get('metrics', {})
+        trained_at = job.get('finished_at', datetime.utcnow())
+        fields = {
+            'model': 'random_forest',
+            'trained_at': trained_at,
+            'records_used': job.get('records_used'),
+            'source': job.get('source'),
+            'job_id': job_id,
+            'profile': metrics.get('profile'),
+            'metrics': metrics,
+        }
+        # One entry per profile, kept when a later job fits only some of them
+        for name, profile_metrics in (metrics.get('profiles') or {}).items():
+            fields[f'profiles.{name}'] = {**profile_metrics, 'trained_at': trained_at, 'job_id': job_id}
+        try:
+            self.db['model_metrics'].update_one({'model': 'random_forest'}, {'$set': fields}, upsert=True)
+        except Exception as e:
+            logger.warning(f"Failed to persist metrics for training job {job_id}: {e}")
+
+
+def incremental_params(options: Dict) -> Dict:
+    """
+    train_incremental arguments from a request body, defaulting to RF_INCREMENTAL_*
+    settings; max_trees is None (the served profile's forest size) unless set
+    """
+    window = options.get('window', os.environ.get('RF_INCREMENTAL_WINDOW', 5000))
+    max_trees = options.get('max_trees', os.environ.get('RF_INCREMENTAL_MAX_TREES'))
+    return {
+        'new_trees': int(options.get('new_trees', os.environ.get('RF_INCREMENTAL_NEW_TREES', 50))),
+        'max_trees': int(max_trees) if max_trees else None,
+        'window': int(window) if window else None,
+        'compare_full': bool(options.get('compare_full', False)),
+    }
+
+
+def serialize_job(job: Dict) -> Dict:
+    """JSON-safe view of a job document for API responses"""
+    out = {}
+    for key, value in job.items():
+        if key == '_id':
+            out['job_id'] = value
+        elif isinstance(value, datetime):
+            out[key] = value.isoformat()
+        else:
+            out[key] = value
+    return out
+
+
+def initialize_training_jobs(db, models_dir: str, mongo_uri: Optional[str] = None,
+                             db_name: Optional[str] = None,
+                             on_success: Optional[Callable[[Dict], None]] = None) -> TrainingJobManager:
+    global _manager
+    max_cores = os.environ.get('TRAINING_MAX_CORES')
+    _manager = TrainingJobManager(
+        db, models_dir, mongo_uri=mongo_uri, db_name=db_name,
+        max_cores=int(max_cores) if max_cores else None,
+        nice=int(os.environ.get('TRAINING_NICE', 10)),
+        max_running=int(os.environ.get('TRAINING_MAX_RUNNING_JOBS', 1)),
+        on_success=on_success,
+    )
+    if multiprocessing.parent_process() is None:
+        _manager.start()
+    return _manager
+
+
+def get_training_jobs() -> Optional[TrainingJobManager]:
+    return _manager
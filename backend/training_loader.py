@@ -0,0 +1,153 @@
+"""
+Training Loader Module
+- Streams a training collection (fraud_training_data) into a NumPy feature
+  matrix and label vector without building a list of dicts or a DataFrame
+- Reads only the model's features and the label (projection), in fixed-size
+  cursor batches, converting each batch straight into preallocated columns
+- Encodes values the same way RandomForestFraudModel.prepare_dataframe does
+  ("V0001" voter ids -> digits, text IPs/devices -> stable hash, ints truncated)
+- Peak memory is the final matrix plus one batch of documents
+"""
+
+from __future__ import annotations
+
+import re
+import time
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from feature_encoding import stable_hash
+
+logger = logging.getLogger(__name__)
+
+LABEL_FIELDS = ('is_fraud', 'fraud_label')
+# prepare_dataframe casts these to int after coercion
+INTEGER_FEATURES = {'age', 'login_attempts', 'vote_duration_sec', 'location_match', 'previous_votes'}
+HASHED_FEATURES = {'ip_address', 'device_id'}
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+@dataclass
+class TrainingMatrix:
+    X: np.ndarray
+    y: np.ndarray
+    features: List[str]
+    rows: int
+    skipped: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.X.nbytes + self.y.nbytes)
+
+
+def _number(value) -> float:
+    if value is None or isinstance(value, str) and not value.strip():
+        return 0.0
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if number != number else number  # NaN -> 0
+
+
+def _converter(feature: str) -> Callable:
+    """Per-value conversion matching prepare_dataframe for one feature"""
+    if feature == 'voter_id':
+        def convert(value):
+            if isinstance(value, str):
+                match = _DIGITS.search(value)
+                return float(int(match.group(1))) if match else 0.0
+            return _number(value)
+    elif feature in HASHED_FEATURES:
+        def convert(value):
+            return float(stable_hash(value)) if isinstance(value, str) else _number(value)
+    elif feature in INTEGER_FEATURES:
+        def convert(value):
+            return float(int(_number(value)))
+    else:
+        convert = _number
+    return convert
+
+
+def _label(doc: Dict) -> Optional[int]:
+    for field in LABEL_FIELDS:
+        value = doc.get(field)
+        if value is not None:
+            return int(bool(int(_number(value))))
+    return None
+
+
+def load_training_matrix(collection, features: Sequence[str], query: Optional[Dict] = None,
+                         batch_size: int = 5000, sort: Optional[List] = None,
+                         progress: Optional[Callable[[int, int], None]] = None) -> TrainingMatrix:
+    """
+    Stream labeled documents of collection into a TrainingMatrix
+
+    Args:
+        features: Matrix columns, in order (the model's features)
+        query: Optional filter; documents without a label are skipped
+        batch_size: Documents fetched and converted per batch
+        sort: Optional cursor sort, e.g. [('_id', 1)] for insertion order
+        progress: Optional callback(rows_loaded, rows_expected) after each batch
+    """
+    started = time.perf_counter()
+    features = list(features)
+    query = query or {}
+    expected = collection.count_documents(query) if query else collection.estimated_document_count()
+    capacity = max(int(expected), batch_size)
+    X = np.zeros((capacity, len(features)), dtype=np.float64)
+    y = np.zeros(capacity, dtype=np.int8)
+    converters = [_converter(f) for f in features]
+
+    projection = {'_id': 0, **{f: 1 for f in features}, **{f: 1 for f in LABEL_FIELDS}}
+    cursor = collection.find(query, projection, batch_size=batch_size)
+    if sort:
+        cursor = cursor.sort(sort)
+
+    rows = skipped = 0
+    batch: List[Dict] = []
+
+    def flush():
+        nonlocal X, y, rows, skipped
+        labels = [_label(doc) for doc in batch]
+        kept = [doc for doc, label in zip(batch, labels) if label is not None]
+        skipped += len(batch) - len(kept)
+        n = len(kept)
+        if rows + n > X.shape[0]:
+            # More documents than counted (inserts during the load): grow by half
+            grow = max(rows + n, int(X.shape[0] * 1.5))
+            X = np.resize(X, (grow, len(features)))
+            y = np.resize(y, grow)
+        for j, convert in enumerate(converters):
+            name = features[j]
+            X[rows:rows + n, j] = np.fromiter((convert(doc.get(name)) for doc in kept), dtype=np.float64, count=n)
+        y[rows:rows + n] = np.fromiter((label for label in labels if label is not None), dtype=np.int8, count=n)
+        rows += n
+        batch.clear()
+        if progress:
+            progress(rows, expected)
+
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if rows < X.shape[0]:
+        # Slicing keeps the preallocated buffer; copy only when it is noticeably larger
+        X, y = (X[:rows].copy(), y[:rows].copy()) if rows < X.shape[0] * 0.9 else (X[:rows], y[:rows])
+    matrix = TrainingMatrix(X=X, y=y, features=features, rows=rows, skipped=skipped,
+                            seconds=time.perf_counter() - started)
+    logger.info(f"Loaded {rows} training rows ({skipped} unlabeled skipped) in {matrix.seconds:.2f}s "
+                f"({matrix.rows_per_second:,.0f} rows/s, {matrix.nbytes / 1e6:.1f} MB)")
+    return matrix
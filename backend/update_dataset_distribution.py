@@ -1,5 +1,7 @@
 import pandas as pd
 
+from dataset_appender import invalidate_columnar_copy
+
 # Read the original dataset
 df = pd.read_csv('voting_fraud_dataset.csv')
 
@@ -20,6 +22,8 @@ df_final = pd.concat([df_new_legit, df_fraud]).sample(frac=1, random_state=42).r
 
 # Save updated dataset
 df_final.to_csv('voting_fraud_dataset.csv', index=False)
+# The Parquet/Feather copy no longer matches; training reads the CSV until it is re-seeded
+invalidate_columnar_copy('voting_fraud_dataset.csv')
 
 print(f'CSV updated successfully!')
 print(f'Congress (legitimate/is_fraud=0): {len(df_new_legit)} votes')
@@ -0,0 +1,117 @@
+"""
+User Resolution Module
+- Resolves a JWT identity (always the username) to a user document
+- Caches per request (flask.g) and across requests in a small TTL LRU
+
+Cached documents can lag another worker's write by up to the TTL. Callers that
+gate on a flag which only ever turns on (identity_verified, photo_path) should
+re-resolve with refresh=True when the cached copy says "not yet".
+"""
+
+from __future__ import annotations
+
+import os
+import logging
+from typing import Dict, Optional
+
+from caching import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class UserResolver:
+    def __init__(self, users_collection, max_entries: int = 1024, ttl: float = 30.0):
+        self.users = users_collection
+        self._cache = TTLCache(max_entries=max_entries, default_ttl=ttl)
+
+    def resolve(self, identity, refresh: bool = False) -> Optional[Dict]:
+        """
+        Find the user for a JWT identity
+
+        Args:
+            identity: Username the JWT was issued for
+            refresh: Skip both caches and read from MongoDB
+
+        Returns:
+            A copy of the user document, or None if no user matches
+        """
+        if self.users is None or not identity:
+            return None
+        identity = str(identity)
+        request_cache = self._request_cache()
+
+        if not refresh:
+            user = request_cache.get(identity) if request_cache is not None else None
+            if user is None:
+                user = self._cache.get(identity)
+            if user is not None:
+                if request_cache is not None:
+                    request_cache[identity] = user
+                return dict(user)
+
+        user = self._lookup(identity)
+        if user is None:
+            return None
+        for key in self._keys(user) | {identity}:
+            self._cache.set(key, user)
+            if request_cache is not None:
+                request_cache[key] = user
+        return dict(user)
+
+    def _lookup(self, identity: str) -> Optional[Dict]:
+        # Tokens are issued for usernames only; never match an _id, or a
+        # username that happens to look like one could resolve to another user
+        return self.users.find_one({'username': identity})
+
+    def invalidate(self, user: Optional[Dict] = None, identity=None) -> None:
+        """Forget a user after its identity_verified flag or photo changes."""
+        keys = set()
+        if user is not None:
+            keys |= self._keys(user)
+        if identity is not None:
+            keys.add(str(identity))
+        request_cache = self._request_cache()
+        for key in keys:
+            self._cache.delete(key)
+            if request_cache is not None:
+                request_cache.pop(key, None)
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
+
+    @staticmethod
+    def _keys(user: Dict) -> set:
+        keys = set()
+        if user.get('username'):
+            keys.add(str(user['username']))
+        return keys
+
+    @staticmethod
+    def _request_cache() -> Optional[Dict]:
+        try:
+            from flask import g, has_request_context
+        except ImportError:
+            return None
+        if not has_request_context():
+            return None
+        if not hasattr(g, '_resolved_users'):
+            g._resolved_users = {}
+        return g._resolved_users
+
+
+# Global resolver instance (will be initialized in app)
+_user_resolver: Optional[UserResolver] = None
+
+
+def initialize_user_resolver(users_collection) -> UserResolver:
+    global _user_resolver
+    _user_resolver = UserResolver(
+        users_collection,
+        max_entries=int(os.environ.get('USER_CACHE_MAX_ENTRIES', 1024)),
+        ttl=float(os.environ.get('USER_CACHE_TTL_SECONDS', 30)),
+    )
+    return _user_resolver
+
+
+def get_user_resolver() -> Optional[UserResolver]:
+    return _user_resolver
@@ -0,0 +1,428 @@
+"""
+Vote Tally Module
+- Computes election-wide, per-candidate, per-precinct and unique-voter counts
+  in a single MongoDB aggregation instead of one count_documents per pair
+- Maintains a materialized `tallies` document with $inc counters updated on
+  every cast vote, so read endpoints cost one point read
+- The document is seeded from `votes` at startup (and by the first vote if it
+  is still missing); increments never create it, so it cannot start from one vote
+- Shared by /api/statistics, /api/precinct-status and /api/admin/fraud-stats
+
+Run `python vote_tally.py reconcile` to rebuild the counters from `votes`
+and report any drift.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+PRECINCTS = ['Precinct 1', 'Precinct 2', 'Precinct 3']
+
+# Display name -> stored names (old names kept for backward compatibility)
+CANDIDATE_ALIASES = {
+    'Congress': ['Congress', 'Candidate A'],
+    'BJP': ['BJP', 'Candidate B'],
+}
+
+RISK_LEVELS = ['low', 'medium', 'high']
+
+TALLY_DOCUMENT_ID = 'election'
+
+# Stand-in for a missing precinct/candidate/risk level inside the tallies document
+_NONE_KEY = '__none__'
+
+
+TALLY_PIPELINE = [
+    {'$facet': {
+        'totals': [
+            {'$group': {
+                '_id': None,
+                'total': {'$sum': 1},
+                'flagged': {'$sum': {'$cond': [{'$eq': ['$flagged_for_review', True]}, 1, 0]}},
+            }},
+        ],
+        'by_precinct_candidate': [
+            {'$group': {
+                '_id': {'precinct': '$precinct', 'candidate': '$candidate'},
+                'count': {'$sum': 1},
+            }},
+        ],
+        'by_risk': [
+            {'$group': {'_id': '$fraud_risk_level', 'count': {'$sum': 1}}},
+        ],
+        'unique_voters': [
+            {'$group': {'_id': {'precinct': '$precinct', 'user_id': '$user_id'}}},
+            {'$group': {'_id': '$_id.precinct', 'count': {'$sum': 1}}},
+        ],
+    }},
+]
+
+
+@dataclass
+class VoteTally:
+    total: int = 0
+    flagged: int = 0
+    # precinct -> stored candidate name -> count
+    precinct_candidates: Dict[Optional[str], Dict[Optional[str], int]] = field(default_factory=dict)
+    unique_voters_by_precinct: Dict[Optional[str], int] = field(default_factory=dict)
+    risk_levels: Dict[Optional[str], int] = field(default_factory=dict)
+
+    def candidate_votes(self, candidate: str) -> int:
+        """Votes for a display candidate across all precincts (aliases included)."""
+        names = CANDIDATE_ALIASES.get(candidate, [candidate])
+        return sum(
+            counts.get(name, 0)
+            for counts in self.precinct_candidates.values()
+            for name in names
+        )
+
+    def precinct_total(self, precinct: str) -> int:
+        return sum(self.precinct_candidates.get(precinct, {}).values())
+
+    def precinct_candidate_votes(self, precinct: str, candidate: str) -> int:
+        names = CANDIDATE_ALIASES.get(candidate, [candidate])
+        counts = self.precinct_candidates.get(precinct, {})
+        return sum(counts.get(name, 0) for name in names)
+
+    def unique_voters(self, precinct: str) -> int:
+        return self.unique_voters_by_precinct.get(precinct, 0)
+
+    def risk_count(self, level: str) -> int:
+        return self.risk_levels.get(level, 0)
+
+    def to_document(self) -> Dict:
+        precincts = {}
+        for precinct in set(self.precinct_candidates) | set(self.unique_voters_by_precinct):
+            precincts[_field_key(precinct)] = {
+                'candidates': {
+                    _field_key(candidate): count
+                    for candidate, count in self.precinct_candidates.get(precinct, {}).items()
+                },
+                'unique_voters': self.unique_voters_by_precinct.get(precinct, 0),
+            }
+        return {
+            '_id': TALLY_DOCUMENT_ID,
+            'total': self.total,
+            'flagged': self.flagged,
+            'precincts': precincts,
+            'risk_levels': {_field_key(level): count for level, count in self.risk_levels.items()},
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict) -> 'VoteTally':
+        tally = cls(total=int(doc.get('total', 0)), flagged=int(doc.get('flagged', 0)))
+        for key, precinct_doc in (doc.get('precincts') or {}).items():
+            precinct = _from_field_key(key)
+            tally.precinct_candidates[precinct] = {
+                _from_field_key(candidate): int(count)
+                for candidate, count in (precinct_doc.get('candidates') or {}).items()
+            }
+            tally.unique_voters_by_precinct[precinct] = int(precinct_doc.get('unique_voters', 0))
+        for key, count in (doc.get('risk_levels') or {}).items():
+            tally.risk_levels[_from_field_key(key)] = int(count)
+        return tally
+
+
+def _field_key(value) -> str:
+    """Encode a value for use as a MongoDB field name ('.' and '$' are reserved)."""
+    if value is None:
+        return _NONE_KEY
+    return str(value).replace('.', '\uff0e').replace('$', '\uff04')
+
+
+def _from_field_key(key: str) -> Optional[str]:
+    if key == _NONE_KEY:
+        return None
+    return key.replace('\uff0e', '.').replace('\uff04', '$')
+
+
+def tally_increments(vote_record: Dict) -> Dict[str, int]:
+    """$inc spec that adds one vote record to the tallies document."""
+    precinct = _field_key(vote_record.get('precinct'))
+    candidate = _field_key(vote_record.get('candidate'))
+    increments = {
+        'total': 1,
+        f'precincts.{precinct}.candidates.{candidate}': 1,
+        # One vote per user is enforced by cast_vote, so every vote is a new voter
+        f'precincts.{precinct}.unique_voters': 1,
+        f'risk_levels.{_field_key(vote_record.get("fraud_risk_level"))}': 1,
+    }
+    if vote_record.get('flagged_for_review'):
+        increments['flagged'] = 1
+    return increments
+
+
+def compute_tally(votes_collection) -> VoteTally:
+    """
+    Compute all vote counts with one aggregation round trip
+
+    Args:
+        votes_collection: MongoDB collection holding vote records
+
+    Returns:
+        VoteTally with totals, per-precinct/per-candidate, unique-voter and risk counts
+    """
+    result = list(votes_collection.aggregate(TALLY_PIPELINE, allowDiskUse=True))
+    facets = result[0] if result else {}
+
+    tally = VoteTally()
+    totals = facets.get('totals') or []
+    if totals:
+        tally.total = int(totals[0].get('total', 0))
+        tally.flagged = int(totals[0].get('flagged', 0))
+
+    for row in facets.get('by_precinct_candidate', []):
+        key = row.get('_id') or {}
+        precinct_counts = tally.precinct_candidates.setdefault(key.get('precinct'), {})
+        precinct_counts[key.get('candidate')] = int(row.get('count', 0))
+
+    for row in facets.get('unique_voters', []):
+        tally.unique_voters_by_precinct[row.get('_id')] = int(row.get('count', 0))
+
+    for row in facets.get('by_risk', []):
+        tally.risk_levels[row.get('_id')] = int(row.get('count', 0))
+
+    return tally
+
+
+def summarize_precincts(tally: VoteTally, precincts: Optional[List[str]] = None) -> List[Dict]:
+    """Per-precinct candidate counts used by the statistics and precinct dashboards."""
+    summary = []
+    for precinct in precincts or PRECINCTS:
+        summary.append({
+            'name': precinct,
+            'total_votes': tally.precinct_total(precinct),
+            'candidate_a_votes': tally.precinct_candidate_votes(precinct, 'Congress'),
+            'candidate_b_votes': tally.precinct_candidate_votes(precinct, 'BJP'),
+            'unique_voters': tally.unique_voters(precinct),
+        })
+    return summary
+
+
+def diff_tallies(stored: VoteTally, actual: VoteTally) -> Dict[str, Dict[str, int]]:
+    """Return {counter: {'stored': n, 'actual': m}} for every counter that differs."""
+    stored_doc = _flatten(stored.to_document())
+    actual_doc = _flatten(actual.to_document())
+    drift = {}
+    for key in sorted(set(stored_doc) | set(actual_doc)):
+        if key == '_id':
+            continue
+        stored_value = stored_doc.get(key, 0)
+        actual_value = actual_doc.get(key, 0)
+        if stored_value != actual_value:
+            drift[key] = {'stored': stored_value, 'actual': actual_value}
+    return drift
+
+
+def _flatten(doc: Dict, prefix: str = '') -> Dict:
+    flat = {}
+    for key, value in doc.items():
+        path = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f'{path}.'))
+        else:
+            flat[path] = value
+    return flat
+
+
+class TallyStore:
+    """Materialized vote counters kept in step with the votes collection."""
+
+    def __init__(self, votes_collection, tallies_collection, client=None):
+        self.votes = votes_collection
+        self.tallies = tallies_collection
+        self.client = client
+        self._transactions_supported: Optional[bool] = None
+
+    def _supports_transactions(self) -> bool:
+        if self._transactions_supported is None:
+            self._transactions_supported = False
+            if self.client is not None:
+                try:
+                    hello = self.client.admin.command('hello')
+                    # Multi-document transactions need a replica set or mongos
+                    self._transactions_supported = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+                except Exception as e:
+                    logger.warning(f"Could not detect transaction support: {e}")
+        return self._transactions_supported
+
+    def record_vote(self, vote_record: Dict):
+        """
+        Insert a vote and increment its counters
+
+        Runs both writes in one transaction when the deployment supports it.
+        On a standalone mongod the counters are bumped right after the insert;
+        `reconcile` repairs any drift left by a crash between the two writes.
+
+        Returns:
+            The InsertOneResult from the votes collection
+        """
+        increments = tally_increments(vote_record)
+        if self._supports_transactions():
+            with self.client.start_session() as session:
+                with session.start_transaction():
+                    result = self.votes.insert_one(vote_record, session=session)
+                    counted = self._increment(increments, session=session)
+            if not counted:
+                self.seed()
+            return result
+
+        result = self.votes.insert_one(vote_record)
+        try:
+            if not self._increment(increments):
+                self.seed()
+        except Exception as e:
+            logger.warning(f"Tally increment failed, run reconcile to repair: {e}")
+        return result
+
+    def record_votes(self, vote_records: List[Dict]) -> Dict[int, str]:
+        """
+        Bulk-insert votes and increment their counters with one update
+
+        Inserts are unordered, so one duplicate does not stop the rest.
+
+        Returns:
+            {index: error} for records that were not inserted
+        """
+        from pymongo.errors import BulkWriteError
+
+        if not vote_records:
+            return {}
+        failed: Dict[int, str] = {}
+        try:
+            self.votes.insert_many(vote_records, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                failed[error['index']] = 'duplicate' if error.get('code') == 11000 else error.get('errmsg', 'write error')
+
+        increments: Dict[str, int] = {}
+        for index, record in enumerate(vote_records):
+            if index in failed:
+                continue
+            for key, value in tally_increments(record).items():
+                increments[key] = increments.get(key, 0) + value
+        if increments:
+            try:
+                if not self._increment(increments):
+                    self.seed()
+            except Exception as e:
+                logger.warning(f"Tally increment failed, run reconcile to repair: {e}")
+        return failed
+
+    def _increment(self, increments: Dict[str, int], session=None) -> bool:
+        """$inc the counters; False when there is no document yet (the caller seeds it)"""
+        result = self.tallies.update_one({'_id': TALLY_DOCUMENT_ID}, {'$inc': increments}, session=session)
+        return result.matched_count > 0
+
+    def seed(self) -> bool:
+        """
+        Materialize the counters from votes if the document does not exist yet;
+        True if this call created it. Only ever inserts, so it cannot overwrite
+        increments another worker already applied.
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        if self.tallies.find_one({'_id': TALLY_DOCUMENT_ID}, {'_id': 1}) is not None:
+            return False
+        doc = compute_tally(self.votes).to_document()
+        doc['reconciled_at'] = datetime.utcnow()
+        try:
+            self.tallies.insert_one(doc)
+        except DuplicateKeyError:
+            return False
+        logger.info(f"Vote tallies seeded from {doc.get('total', 0)} vote(s)")
+        return True
+
+    def load(self) -> VoteTally:
+        """Current counts with one point read; computed from votes (not stored) if never materialized."""
+        doc = self.tallies.find_one({'_id': TALLY_DOCUMENT_ID})
+        if doc is None:
+            return compute_tally(self.votes)
+        return VoteTally.from_document(doc)
+
+    def reconcile(self, dry_run: bool = False) -> Dict:
+        """
+        Rebuild counters from the votes collection and report drift
+
+        Votes cast while the rebuild runs may be missed; run it when traffic is low.
+
+        Args:
+            dry_run: Only report drift, leave the stored counters untouched
+
+        Returns:
+            Dictionary with the drift found and whether the counters were rewritten
+        """
+        actual = compute_tally(self.votes)
+        stored_doc = self.tallies.find_one({'_id': TALLY_DOCUMENT_ID})
+        stored = VoteTally.from_document(stored_doc) if stored_doc else VoteTally()
+        drift = diff_tallies(stored, actual)
+
+        if not dry_run:
+            doc = actual.to_document()
+            doc['reconciled_at'] = datetime.utcnow()
+            self.tallies.replace_one({'_id': TALLY_DOCUMENT_ID}, doc, upsert=True)
+
+        if drift:
+            logger.warning(f"Tally drift detected in {len(drift)} counter(s)")
+        return {
+            'materialized': stored_doc is not None,
+            'drift': drift,
+            'drift_count': len(drift),
+            'total_votes': actual.total,
+            'applied': not dry_run,
+        }
+
+
+# Global store instance (will be initialized in app)
+_tally_store: Optional[TallyStore] = None
+
+
+def initialize_tally_store(db, client=None) -> Optional[TallyStore]:
+    global _tally_store
+    _tally_store = TallyStore(db['votes'], db['tallies'], client) if db is not None else None
+    if _tally_store is not None:
+        try:
+            _tally_store.seed()
+        except Exception as e:
+            logger.warning(f"Vote tally seed skipped, counters are computed on read until it succeeds: {e}")
+    return _tally_store
+
+
+def get_tally_store() -> Optional[TallyStore]:
+    return _tally_store
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    from pymongo import MongoClient
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Maintain the materialized vote tallies')
+    parser.add_argument('command', choices=['reconcile'])
+    parser.add_argument('--dry-run', action='store_true', help='Report drift without rewriting counters')
+    parser.add_argument('--mongodb-uri', default=os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db-name', default=os.environ.get('MONGODB_DB_NAME', 'election_db'))
+    args = parser.parse_args()
+
+    mongo_client = MongoClient(args.mongodb_uri)
+    try:
+        store = initialize_tally_store(mongo_client[args.db_name], mongo_client)
+        report = store.reconcile(dry_run=args.dry_run)
+        print(json.dumps(report, indent=2))
+        if report['drift_count']:
+            print(f"✗ {report['drift_count']} counter(s) drifted" + (" (not repaired)" if args.dry_run else " (repaired)"))
+        else:
+            print("✓ Tallies match the votes collection")
+    finally:
+        mongo_client.close()
+    sys.exit(1 if report['drift_count'] and args.dry_run else 0)
@@ -0,0 +1,455 @@
+"""
+Voter Feature Store Module
+- One voter_features document per voter (keyed by user_id) holding rolling
+  aggregates: vote and attempt counters, capped sets of IP/device hashes,
+  running sum and sum of squares of inter-vote intervals, and capped lists of
+  recent vote and attempt times
+- Aggregates are updated in place on every attempt and every recorded vote
+  with pipeline updates, so reading a voter's history is one _id point read
+  regardless of how many votes or attempts the voter has
+- cast_vote reads the history in the same find_one_and_update that counts the
+  attempt, so there is no separate read to cache
+- Aggregates are seeded from the votes collection once per database, by the
+  one worker that takes the seed lease (or by `python voter_feature_store.py
+  rebuild`); until the seed is done the store is unready and answers history
+  lookups from the voter's raw votes instead of from empty aggregates
+- A vote whose aggregate update fails is counted and its voter re-derived
+  from raw votes after the next successful update
+
+The history extractors in feature_registry consume VoterHistorySummary, so
+scoring code never loads raw vote documents.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import math
+import bisect
+import socket
+import logging
+import datetime
+import itertools
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from feature_encoding import stable_hash
+
+logger = logging.getLogger(__name__)
+
+# Caps keep a voter's document bounded however long the history gets
+MAX_TRACKED_VALUES = 100
+MAX_RECENT_TIMES = 50
+
+# voter_features_meta document recording the one-off seed from votes
+SEED_ID = 'seed'
+# A seed lease older than this belongs to a worker that died; another may take it over
+SEED_STALE_AFTER = datetime.timedelta(minutes=30)
+
+_store = None
+
+
+@dataclass(frozen=True)
+class VoterHistorySummary:
+    """Aggregated voting history for one voter; len() is the number of votes."""
+
+    vote_count: int = 0
+    ip_hashes: FrozenSet[int] = field(default_factory=frozenset)
+    device_hashes: FrozenSet[int] = field(default_factory=frozenset)
+    interval_count: int = 0
+    interval_sum: float = 0.0
+    interval_sumsq: float = 0.0
+    first_vote_at: Optional[datetime.datetime] = None
+    last_vote_at: Optional[datetime.datetime] = None
+    recent_votes: Tuple[datetime.datetime, ...] = ()
+    attempt_count: int = 0
+    recent_attempts: Tuple[datetime.datetime, ...] = ()
+
+    def __len__(self) -> int:
+        return self.vote_count
+
+    @classmethod
+    def from_document(cls, doc: Optional[Dict]) -> 'VoterHistorySummary':
+        if not doc:
+            return cls()
+        return cls(
+            vote_count=int(doc.get('vote_count', 0)),
+            ip_hashes=frozenset(doc.get('ip_hashes', [])),
+            device_hashes=frozenset(doc.get('device_hashes', [])),
+            interval_count=int(doc.get('interval_count', 0)),
+            interval_sum=float(doc.get('interval_sum', 0.0)),
+            interval_sumsq=float(doc.get('interval_sumsq', 0.0)),
+            first_vote_at=doc.get('first_vote_at'),
+            last_vote_at=doc.get('last_vote_at'),
+            recent_votes=tuple(doc.get('recent_votes', [])),
+            attempt_count=int(doc.get('attempt_count', 0)),
+            recent_attempts=tuple(doc.get('recent_attempts', [])),
+        )
+
+    @classmethod
+    def from_votes(cls, votes: Iterable[Dict], now: Optional[datetime.datetime] = None) -> 'VoterHistorySummary':
+        """Summarize raw vote documents (oldest first), e.g. a get_voter_history result"""
+        now = now or datetime.datetime.utcnow()
+        votes = list(votes)
+        times = [v.get('timestamp', now) for v in votes]
+        gaps = [(times[i] - times[i - 1]).total_seconds() for i in range(1, len(times))]
+        return cls(
+            vote_count=len(votes),
+            ip_hashes=frozenset(stable_hash(v.get('ip_address', '')) for v in votes),
+            device_hashes=frozenset(stable_hash(v.get('user_agent', '')) for v in votes),
+            interval_count=len(gaps),
+            interval_sum=float(sum(gaps)),
+            interval_sumsq=float(sum(g * g for g in gaps)),
+            first_vote_at=times[0] if times else None,
+            last_vote_at=times[-1] if times else None,
+            recent_votes=tuple(times[-MAX_RECENT_TIMES:]),
+        )
+
+    def has_ip(self, ip_address) -> bool:
+        return stable_hash(ip_address or '') in self.ip_hashes
+
+    @property
+    def unique_ips(self) -> int:
+        return len(self.ip_hashes)
+
+    @property
+    def unique_devices(self) -> int:
+        return len(self.device_hashes)
+
+    @property
+    def interval_mean(self) -> float:
+        return self.interval_sum / self.interval_count if self.interval_count else 0.0
+
+    @property
+    def interval_std(self) -> float:
+        """Population standard deviation, like np.std"""
+        if not self.interval_count:
+            return 0.0
+        mean = self.interval_mean
+        return math.sqrt(max(self.interval_sumsq / self.interval_count - mean * mean, 0.0))
+
+    def votes_since(self, since: datetime.datetime) -> int:
+        return sum(1 for t in self.recent_votes if t >= since)
+
+
+def as_history_summary(history, now: Optional[datetime.datetime] = None) -> VoterHistorySummary:
+    """Accept either a VoterHistorySummary or a list of vote documents"""
+    if isinstance(history, VoterHistorySummary):
+        return history
+    return VoterHistorySummary.from_votes(history or [], now)
+
+
+def _vote_update(ip_address, user_agent, timestamp: datetime.datetime) -> List[Dict]:
+    """Pipeline that folds one vote into a voter_features document"""
+    ip_hash = stable_hash(ip_address or '')
+    device_hash = stable_hash(user_agent or '')
+    return [
+        {'$set': {
+            '_gap': {'$cond': [
+                {'$eq': [{'$ifNull': ['$last_vote_at', None]}, None]},
+                None,
+                {'$divide': [{'$subtract': [timestamp, '$last_vote_at']}, 1000]},
+            ]},
+        }},
+        {'$set': {
+            'vote_count': {'$add': [{'$ifNull': ['$vote_count', 0]}, 1]},
+            'interval_count': {'$add': [{'$ifNull': ['$interval_count', 0]},
+                                        {'$cond': [{'$eq': ['$_gap', None]}, 0, 1]}]},
+            'interval_sum': {'$add': [{'$ifNull': ['$interval_sum', 0]}, {'$ifNull': ['$_gap', 0]}]},
+            'interval_sumsq': {'$add': [{'$ifNull': ['$interval_sumsq', 0]},
+                                        {'$multiply': [{'$ifNull': ['$_gap', 0]}, {'$ifNull': ['$_gap', 0]}]}]},
+            'ip_hashes': {'$slice': [{'$setUnion': [{'$ifNull': ['$ip_hashes', []]}, [ip_hash]]},
+                                     MAX_TRACKED_VALUES]},
+            'device_hashes': {'$slice': [{'$setUnion': [{'$ifNull': ['$device_hashes', []]}, [device_hash]]},
+                                         MAX_TRACKED_VALUES]},
+            'recent_votes': {'$slice': [{'$concatArrays': [{'$ifNull': ['$recent_votes', []]}, [timestamp]]},
+                                        -MAX_RECENT_TIMES]},
+            'first_vote_at': {'$ifNull': ['$first_vote_at', timestamp]},
+            'last_vote_at': timestamp,
+            'updated_at': '$$NOW',
+        }},
+        {'$unset': '_gap'},
+    ]
+
+
+class VoterFeatureStore:
+    def __init__(self, db):
+        self.enabled = db is not None
+        self.collection = db.get_collection('voter_features') if self.enabled else None
+        self.votes = db.get_collection('votes') if self.enabled else None
+        self.vote_attempts = db.get_collection('vote_attempts') if self.enabled else None
+        self.meta = db.get_collection('voter_features_meta') if self.enabled else None
+        self.ready = not self.enabled
+        # Voters whose vote reached votes but not their aggregates; repaired from raw
+        # votes after this worker's next successful update, or by a full rebuild
+        self.failed_vote_updates = 0
+        self._pending_repairs: set = set()
+
+    def ensure_indexes(self) -> None:
+        """Per-voter time order, used by the rebuild sort and the unready fallback"""
+        self.votes.create_index([('user_id', 1), ('timestamp', 1)])
+        self.vote_attempts.create_index([('user_id', 1), ('timestamp', 1)])
+
+    def is_ready(self) -> bool:
+        """True once the aggregates have been seeded from votes, by this worker or another"""
+        if not self.ready:
+            self.ready = (self.meta.find_one({'_id': SEED_ID}, {'status': 1}) or {}).get('status') == 'done'
+        return self.ready
+
+    def seed(self) -> bool:
+        """
+        Seed aggregates from votes unless that was already done; only the worker
+        holding the seed lease rebuilds, the others stay unready until it is
+        done. Returns whether the store is ready.
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.datetime.utcnow()
+        state = self.meta.find_one({'_id': SEED_ID})
+        if state is None and (self.collection.estimated_document_count() > 0
+                              or self.votes.estimated_document_count() == 0):
+            # New election, or aggregates kept since before the seed was recorded
+            self.meta.update_one({'_id': SEED_ID}, {'$setOnInsert': {'status': 'done', 'finished_at': now}},
+                                 upsert=True)
+            return self.is_ready()
+        if state is not None and state.get('status') == 'done':
+            self.ready = True
+            return True
+        lease = {'status': 'running', 'owner': f"{socket.gethostname()}:{os.getpid()}", 'started_at': now}
+        try:
+            if state is None:
+                self.meta.insert_one({'_id': SEED_ID, **lease})
+            elif state.get('status') == 'running' and state.get('started_at') and \
+                    state['started_at'] > now - SEED_STALE_AFTER:
+                return False
+            elif self.meta.update_one({'_id': SEED_ID, 'status': state.get('status'),
+                                       'started_at': state.get('started_at')},
+                                      {'$set': lease}).modified_count == 0:
+                return False
+        except DuplicateKeyError:
+            return False
+        return self._run_seed()
+
+    def _run_seed(self) -> bool:
+        try:
+            written = self.rebuild_from_votes()
+        except Exception as e:
+            self.meta.update_one({'_id': SEED_ID}, {'$set': {'status': 'failed', 'error': str(e),
+                                                            'finished_at': datetime.datetime.utcnow()}})
+            logger.error(f"Voter feature store seed failed, history comes from raw votes until rebuilt: {e}")
+            return False
+        self.meta.update_one({'_id': SEED_ID}, {'$set': {'status': 'done', 'voters': written,
+                                                        'finished_at': datetime.datetime.utcnow()}},
+                             upsert=True)
+        self.ready = True
+        logger.info(f"Voter feature store seeded for {written} voters")
+        return True
+
+    def history_from_votes(self, user_id: str) -> VoterHistorySummary:
+        """A voter's summary computed from raw votes, for when the aggregates cannot be trusted"""
+        votes = list(self.votes.find({'user_id': user_id}, {'_id': 0, 'user_id': 1, 'timestamp': 1})
+                     .sort('timestamp', 1))
+        attempts = list(self.vote_attempts.find(
+            {'user_id': user_id}, {'_id': 0, 'timestamp': 1, 'request.ip_address': 1, 'request.user_agent': 1}
+        ).sort('timestamp', 1)) if votes else []
+        return VoterHistorySummary.from_votes(_with_request_details(votes, attempts))
+
+    def record_attempt(self, user_id: str, timestamp: Optional[datetime.datetime] = None) -> VoterHistorySummary:
+        """
+        Count a vote attempt and return the voter's summary from before it
+
+        This is the only read cast_vote needs: the returned document is the
+        pre-attempt state, so the attempt and the history lookup share one
+        round trip.
+        """
+        if not self.enabled or not user_id:
+            return VoterHistorySummary()
+        from pymongo import ReturnDocument
+
+        timestamp = timestamp or datetime.datetime.utcnow()
+        before = self.collection.find_one_and_update(
+            {'_id': user_id},
+            {
+                '$inc': {'attempt_count': 1},
+                '$push': {'recent_attempts': {'$each': [timestamp], '$slice': -MAX_RECENT_TIMES}},
+                '$set': {'last_attempt_at': timestamp, 'updated_at': timestamp},
+            },
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        )
+        summary = VoterHistorySummary.from_document(before)
+        if not self.is_ready():
+            # Vote aggregates may be missing or partial until the seed is done
+            summary = replace(self.history_from_votes(user_id), attempt_count=summary.attempt_count,
+                              recent_attempts=summary.recent_attempts)
+        return summary
+
+    def record_vote(self, user_id: str, ip_address, user_agent,
+                    timestamp: Optional[datetime.datetime] = None) -> VoterHistorySummary:
+        """Fold a recorded vote into the voter's aggregates; returns the updated summary"""
+        if not self.enabled or not user_id:
+            return VoterHistorySummary()
+        from pymongo import ReturnDocument
+
+        try:
+            after = self.collection.find_one_and_update(
+                {'_id': user_id},
+                _vote_update(ip_address, user_agent, timestamp or datetime.datetime.utcnow()),
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception:
+            self.failed_vote_updates += 1
+            self._pending_repairs.add(user_id)
+            raise
+        if self._pending_repairs:
+            self.repair_pending()
+        return VoterHistorySummary.from_document(after)
+
+    def repair_pending(self) -> int:
+        """Recompute the vote aggregates of voters whose update failed; returns how many were fixed"""
+        repaired = 0
+        for user_id in list(self._pending_repairs):
+            try:
+                self.collection.update_one({'_id': user_id},
+                                           {'$set': _summary_fields(self.history_from_votes(user_id))},
+                                           upsert=True)
+            except Exception as e:
+                logger.warning(f"Voter feature repair for {user_id} failed, retried after the next vote: {e}")
+                continue
+            self._pending_repairs.discard(user_id)
+            repaired += 1
+        return repaired
+
+    def stats(self) -> Dict:
+        return {'ready': self.ready, 'failed_vote_updates': self.failed_vote_updates,
+                'pending_repairs': len(self._pending_repairs)}
+
+    def record_votes(self, votes: List[Dict]) -> None:
+        """Bulk record_vote; each item has user_id, ip_address, user_agent and timestamp"""
+        if not self.enabled or not votes:
+            return
+        from pymongo import UpdateOne
+
+        self.collection.bulk_write([
+            UpdateOne({'_id': v['user_id']},
+                      _vote_update(v.get('ip_address'), v.get('user_agent'),
+                                   v.get('timestamp') or datetime.datetime.utcnow()),
+                      upsert=True)
+            for v in votes
+        ], ordered=True)
+
+    def rebuild_from_votes(self, batch_size: int = 1000) -> int:
+        """
+        Recompute every voter's vote aggregates (attempt counters are kept).
+        Vote times come from the votes collection; votes store no network
+        details, so each vote takes its IP and user agent from the voter's
+        last vote_attempts entry at or before it. Returns the number of
+        voters written.
+        """
+        if not self.enabled:
+            return 0
+        from pymongo import UpdateOne
+
+        written = 0
+        operations: List = []
+        # Everything below rewrites their aggregates too
+        repaired = set(self._pending_repairs)
+        only_voters = {'user_id': {'$type': 'string'}}
+        # Both sorts follow the (user_id, timestamp) indexes; disk use covers servers without them
+        votes = self.votes.find(only_voters, {'_id': 0, 'user_id': 1, 'timestamp': 1}, allow_disk_use=True) \
+            .sort([('user_id', 1), ('timestamp', 1)])
+        attempts = self.vote_attempts.find(
+            only_voters, {'_id': 0, 'user_id': 1, 'timestamp': 1, 'request.ip_address': 1, 'request.user_agent': 1},
+            allow_disk_use=True,
+        ).sort([('user_id', 1), ('timestamp', 1)])
+        attempt_groups = itertools.groupby(attempts, key=lambda a: a['user_id'])
+        attempt_user, user_attempts = next(attempt_groups, (None, iter(())))
+
+        for user_id, user_votes in itertools.groupby(votes, key=lambda v: v['user_id']):
+            # Both cursors are sorted by user_id; skip attempts of voters with no vote
+            while attempt_user is not None and attempt_user < user_id:
+                attempt_user, user_attempts = next(attempt_groups, (None, iter(())))
+            known = list(user_attempts) if attempt_user == user_id else []
+            summary = VoterHistorySummary.from_votes(_with_request_details(list(user_votes), known))
+            operations.append(UpdateOne({'_id': user_id}, {'$set': _summary_fields(summary)}, upsert=True))
+            if len(operations) >= batch_size:
+                self.collection.bulk_write(operations, ordered=False)
+                written += len(operations)
+                operations = []
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+        self._pending_repairs -= repaired
+        return written
+
+
+def _summary_fields(summary: VoterHistorySummary) -> Dict:
+    """voter_features vote aggregates for a summary built from raw votes (attempt counters excluded)"""
+    return {
+        'vote_count': summary.vote_count,
+        'ip_hashes': sorted(summary.ip_hashes)[:MAX_TRACKED_VALUES],
+        'device_hashes': sorted(summary.device_hashes)[:MAX_TRACKED_VALUES],
+        'interval_count': summary.interval_count,
+        'interval_sum': summary.interval_sum,
+        'interval_sumsq': summary.interval_sumsq,
+        'first_vote_at': summary.first_vote_at,
+        'last_vote_at': summary.last_vote_at,
+        'recent_votes': list(summary.recent_votes),
+        'updated_at': datetime.datetime.utcnow(),
+    }
+
+
+def _with_request_details(votes: List[Dict], attempts: List[Dict]) -> List[Dict]:
+    """Votes (oldest first) with ip_address/user_agent of the attempt that preceded each"""
+    times = [a.get('timestamp') for a in attempts]
+    enriched = []
+    for vote in votes:
+        request = {}
+        if attempts:
+            # An attempt is logged just before its vote; a vote older than every attempt takes the first
+            position = bisect.bisect_right(times, vote['timestamp']) - 1 if vote.get('timestamp') else -1
+            request = attempts[max(position, 0)].get('request') or {}
+        enriched.append(dict(vote, ip_address=request.get('ip_address', ''),
+                             user_agent=request.get('user_agent', '')))
+    return enriched
+
+
+def initialize_voter_feature_store(db):
+    global _store
+    _store = VoterFeatureStore(db)
+    if _store.enabled:
+        try:
+            _store.ensure_indexes()
+            # First start against an existing election: one worker seeds aggregates from votes
+            _store.seed()
+        except Exception as e:
+            logger.warning(f"Voter feature store seed skipped, history comes from raw votes: {e}")
+    return _store
+
+
+def get_voter_feature_store() -> VoterFeatureStore:
+    return _store if _store else VoterFeatureStore(None)
+
+
+if __name__ == '__main__':
+    import argparse
+    from pymongo import MongoClient
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Maintain the per-voter feature aggregates')
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--mongodb-uri', default=os.environ.get('MONGODB_URI', 'mongodb://localhost:27017'))
+    parser.add_argument('--db-name', default=os.environ.get('MONGODB_DB_NAME', 'election_db'))
+    args = parser.parse_args()
+
+    mongo_client = MongoClient(args.mongodb_uri)
+    try:
+        store = VoterFeatureStore(mongo_client[args.db_name])
+        store.ensure_indexes()
+        ok = store._run_seed()
+        print("✓ Voter aggregates rebuilt from the votes collection" if ok else "✗ Rebuild failed, see the log")
+    finally:
+        mongo_client.close()
+    sys.exit(0 if ok else 1)